@@ -0,0 +1,162 @@
+"""
+Time-to-first-token benchmark for the orchestrator's prompt layout.
+
+Starts a local stand-in for the inference server that models prefix caching
+the way vLLM / SGLang do: the prompt is hashed in fixed-size blocks and only
+the blocks after the longest already-cached prefix pay prefill time. The same
+customer prompts are then sent in the current layout (static system prefix
+first, customer data after it) and in the previous one (rules placed after
+the customer profile), each against a fresh server, and TTFT is compared.
+
+    python benchmark_prompt_cache.py [--customers 50] [--prefill-ms-per-block 4]
+"""
+import argparse
+import hashlib
+import json
+import statistics
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from server.orchestrator.prompt import (
+    PREFIX_VERSION,
+    PROACTIVE_PROMPT,
+    REACTIVE_PROMPT,
+    RULES_PROMPT,
+    build_user_prompt,
+)
+
+BLOCK_CHARS = 64  # ~16 tokens, vLLM's default KV block size
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Streams a reply after a prefill delay proportional to the uncached prompt blocks."""
+
+    def __init__(self, prefill_seconds_per_block: float):
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.prefill_seconds_per_block = prefill_seconds_per_block
+        self.cached_blocks = set()
+        self.lock = threading.Lock()
+
+    def prefill(self, text: str) -> tuple:
+        """Return (cached blocks, total blocks) for text and cache all of its blocks."""
+        digest = hashlib.sha1()
+        hashes = []
+        for i in range(0, len(text), BLOCK_CHARS):
+            digest.update(text[i:i + BLOCK_CHARS].encode())
+            hashes.append(digest.hexdigest())
+        with self.lock:
+            cached = next((i for i, h in enumerate(hashes) if h not in self.cached_blocks), len(hashes))
+            self.cached_blocks.update(hashes)
+        return cached, len(hashes)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        text = "".join(f"<|{m['role']}|>{m['content']}" for m in body["messages"])
+        cached, total = self.server.prefill(text)
+        time.sleep((total - cached) * self.server.prefill_seconds_per_block)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("X-Cached-Blocks", f"{cached}/{total}")
+        self.end_headers()
+        for token in ('{"action": ', '"send_message"', "}"):
+            event = {"choices": [{"delta": {"content": token}}]}
+            self.wfile.write(f"data: {json.dumps(event)}\n\n".encode())
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+
+    def log_message(self, *args):
+        pass
+
+
+def _customer(i: int) -> dict:
+    return {
+        "name": f"Customer {i:04d}",
+        "tier": "vip" if i % 3 == 0 else "standard",
+        "ltv": 150.0 + i * 7.5,
+        "totalOrders": 1 + i % 12,
+        "totalIssues": i % 4,
+        "totalCreditsGiven": (i % 5) * 10,
+        "issueHistory": [
+            {"issueType": "late_delivery", "resolution": "apply_credit", "credit": 10, "date": f"2025-0{1 + k}-01"}
+            for k in range(i % 4)
+        ],
+        "orderHistory": [
+            {"orderId": f"order-{i}{k:02d}", "product": "Nike Air Max 90", "status": "delivered", "total": 129.99}
+            for k in range(1 + i % 12)
+        ],
+        "calls": [],
+        "transcripts": [],
+    }
+
+
+def _messages(i: int, layout: str) -> list:
+    source = "proactive" if i % 2 else "reactive"
+    message = (
+        f"PROACTIVE ALERT: Carrier tracking shows Order order-{i}00 is 4 days late."
+        if source == "proactive" else "Where is my order? It was supposed to arrive yesterday."
+    )
+    system_prompt, user_prompt = build_user_prompt(_customer(i), {"credit": 10}, message, source=source)
+    if layout == "legacy":
+        # Previous layout: persona only in the system message, rules right after the customer data
+        system_prompt = PROACTIVE_PROMPT if source == "proactive" else REACTIVE_PROMPT
+        head, sep, tail = user_prompt.partition("\nCUSTOMER MESSAGE")
+        user_prompt = head + RULES_PROMPT + sep + tail
+    return [{"role": "system", "content": system_prompt}, {"role": "user", "content": user_prompt}]
+
+
+def _ttft(url: str, messages: list) -> tuple:
+    request = urllib.request.Request(
+        url,
+        data=json.dumps({"messages": messages, "stream": True, "max_tokens": 2000}).encode(),
+        headers={"Content-Type": "application/json"},
+    )
+    start = time.perf_counter()
+    with urllib.request.urlopen(request) as resp:
+        for line in resp:
+            if line.startswith(b"data:"):
+                ttft = time.perf_counter() - start
+                break
+        resp.read()
+        cached, total = map(int, resp.headers["X-Cached-Blocks"].split("/"))
+    return ttft, cached / total
+
+
+def run(layout: str, customers: int, prefill_seconds_per_block: float) -> dict:
+    server = StandInServer(prefill_seconds_per_block)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/inference"
+    try:
+        results = [_ttft(url, _messages(i, layout)) for i in range(customers)]
+    finally:
+        server.shutdown()
+    ttfts = sorted(t for t, _ in results)
+    return {
+        "layout": layout,
+        "mean_ms": statistics.mean(ttfts) * 1000,
+        "p50_ms": ttfts[len(ttfts) // 2] * 1000,
+        "p95_ms": ttfts[int(len(ttfts) * 0.95) - 1] * 1000,
+        "cached": statistics.mean(c for _, c in results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--customers", type=int, default=50)
+    parser.add_argument("--prefill-ms-per-block", type=float, default=4.0)
+    args = parser.parse_args()
+
+    print(f"Prompt prefix {PREFIX_VERSION}, {args.customers} customers, "
+          f"{args.prefill_ms_per_block} ms prefill per {BLOCK_CHARS}-char block\n")
+    print(f"{'layout':<14}{'mean TTFT':>12}{'p50':>10}{'p95':>10}{'prompt cached':>16}")
+    for layout in ("legacy", "static-prefix"):
+        r = run(layout, args.customers, args.prefill_ms_per_block / 1000)
+        print(f"{r['layout']:<14}{r['mean_ms']:>10.1f}ms{r['p50_ms']:>8.1f}ms{r['p95_ms']:>8.1f}ms{r['cached']:>15.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,9 @@ export interface ChatMessageEvent {
     message: string;
     action?: string;
     creditAmount?: number;
+    messageId?: string;
+    partial?: boolean;
+    failed?: boolean;
 }
 
 export interface IncomingCallEvent {
@@ -71,6 +74,8 @@ export function useSocket() {
 
         // Live chat messages from customer <-> agent conversations
         socket.on('chat_message', (data: ChatMessageEvent) => {
+            // Streamed fragments are rendered by the customer's own chat page
+            if (data.partial || data.failed) return;
             setChatMessages(prev => [...prev, data]);
         });
 
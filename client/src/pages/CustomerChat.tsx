@@ -1,6 +1,7 @@
 import { useState, useRef, useEffect, useMemo } from 'react';
 import { Link } from 'react-router-dom';
 import { useSocket } from '../hooks/useSocket';
+import type { ChatMessageEvent } from '../hooks/useSocket';
 import { io, Socket } from 'socket.io-client';
 import { useWebRTC } from '../hooks/useWebRTC';
 import CallControls from '../components/CallControls';
@@ -37,6 +38,8 @@ export default function CustomerChat() {
     const chatRef = useRef<HTMLDivElement>(null);
     const [localError, setLocalError] = useState<string | null>(null);
     const [socket, setSocket] = useState<Socket | null>(null);
+    // Agent replies still being generated, keyed by messageId
+    const [streaming, setStreaming] = useState<Record<string, { text: string; timestamp: string }>>({});
 
     // Initialize Socket.IO connection with customer role
     useEffect(() => {
@@ -50,9 +53,33 @@ export default function CustomerChat() {
             console.log(`[CustomerChat] Connected as ${selectedCustomer.name}`);
         });
 
+        // Reply fragments arrive on this customer's room while the agent is still typing
+        s.on('chat_message', (data: ChatMessageEvent) => {
+            if (!data.messageId) return;
+            const id = data.messageId;
+            // The reply failed part-way: drop its fragments (the request reports the error)
+            if (data.failed) {
+                setStreaming(prev => {
+                    const next = { ...prev };
+                    delete next[id];
+                    return next;
+                });
+                return;
+            }
+            if (!data.partial) return;
+            setStreaming(prev => ({
+                ...prev,
+                [id]: {
+                    text: (prev[id]?.text ?? '') + data.message,
+                    timestamp: prev[id]?.timestamp ?? data.timestamp,
+                },
+            }));
+        });
+
         return () => {
             s.disconnect();
             setSocket(null);
+            setStreaming({});
         };
     }, [selectedCustomer.id]);
 
@@ -64,15 +91,23 @@ export default function CustomerChat() {
 
     // Merge global websocket messages and local transient errors
     const messages = useMemo(() => {
-        const msgs: ChatMessage[] = chatMessages
-            .filter(m => m.customerName === selectedCustomer.id || m.customerName === selectedCustomer.name)
-            .map(m => ({
-                role: m.role,
-                text: m.message,
-                timestamp: m.timestamp,
-                action: m.action,
-                creditAmount: m.creditAmount,
-            }));
+        const ours = chatMessages
+            .filter(m => m.customerName === selectedCustomer.id || m.customerName === selectedCustomer.name);
+        const msgs: ChatMessage[] = ours.map(m => ({
+            role: m.role,
+            text: m.message,
+            timestamp: m.timestamp,
+            action: m.action,
+            creditAmount: m.creditAmount,
+        }));
+
+        // Replies still streaming, until their final message arrives
+        const finished = new Set(ours.map(m => m.messageId).filter(Boolean));
+        for (const [id, partial] of Object.entries(streaming)) {
+            if (!finished.has(id)) {
+                msgs.push({ role: 'agent', text: partial.text, timestamp: partial.timestamp });
+            }
+        }
 
         if (localError) {
             msgs.push({
@@ -82,7 +117,12 @@ export default function CustomerChat() {
             });
         }
         return msgs;
-    }, [chatMessages, selectedCustomer, localError]);
+    }, [chatMessages, selectedCustomer, localError, streaming]);
+
+    const isStreaming = useMemo(() => {
+        const finished = new Set(chatMessages.map(m => m.messageId).filter(Boolean));
+        return Object.keys(streaming).some(id => !finished.has(id));
+    }, [chatMessages, streaming]);
 
     useEffect(() => {
         if (chatRef.current) {
@@ -453,7 +493,7 @@ export default function CustomerChat() {
                 ))}
 
                 {/* Loading Indicator */}
-                {loading && (
+                {loading && !isStreaming && (
                     <div style={{
                         display: 'flex',
                         alignItems: 'center',
@@ -1,24 +1,43 @@
 """
-Autonomous agent loop — runs every 60 seconds in a background thread.
-
-Flow per iteration:
-  1. Fetch all orders from Neo4j
-  2. For each non-delivered order, check tracking via Yutori Scouting
-  3. If delayed → run full orchestrator pipeline
+Autonomous agent loop — a deadline-driven background thread.
+
+Flow:
+  1. Every AGENT_LOOP_DISCOVERY_SECONDS, page through open orders in Neo4j
+     (status filtered in Cypher, keyset-paginated by order id) and put any
+     new order on the scheduler
+  2. Whenever an order's next-check deadline passes, check tracking via
+     Yutori Scouting — orders near or past their ETA come up far more often
+  3. If delayed → run full orchestrator pipeline (delayed orders found in the
+     same pass share one orchestrate_batch run)
   4. If action requires browsing → call Yutori Browsing API
   5. Emit WebSocket events throughout for live dashboard
+
+Orders are checked in parallel on a bounded worker pool (AGENT_LOOP_WORKERS);
+per-provider in-flight caps live in server.integrations.limits. With
+AGENT_LOOP_SHARDS set, each replica only watches the order-id ranges it holds
+a lease for (see server.agent_loop.sharding).
 """
+import os
 import threading
 import time
-from server.neo4j_db.queries import get_all_orders, update_order_status
-from server.integrations.yutori import check_tracking
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from server.neo4j_db.queries import (
+    ORDER_PAGE_SIZE,
+    CLOSED_ORDER_STATUSES,
+    iter_open_orders,
+    get_open_orders_by_ids,
+    ResolutionWrites,
+)
+from server.integrations.yutori import check_tracking, check_tracking_batch
 from server.integrations.shopify import apply_store_credit, process_refund
-from server.orchestrator.orchestrator import orchestrate
+from server.orchestrator.orchestrator import orchestrate, orchestrate_batch
+from server.orchestrator.context import ResolutionContext
+from server.agent_loop.scheduler import OrderScheduler, CHECK_INTERVAL_FAR, CHECK_INTERVAL_LATE
+from server.agent_loop.processed_store import ProcessedStore
+from server.agent_loop.sharding import ShardLeases
 from server.websocket.events import (
     emit_activity,
     emit_delay_detected,
-    emit_neo4j_context,
-    emit_policy_lookup,
     emit_agent_decision,
     emit_browsing_step,
     emit_message_sent,
@@ -26,151 +45,463 @@ from server.websocket.events import (
     emit_order_update,
 )
 
-# Track which orders we've already processed to avoid re-running
-_processed_orders = set()
+# Track which orders we've already processed to avoid re-running (survives restarts)
+_processed_orders = ProcessedStore()
+
+# Next-check deadlines for every open order
+_scheduler = OrderScheduler()
+
+# Order-id ranges this process is responsible for (all of them unless sharded)
+_leases = ShardLeases()
 
 # Controls whether the loop is running
 _loop_active = False
 _loop_thread = None
+_worker_pool = None
+_wake = threading.Event()
+_rediscover = threading.Event()
 
-LOOP_INTERVAL_SECONDS = 60
+# Orders currently being checked, so a webhook push and a poll never overlap
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+DISCOVERY_INTERVAL_SECONDS = int(os.getenv("AGENT_LOOP_DISCOVERY_SECONDS", "300"))
+LOOP_WORKERS = int(os.getenv("AGENT_LOOP_WORKERS", "8"))
+RESOLVE_BATCH_SIZE = int(os.getenv("AGENT_LOOP_RESOLVE_BATCH_SIZE", "25"))
+# Oldest cached tracking status a check will accept: the tracking cache keeps
+# entries for minutes, longer than a late order's polling interval
+TRACKING_MAX_AGE_SECONDS = CHECK_INTERVAL_LATE / 2
 
 
 def _run_loop():
-    """Main loop body — called every LOOP_INTERVAL_SECONDS."""
+    """Main loop body — sleeps until the next order deadline or discovery pass."""
     global _loop_active
 
+    next_discovery = 0.0
     while _loop_active:
         try:
-            emit_activity("system", "Agent loop running — checking all orders...")
-
-            orders = get_all_orders()
-            open_orders = [
-                o for o in orders
-                if o["status"] not in ("delivered", "resolved")
-                and o["orderId"] not in _processed_orders
-            ]
+            if time.time() >= next_discovery or _rediscover.is_set():
+                _rediscover.clear()
+                _discover_orders()
+                next_discovery = time.time() + DISCOVERY_INTERVAL_SECONDS
 
-            if not open_orders:
-                emit_activity("system", f"No new orders to check ({len(orders)} total, {len(_processed_orders)} already processed)")
-            else:
-                for order in open_orders:
-                    _check_order(order)
+            _drain_due_orders()
 
         except Exception as e:
             emit_activity("system", f"Agent loop error: {str(e)}")
             print(f"[Agent Loop] Error: {e}")
 
-        # Wait for next iteration
-        time.sleep(LOOP_INTERVAL_SECONDS)
+        # Sleep until the earliest deadline (or the next discovery pass)
+        wake_at = next_discovery
+        next_due = _scheduler.next_due()
+        if next_due is not None:
+            wake_at = min(wake_at, next_due)
+        _wake.wait(max(0.0, wake_at - time.time()))
+        _wake.clear()
+
+
+def _discover_orders():
+    """Page through open orders, scheduling any we have not seen yet."""
+    emit_activity("system", "Agent loop discovering open orders...")
+
+    added = 0
+    now = time.time()
+    for page in iter_open_orders():
+        page = [o for o in page if _leases.owns(o["orderId"])]
+        pending = _processed_orders.unprocessed([o["orderId"] for o in page])
+        page = [o for o in page if o["orderId"] in pending]
+
+        for order in page:
+            if order["orderId"] in _scheduler:
+                _scheduler.refresh(order)
+            else:
+                # First sighting — take a baseline look right away
+                _scheduler.schedule(order, due=now)
+                added += 1
+
+        # Work off this page's first checks before pulling the next one
+        _drain_due_orders()
 
+    _processed_orders.evict_expired()
+    processed_count = len(_processed_orders)
+    emit_activity("system", f"{added} new order(s) scheduled ({len(_scheduler)} open, {processed_count} already processed)")
 
-def _check_order(order: dict):
-    """Check a single order for delays and handle if found."""
+
+def _drain_due_orders():
+    """Check every order whose deadline has passed, one page of rows at a time."""
+    while _loop_active:
+        due = _scheduler.pop_due(limit=ORDER_PAGE_SIZE)
+        if not due:
+            return
+        # Drop orders from shards we no longer hold — their new owner has them
+        due = [entry for entry in due if _leases.owns(entry["orderId"])]
+        if not due:
+            continue
+
+        started = time.monotonic()
+        # Orders missing from the result were delivered/resolved since they were scheduled
+        orders = get_open_orders_by_ids([entry["orderId"] for entry in due])
+        pending = _processed_orders.unprocessed([o["orderId"] for o in orders])
+        orders = [o for o in orders if o["orderId"] in pending]
+        checked = _check_orders(orders) if orders else 0
+
+        elapsed = time.monotonic() - started
+        emit_activity(
+            "system",
+            f"Agent loop pass finished in {elapsed:.2f}s — {checked} order(s) checked by {LOOP_WORKERS} worker(s)",
+            {"wallTimeSeconds": round(elapsed, 3), "ordersChecked": checked, "workers": LOOP_WORKERS},
+        )
+
+
+def _on_shards_changed(gained: set, lost: set):
+    """Heartbeat callback — rescan right away so newly owned ranges get scheduled."""
+    emit_activity(
+        "system",
+        f"Agent loop shards changed — gained {sorted(gained) or 'none'}, lost {sorted(lost) or 'none'}",
+        {"owner": _leases.owner, "held": sorted(_leases.held())},
+    )
+    if gained:
+        _rediscover.set()
+        _wake.set()
+
+
+def _check_orders(orders: list) -> int:
+    """
+    Check tracking for due orders in carrier batches. Delayed orders are
+    collected and resolved together through orchestrate_batch on the worker
+    pool: what each tracking chunk turned up goes out as soon as the chunk is
+    back (sooner if RESOLVE_BATCH_SIZE fills up), while the other chunks are
+    still being checked. Everything else is rescheduled right away. Returns
+    how many finished.
+    """
+    futures = {}
+    delayed = []
+    closed = []
+    seen = set()
+    finished = 0
+
+    def _flush():
+        batch = list(delayed)
+        delayed.clear()
+        futures[_worker_pool.submit(_resolve_batch, batch)] = [order for order, _ in batch]
+
+    try:
+        for chunk in check_tracking_batch(orders, max_age=TRACKING_MAX_AGE_SECONDS):
+            for order, tracking in chunk:
+                order_id = order["orderId"]
+                seen.add(order_id)
+                if not _claim(order_id):
+                    continue  # a webhook push is already handling it
+                try:
+                    days_late = _delay_to_resolve(order, tracking)
+                    status = tracking["status"]
+                except Exception as e:
+                    # A malformed tracking answer must not leave the order claimed forever
+                    _release(order_id)
+                    print(f"[Agent Loop] Error checking {order_id}: {e}")
+                    _scheduler.schedule(order, due=time.time() + CHECK_INTERVAL_LATE)
+                    continue
+                if days_late:
+                    delayed.append((order, days_late))
+                    if len(delayed) >= RESOLVE_BATCH_SIZE:
+                        _flush()
+                    continue
+                _release(order_id)
+                finished += 1
+                if status in CLOSED_ORDER_STATUSES:
+                    closed.append((order_id, status))
+                else:
+                    _scheduler.schedule(order)
+            if delayed:
+                _flush()
+    except Exception as e:
+        emit_activity("system", f"Batch tracking check failed: {e}")
+        print(f"[Agent Loop] Batch tracking error: {e}")
+        for order in orders:
+            if order["orderId"] not in seen:
+                _scheduler.schedule(order, due=time.time() + CHECK_INTERVAL_LATE)
+    if delayed:
+        _flush()
+    _record_closed(closed)
+
+    for future in as_completed(futures):
+        try:
+            outcomes = future.result()
+        except Exception as e:
+            outcomes = [(order, e) for order in futures[future]]
+        for order, error in outcomes:
+            if error is None:
+                finished += 1
+                continue
+            emit_activity("system", f"Order {order['orderId']}: check failed — {error}")
+            print(f"[Agent Loop] Error checking {order['orderId']}: {error}")
+            _scheduler.schedule(order, due=time.time() + CHECK_INTERVAL_LATE)
+    return finished
+
+
+def _record_closed(closed: list):
+    """
+    Record [(order_id, status)] for orders the carrier reports closed
+    (delivered), so discovery stops handing them back every cycle. The
+    processed store covers them even if the graph write fails.
+    """
+    if not closed:
+        return
+    for order_id, _ in closed:
+        _processed_orders.add(order_id)
+    try:
+        writes = ResolutionWrites()
+        for order_id, status in closed:
+            writes.set_order_status(order_id, status)
+        writes.commit()
+    except Exception as e:
+        print(f"[Agent Loop] Could not record {len(closed)} closed order(s): {e}")
+
+
+def _resolve_batch(batch: list) -> list:
+    """
+    Run one orchestrator batch for [(order, days_late)] and act on each
+    decision. Returns [(order, error or None)].
+    """
+    try:
+        # One transaction for the whole batch's Issue/Resolution nodes and order statuses
+        writes = ResolutionWrites(lease_owner=_leases.lease_owner())
+        results = orchestrate_batch([
+            ResolutionContext.for_delayed_order(order, days_late, writes=writes) for order, days_late in batch
+        ])
+        outcomes, decided = [], []
+        for (order, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                outcomes.append((order, result))
+                continue
+            writes.claim_order(order["orderId"], _leases.shard_of(order["orderId"]))
+            decided.append((order, result))
+
+        # Record the resolutions before acting on them: if the commit fails,
+        # nothing has been credited or claimed yet and the orders are retried
+        try:
+            writes.commit()
+        except Exception as e:
+            return outcomes + [(order, e) for order, _ in decided]
+        for order, result in decided:
+            _processed_orders.add(order["orderId"])
+            if not _won_claim(order, writes):
+                outcomes.append((order, None))
+                continue
+            try:
+                _apply_decision(order, result)
+                _finish_order(order, result)
+                outcomes.append((order, None))
+            except Exception as e:
+                outcomes.append((order, e))
+        return outcomes
+    finally:
+        for order, _ in batch:
+            _release(order["orderId"])
+
+
+def _claim(order_id: str) -> bool:
+    """Mark an order in flight. False when another path already has it."""
+    with _in_flight_lock:
+        if order_id in _in_flight:
+            return False
+        _in_flight.add(order_id)
+        return True
+
+
+def _release(order_id: str):
+    with _in_flight_lock:
+        _in_flight.discard(order_id)
+
+
+def _shard_in_use(shard: int) -> bool:
+    """True while an order of this shard is still being checked or resolved here."""
+    with _in_flight_lock:
+        return any(_leases.shard_of(order_id) == shard for order_id in _in_flight)
+
+
+def _check_order_exclusive(order: dict, tracking: dict = None):
+    """Run _check_order unless another path already has this order. Returns None when skipped."""
     order_id = order["orderId"]
-    tracking_url = order.get("trackingUrl", "")
-    customer_name = order["customerName"]
-    carrier = order.get("carrier", "Unknown")
+    if not _claim(order_id):
+        return None
+    try:
+        return _check_order(order, tracking)
+    finally:
+        _release(order_id)
+
+
+def enqueue_order_check(order_id: str, tracking: dict) -> bool:
+    """
+    Check one order right away using a carrier status pushed to us (webhook
+    path). Returns False when the loop isn't running or another replica's
+    shard owns the order.
+    """
+    if _worker_pool is None or not _leases.owns(order_id):
+        return False
+    _worker_pool.submit(_check_pushed_order, order_id, tracking)
+    return True
+
+
+def defer_polling(order_id: str):
+    """The carrier is pushing updates for this order, so polling can back off."""
+    _scheduler.postpone(order_id, time.time() + CHECK_INTERVAL_FAR)
+
+
+def _check_pushed_order(order_id: str, tracking: dict):
+    try:
+        orders = get_open_orders_by_ids([order_id])
+        if not orders or not _processed_orders.unprocessed([order_id]):
+            _scheduler.discard(order_id)
+            return
 
+        order = orders[0]
+        done = _check_order_exclusive(order, tracking)
+        if done:
+            _scheduler.discard(order_id)
+        elif done is False:
+            _scheduler.schedule(order, due=time.time() + CHECK_INTERVAL_FAR)
+    except Exception as e:
+        emit_activity("system", f"Order {order_id}: pushed tracking update failed — {e}")
+        print(f"[Agent Loop] Error handling pushed update for {order_id}: {e}")
+
+
+def _check_order(order: dict, tracking: dict = None) -> bool:
+    """
+    Check a single order for delays and handle if found. `tracking` is the
+    Scouting result when the caller already looked it up in a batch.
+    Returns True when the order is finished (resolved or delivered) and
+    should not be scheduled again.
+    """
     # Step 1: Check tracking via Yutori Scouting
-    tracking = check_tracking(tracking_url)
+    if tracking is None:
+        tracking = check_tracking(order.get("trackingUrl", ""), max_age=TRACKING_MAX_AGE_SECONDS)
+
+    days_late = _delay_to_resolve(order, tracking)
+    if not days_late:
+        if tracking["status"] not in CLOSED_ORDER_STATUSES:
+            return False
+        _record_closed([(order["orderId"], tracking["status"])])
+        return True
+
+    # Step 4: Run orchestrator, then record the resolution before acting on it
+    writes = ResolutionWrites(lease_owner=_leases.lease_owner())
+    result = orchestrate(context=ResolutionContext.for_delayed_order(order, days_late, writes=writes))
+    writes.claim_order(order["orderId"], _leases.shard_of(order["orderId"]))
+    writes.commit()
+    _processed_orders.add(order["orderId"])
+    if _won_claim(order, writes):
+        _apply_decision(order, result)
+        _finish_order(order, result)
+    return True
+
+
+def _won_claim(order: dict, writes: ResolutionWrites) -> bool:
+    """Whether the commit resolved this order here. If not, another worker did (or now owns its shard)."""
+    if order["orderId"] in writes.claimed:
+        return True
+    print(f"[Agent Loop] {order['orderId']} was resolved elsewhere — skipping its action")
+    return False
+
+
+def _delay_to_resolve(order: dict, tracking: dict) -> int:
+    """
+    Steps 1-3 for an order whose tracking is known: returns the days late when
+    the orchestrator should run, 0 when there is nothing to do.
+    """
+    order_id = order["orderId"]
+    customer_name = order["customerName"]
+    carrier = order.get("carrier", "Unknown")
 
     if tracking["status"] == "delayed" and tracking["days_late"] > 0:
         days_late = tracking["days_late"]
 
-        from server.neo4j_db.queries import check_existing_open_issue
-        if check_existing_open_issue(order_id):
+        # hasOpenIssue comes back with the order row, no extra round trip
+        if order.get("hasOpenIssue"):
             emit_activity("system", f"Order {order_id}: Issue already open, skipping orchestrator pipeline.")
-            return
+            return 0
 
         # Emit scouting detection
         emit_delay_detected(order_id, customer_name, carrier, days_late)
 
-        # Step 2: Get context from Neo4j (orchestrator does this internally and emits the graph insights)
+        # Steps 2-3: Context from Neo4j arrived with the order row; the
+        # orchestrator looks up the policy once and emits both for the feed
+        return days_late
 
-        # Step 3: Policy lookup will happen inside orchestrator
-        # We emit it here for the activity feed
-        from server.integrations.senso import get_policy
-        policy = get_policy(days_late, order.get("tier", "standard"))
-        emit_policy_lookup(days_late, policy["credit"], order.get("tier", "standard"))
+    emit_activity("scouting", f"Order {order_id}: {tracking['status']} — no action needed")
+    return 0
 
-        # Step 4: Run orchestrator
-        auto_message = (
-            f"PROACTIVE ALERT: Carrier tracking shows Order {order_id} "
-            f"({order.get('product', 'item')}) is {days_late} days late. "
-            f"Customer {customer_name} is a {order.get('tier', 'standard')} customer."
-        )
 
-        result = orchestrate(
-            customer_id=order["customerId"],
-            customer_message=auto_message,
-            delay_days=days_late,
-            order_id=order_id,
-        )
+def _apply_decision(order: dict, result: dict):
+    """
+    Step 5: act on the orchestrator's decision. Only called once the order's
+    Issue/Resolution and "resolved" status are committed and the order is in
+    the processed store, so a failure here never leads to a second credit.
+    """
+    order_id = order["orderId"]
+    tracking_url = order.get("trackingUrl", "")
 
-        # Emit decision
-        emit_agent_decision(
-            result.get("action", "unknown"),
-            result.get("creditAmount", 0),
-            result.get("reasoning", ""),
+    # Emit decision
+    emit_agent_decision(
+        result.get("action", "unknown"),
+        result.get("creditAmount", 0),
+        result.get("reasoning", ""),
+    )
+
+    # Step 5: Execute action if needed
+    action = result.get("action", "")
+    if action == "apply_credit":
+        api_result = apply_store_credit(order_id, result.get("creditAmount", 0), order.get("customerId"))
+        for step in api_result.get("steps", []):
+            emit_activity("system", step, paced=True)
+    elif action == "process_refund":
+        api_result = process_refund(order_id, result.get("creditAmount", 0), "Shipping delay")
+        for step in api_result.get("steps", []):
+            emit_activity("system", step, paced=True)
+    elif action == "file_carrier_claim":
+        from server.integrations.yutori import file_carrier_claim
+        tracking_num = tracking_url.split("=")[-1] if "=" in tracking_url else order_id
+        api_result = file_carrier_claim(
+            tracking_number=tracking_num,
+            order_total=order.get("total", 0),
+            brand_name="Resolve Sneaker Co.",
+            session_id=order_id
         )
+        for step in api_result.get("steps", []):
+            emit_browsing_step(step, paced=True)
 
-        # Step 5: Execute action if needed
-        action = result.get("action", "")
-        if action == "apply_credit":
-            api_result = apply_store_credit(order_id, result.get("creditAmount", 0), order.get("customerId"))
-            for step in api_result.get("steps", []):
-                emit_activity("system", step)
-                time.sleep(0.3)
-        elif action == "process_refund":
-            api_result = process_refund(order_id, result.get("creditAmount", 0), "Shipping delay")
-            for step in api_result.get("steps", []):
-                emit_activity("system", step)
-                time.sleep(0.3)
-        elif action == "file_carrier_claim":
-            from server.integrations.yutori import file_carrier_claim
-            tracking_num = tracking_url.split("=")[-1] if "=" in tracking_url else order_id
-            api_result = file_carrier_claim(
-                tracking_number=tracking_num,
-                order_total=order.get("total", 0),
-                brand_name="Resolve Sneaker Co.",
-                session_id=order_id
-            )
-            for step in api_result.get("steps", []):
-                emit_browsing_step(step)
-                time.sleep(0.3)
-
-        # Step 6: Update order status
-        update_order_status(order_id, "resolved")
-        emit_order_update(order_id, "resolved")
-
-        # Step 7: Emit message sent
-        emit_message_sent(customer_name, result.get("message", ""))
-
-        # Step 8: Notify graph update
-        emit_graph_updated()
-
-        # Mark as processed
-        _processed_orders.add(order_id)
 
-    else:
-        emit_activity("scouting", f"Order {order_id}: {tracking['status']} — no action needed")
+def _finish_order(order: dict, result: dict):
+    """Steps 6-8, once the order's decision has been acted on."""
+    order_id = order["orderId"]
+    emit_order_update(order_id, "resolved")
+
+    # Step 7: Emit message sent
+    emit_message_sent(order["customerName"], result.get("message", ""))
+
+    # Step 8: Notify graph update
+    emit_graph_updated()
 
 
 def start_agent_loop(socketio=None):
     """Start the autonomous agent loop in a background thread."""
-    global _loop_active, _loop_thread
+    global _loop_active, _loop_thread, _worker_pool
 
     _loop_active = True
+    if _worker_pool is None:
+        _worker_pool = ThreadPoolExecutor(max_workers=max(1, LOOP_WORKERS), thread_name_prefix="agent-loop")
+    _leases.start(on_change=_on_shards_changed, in_use=_shard_in_use)
     _loop_thread = threading.Thread(target=_run_loop, daemon=True)
     _loop_thread.start()
-    print(f"[Agent Loop] Started — checking orders every {LOOP_INTERVAL_SECONDS}s")
+    print(f"[Agent Loop] Started — discovering orders every {DISCOVERY_INTERVAL_SECONDS}s, checking on deadline with {LOOP_WORKERS} worker(s)")
 
 
 def stop_agent_loop():
     """Stop the agent loop."""
     global _loop_active
     _loop_active = False
+    _wake.set()
+    _leases.stop()
     print("[Agent Loop] Stopped")
 
 
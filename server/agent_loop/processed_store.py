@@ -0,0 +1,120 @@
+"""
+Durable record of orders the agent loop is done with (resolved or delivered).
+
+Backed by a local SQLite file so a restart doesn't send every open order back
+through the LLM + Shopify pipeline. Entries expire after PROCESSED_TTL_SECONDS
+and a bounded LRU front cache answers repeat lookups without touching disk,
+so memory stays flat on long-running nodes.
+"""
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+PROCESSED_DB_PATH = os.getenv(
+    "PROCESSED_DB_PATH",
+    os.path.join(os.path.dirname(__file__), "..", "..", "data", "agent_loop.sqlite3"),
+)
+PROCESSED_TTL_SECONDS = int(os.getenv("PROCESSED_TTL_SECONDS", str(14 * 86400)))
+PROCESSED_CACHE_SIZE = int(os.getenv("PROCESSED_CACHE_SIZE", "10000"))
+
+
+class ProcessedStore:
+    """Set-like store of processed order ids with TTL eviction."""
+
+    def __init__(self, path: str = PROCESSED_DB_PATH, ttl: int = PROCESSED_TTL_SECONDS,
+                 cache_size: int = PROCESSED_CACHE_SIZE):
+        self._path = path
+        self._ttl = ttl
+        self._cache_size = cache_size
+        self._cache = OrderedDict()  # orderId → processed_at
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            if self._path != ":memory:":
+                os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            self._conn = sqlite3.connect(self._path, check_same_thread=False, isolation_level=None)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS processed_orders ("
+                " order_id TEXT PRIMARY KEY,"
+                " processed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS processed_orders_at ON processed_orders (processed_at)"
+            )
+        return self._conn
+
+    def _remember(self, order_id: str, processed_at: float):
+        self._cache[order_id] = processed_at
+        self._cache.move_to_end(order_id)
+        while len(self._cache) > self._cache_size:
+            self._cache.popitem(last=False)
+
+    def __contains__(self, order_id):
+        return not self.unprocessed([order_id])
+
+    def __len__(self):
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            row = self._db().execute(
+                "SELECT count(*) FROM processed_orders WHERE processed_at >= ?", (cutoff,)
+            ).fetchone()
+        return row[0]
+
+    def unprocessed(self, order_ids: list) -> set:
+        """Return the subset of order_ids that have not been processed (or whose entry expired)."""
+        cutoff = time.time() - self._ttl
+        pending = set()
+        with self._lock:
+            to_query = []
+            for order_id in order_ids:
+                processed_at = self._cache.get(order_id)
+                if processed_at is not None and processed_at >= cutoff:
+                    self._cache.move_to_end(order_id)
+                else:
+                    to_query.append(order_id)
+
+            # SQLite caps bound parameters per statement, so look up in chunks
+            for i in range(0, len(to_query), 500):
+                chunk = to_query[i:i + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._db().execute(
+                    f"SELECT order_id, processed_at FROM processed_orders "
+                    f"WHERE processed_at >= ? AND order_id IN ({placeholders})",
+                    (cutoff, *chunk),
+                ).fetchall()
+                found = dict(rows)
+                for order_id in chunk:
+                    if order_id in found:
+                        self._remember(order_id, found[order_id])
+                    else:
+                        self._cache.pop(order_id, None)
+                        pending.add(order_id)
+        return pending
+
+    def add(self, order_id: str):
+        now = time.time()
+        with self._lock:
+            self._db().execute(
+                "INSERT OR REPLACE INTO processed_orders (order_id, processed_at) VALUES (?, ?)",
+                (order_id, now),
+            )
+            self._remember(order_id, now)
+
+    def evict_expired(self) -> int:
+        """Delete entries older than the TTL. Returns how many were removed."""
+        cutoff = time.time() - self._ttl
+        with self._lock:
+            cursor = self._db().execute("DELETE FROM processed_orders WHERE processed_at < ?", (cutoff,))
+            for order_id in [k for k, v in self._cache.items() if v < cutoff]:
+                del self._cache[order_id]
+        return cursor.rowcount
+
+    def clear(self):
+        with self._lock:
+            self._db().execute("DELETE FROM processed_orders")
+            self._cache.clear()
@@ -0,0 +1,137 @@
+"""
+Deadline-driven order scheduler — a min-heap of next-check times.
+
+Orders well before their estimatedDelivery are polled rarely, orders close to
+or past it are polled often. Delivered/resolved orders are simply never
+rescheduled. Stale heap entries are skipped lazily on pop.
+
+Only the order id and ETA are kept per entry; callers re-fetch the full row
+when an order comes due, so memory stays small for large order books.
+"""
+import heapq
+import itertools
+import os
+import threading
+import time
+from datetime import datetime, timezone
+
+# Poll intervals by distance to the estimated delivery date
+CHECK_INTERVAL_FAR = int(os.getenv("SCHEDULE_FAR_SECONDS", "21600"))      # 3+ days before ETA
+CHECK_INTERVAL_NEAR = int(os.getenv("SCHEDULE_NEAR_SECONDS", "3600"))     # 1–3 days before ETA
+CHECK_INTERVAL_DUE = int(os.getenv("SCHEDULE_DUE_SECONDS", "600"))        # within a day of ETA
+CHECK_INTERVAL_LATE = int(os.getenv("SCHEDULE_LATE_SECONDS", "120"))      # past ETA / unknown ETA
+
+_DAY = 86400
+
+
+def _parse_eta(value) -> float:
+    """Return the end of the estimated delivery day as a UNIX timestamp, or None."""
+    if not value:
+        return None
+    try:
+        eta = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if eta.tzinfo is None:
+        eta = eta.replace(tzinfo=timezone.utc)
+    if len(str(value)) <= 10:
+        # Date-only ETA — the package is on time until the day is over
+        return eta.timestamp() + _DAY
+    return eta.timestamp()
+
+
+def next_check_delay(order: dict, now: float = None) -> int:
+    """How many seconds until this order deserves another tracking check."""
+    now = now if now is not None else time.time()
+    eta = _parse_eta(order.get("estimatedDelivery"))
+    if eta is None:
+        return CHECK_INTERVAL_LATE
+
+    remaining = eta - now
+    if remaining <= 0:
+        return CHECK_INTERVAL_LATE
+    if remaining <= _DAY:
+        return CHECK_INTERVAL_DUE
+    if remaining <= 3 * _DAY:
+        return CHECK_INTERVAL_NEAR
+    # Never sleep past the point where the order moves into the "near" band
+    return int(min(CHECK_INTERVAL_FAR, remaining - 3 * _DAY + 1))
+
+
+def _compact(order: dict) -> dict:
+    return {"orderId": order["orderId"], "estimatedDelivery": order.get("estimatedDelivery")}
+
+
+class OrderScheduler:
+    """Thread-safe priority queue of order checks keyed on next-check time."""
+
+    def __init__(self):
+        self._heap = []
+        self._entries = {}  # orderId → (due, {orderId, estimatedDelivery})
+        self._counter = itertools.count()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def __contains__(self, order_id):
+        with self._lock:
+            return order_id in self._entries
+
+    def schedule(self, order: dict, due: float = None):
+        """(Re)schedule an order. Without an explicit due time the ETA policy decides."""
+        now = time.time()
+        if due is None:
+            due = now + next_check_delay(order, now)
+        entry = _compact(order)
+        with self._lock:
+            self._entries[order["orderId"]] = (due, entry)
+            heapq.heappush(self._heap, (due, next(self._counter), order["orderId"]))
+
+    def refresh(self, order: dict):
+        """Update the stored row for a scheduled order without moving its deadline."""
+        with self._lock:
+            entry = self._entries.get(order["orderId"])
+            if entry:
+                self._entries[order["orderId"]] = (entry[0], _compact(order))
+
+    def postpone(self, order_id: str, due: float):
+        """Move a scheduled order's deadline to `due` (no-op if it isn't scheduled)."""
+        with self._lock:
+            entry = self._entries.get(order_id)
+            if entry is None:
+                return
+            self._entries[order_id] = (due, entry[1])
+            heapq.heappush(self._heap, (due, next(self._counter), order_id))
+
+    def discard(self, order_id: str):
+        with self._lock:
+            self._entries.pop(order_id, None)
+
+    def pop_due(self, now: float = None, limit: int = None) -> list:
+        """Remove and return the compact entries whose deadline has passed (oldest first)."""
+        now = now if now is not None else time.time()
+        due_orders = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now:
+                if limit is not None and len(due_orders) >= limit:
+                    break
+                due, _, order_id = heapq.heappop(self._heap)
+                entry = self._entries.get(order_id)
+                if entry is None or entry[0] != due:
+                    continue  # discarded or rescheduled since this entry was pushed
+                del self._entries[order_id]
+                due_orders.append(entry[1])
+        return due_orders
+
+    def next_due(self) -> float:
+        """Earliest pending deadline, or None when nothing is scheduled."""
+        with self._lock:
+            while self._heap:
+                due, _, order_id = self._heap[0]
+                entry = self._entries.get(order_id)
+                if entry is not None and entry[0] == due:
+                    return due
+                heapq.heappop(self._heap)
+        return None
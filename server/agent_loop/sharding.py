@@ -0,0 +1,155 @@
+"""
+Lease-based sharding for running the agent loop on several replicas.
+
+The order-id hash space is split into AGENT_LOOP_SHARDS contiguous ranges.
+Each worker process registers itself in Neo4j on every heartbeat, and its
+quota is the shard count divided by the number of live workers, rounded up,
+so together the workers always cover every range. A worker claims free or
+expired leases up to its quota, renews only the leases it holds, and hands
+back anything above quota when new workers join. If a worker dies, its
+registration and leases expire, the survivors' quotas grow and they take its
+ranges over on their next heartbeat.
+
+With AGENT_LOOP_SHARDS=0 (the default) sharding is off and every order
+belongs to this process.
+"""
+import math
+import os
+import random
+import socket
+import threading
+import uuid
+import zlib
+
+from server.neo4j_db.queries import (
+    register_loop_worker,
+    unregister_loop_worker,
+    renew_shard_leases,
+    get_free_shards,
+    try_acquire_shard_lease,
+    release_shard_lease,
+)
+
+AGENT_LOOP_SHARDS = int(os.getenv("AGENT_LOOP_SHARDS", "0"))
+LEASE_TTL_SECONDS = int(os.getenv("AGENT_LOOP_LEASE_TTL_SECONDS", "30"))
+
+
+def shard_for(order_id: str, total_shards: int) -> int:
+    """Map an order id onto one of total_shards contiguous ranges of the CRC32 space."""
+    return (zlib.crc32(order_id.encode("utf-8")) * total_shards) >> 32
+
+
+class ShardLeases:
+    """Tracks which shards this process owns and keeps their leases alive."""
+
+    def __init__(self, total_shards: int = AGENT_LOOP_SHARDS, ttl_seconds: int = LEASE_TTL_SECONDS):
+        self.total_shards = total_shards
+        self.ttl_seconds = ttl_seconds
+        self.owner = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        self.quota = total_shards
+        self._held = set()
+        self._in_use = lambda shard: False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.total_shards > 0
+
+    def held(self) -> set:
+        with self._lock:
+            return set(self._held)
+
+    def shard_of(self, order_id: str) -> int:
+        """The order's shard, or None when sharding is off."""
+        return shard_for(order_id, self.total_shards) if self.enabled else None
+
+    def lease_owner(self) -> str:
+        """Owner id resolution commits must check the lease against, or None when sharding is off."""
+        return self.owner if self.enabled else None
+
+    def owns(self, order_id: str) -> bool:
+        if not self.enabled:
+            return True
+        with self._lock:
+            return shard_for(order_id, self.total_shards) in self._held
+
+    def heartbeat(self) -> tuple:
+        """
+        Register as alive, renew held leases, release any above quota and
+        claim free ones up to it. Returns (gained, lost) shard sets.
+        """
+        live = self._call("register", register_loop_worker, self.owner, self.ttl_seconds)
+        if live is not None:
+            self.quota = math.ceil(self.total_shards / max(1, live))
+
+        held = self.held()
+        renewed = self._call("renew", renew_shard_leases, sorted(held), self.owner, self.ttl_seconds) if held else set()
+        lost = held - (renewed or set())
+        held -= lost
+
+        # Hand back whatever is above quota so newly joined workers can take it,
+        # but only once this process has no orders of that shard in flight
+        excess = len(held) - self.quota
+        idle = [shard for shard in sorted(held, reverse=True) if not self._in_use(shard)]
+        for shard in idle[:max(0, excess)]:
+            self._call("release", release_shard_lease, shard, self.owner)
+            held.discard(shard)
+            lost.add(shard)
+
+        gained = set()
+        if len(held) < self.quota:
+            free = self._call("scan", get_free_shards, self.total_shards) or []
+            # Shuffled so replicas booting together spread out
+            random.shuffle(free)
+            for shard in free:
+                if len(held) + len(gained) >= self.quota:
+                    break
+                if shard not in held and self._call("acquire", try_acquire_shard_lease, shard, self.owner,
+                                                    self.ttl_seconds):
+                    gained.add(shard)
+
+        with self._lock:
+            self._held = held | gained
+        return gained, lost
+
+    def _call(self, what: str, fn, *args):
+        try:
+            return fn(*args)
+        except Exception as e:
+            print(f"[Sharding] Lease {what} call failed: {e}")
+            return None
+
+    def start(self, on_change=None, in_use=None):
+        """
+        Run the heartbeat in a daemon thread. on_change(gained, lost) fires
+        when ownership moves; in_use(shard) is True while this process still
+        has orders of that shard in flight, which holds back its release.
+        """
+        if not self.enabled or self._thread is not None:
+            return
+        self._stop.clear()
+        if in_use is not None:
+            self._in_use = in_use
+
+        def _beat():
+            while not self._stop.is_set():
+                gained, lost = self.heartbeat()
+                if (gained or lost) and on_change:
+                    on_change(gained, lost)
+                self._stop.wait(self.ttl_seconds / 3)
+
+        self._thread = threading.Thread(target=_beat, daemon=True)
+        self._thread.start()
+        print(f"[Sharding] {self.owner} joined — {self.total_shards} shard(s)")
+
+    def stop(self):
+        """Stop heartbeating and hand our shards back."""
+        self._stop.set()
+        for shard in self.held():
+            self._call("release", release_shard_lease, shard, self.owner)
+        self._call("unregister", unregister_loop_worker, self.owner)
+        with self._lock:
+            self._held.clear()
+        self._thread = None
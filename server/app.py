@@ -5,7 +5,7 @@ Starts the server with:
   1. Neo4j connection + seed data
   2. Route registration
   3. WebSocket (socket.io)
-  4. Agent loop (60-second autonomous background thread)
+  4. Agent loop (deadline-driven autonomous background thread)
 """
 import os
 import sys
@@ -27,6 +27,8 @@ from server.neo4j_db.seed import seed_database
 from server.routes.chat import chat_bp
 from server.routes.trigger import trigger_bp
 from server.routes.graph import graph_bp
+from server.routes.metrics import metrics_bp
+from server.routes.webhooks import webhooks_bp
 from server.websocket.events import init_socketio
 from server.agent_loop.loop import start_agent_loop
 
@@ -40,6 +42,8 @@ socketio = SocketIO(app, cors_allowed_origins="*", async_mode="threading")
 app.register_blueprint(chat_bp)
 app.register_blueprint(trigger_bp)
 app.register_blueprint(graph_bp)
+app.register_blueprint(metrics_bp)
+app.register_blueprint(webhooks_bp)
 
 
 # ── Health check ───────────────────────────────────────────────
@@ -0,0 +1,131 @@
+"""
+Bounded TTL cache with stale-while-revalidate and singleflight loading.
+
+  - fresh entries (younger than ttl) are served directly
+  - stale entries (younger than ttl + stale_ttl) are served immediately while
+    one background refresh runs
+  - anything older is a miss; concurrent misses for a key share one load
+
+A caller that polls on its own schedule can pass max_age to get_fresh and
+get_or_load, so it never gets a value older than its polling interval
+(and is never served stale).
+
+Counters are kept for the /api/metrics endpoint.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from server.integrations.singleflight import SingleFlight
+
+
+class TTLCache:
+    def __init__(self, name: str, ttl: float, stale_ttl: float = 0, max_entries: int = 10000):
+        self.name = name
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key → (stored_at, value)
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+        self._refreshing = set()
+        self._stats = {"hits": 0, "staleHits": 0, "misses": 0, "coalesced": 0, "refreshes": 0}
+
+    def _count(self, counter: str):
+        with self._lock:
+            self._stats[counter] += 1
+
+    def _lookup(self, key):
+        """Return (age, value) for a cached key, or (None, None)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+            return time.monotonic() - entry[0], entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, key=None):
+        """Drop one key, or everything when key is None."""
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
+    def _fresh_for(self, max_age) -> float:
+        return self.ttl if max_age is None else min(self.ttl, max_age)
+
+    def get_fresh(self, key, max_age: float = None):
+        """Return the value only if it is still fresh (counts as a hit), else None."""
+        age, value = self._lookup(key)
+        if age is not None and age < self._fresh_for(max_age):
+            self._count("hits")
+            return value
+        return None
+
+    def peek(self, key):
+        """Return the value if still fresh, else None, without counting a hit or a miss."""
+        age, value = self._lookup(key)
+        return value if age is not None and age < self.ttl else None
+
+    def get(self, key):
+        """Return the value if still fresh, else None — counting a hit or a miss."""
+        value = self.get_fresh(key)
+        if value is None:
+            self._count("misses")
+        return value
+
+    def get_or_load(self, key, loader, max_age: float = None):
+        """Serve from cache when possible, otherwise load once for all concurrent callers."""
+        age, value = self._lookup(key)
+        if age is not None and age < self._fresh_for(max_age):
+            self._count("hits")
+            return value
+        if age is not None and max_age is None and age < self.ttl + self.stale_ttl:
+            self._count("staleHits")
+            self._refresh_in_background(key, loader)
+            return value
+
+        self._count("misses")
+        value, shared = self._flight.do(key, lambda: self._load(key, loader))
+        if shared:
+            self._count("coalesced")
+        return value
+
+    def _load(self, key, loader):
+        value = loader()
+        self.put(key, value)
+        return value
+
+    def _refresh_in_background(self, key, loader):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def _refresh():
+            try:
+                self._flight.do(key, lambda: self._load(key, loader))
+                self._count("refreshes")
+            except Exception as e:
+                print(f"[Cache] {self.name}: background refresh for {key!r} failed: {e}")
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        threading.Thread(target=_refresh, daemon=True).start()
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        lookups = stats["hits"] + stats["staleHits"] + stats["misses"]
+        stats["hitRate"] = round((stats["hits"] + stats["staleHits"]) / lookups, 4) if lookups else 0.0
+        return stats
@@ -0,0 +1,123 @@
+"""
+Circuit breaker for the Fastino LLM API.
+
+After FASTINO_BREAKER_FAILURES consecutive failed requests (connection
+errors, timeouts, 5xx) the circuit opens. While it is open, calls fail at
+once with CircuitOpenError instead of queueing and waiting out their
+timeouts, and the orchestrator answers from the rules or the fallback
+template. After FASTINO_BREAKER_RESET_SECONDS a single trial request is let
+through (half-open). If it succeeds the circuit closes again; if it fails the
+circuit stays open for another reset period.
+
+Any HTTP answer below 500 (a 429 included) means the provider is up. Those
+count as successes; rate limiting is the limiter's business.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from server.integrations.transport import TransportError
+
+FASTINO_BREAKER_FAILURES = int(os.getenv("FASTINO_BREAKER_FAILURES", "5"))
+FASTINO_BREAKER_RESET_SECONDS = float(os.getenv("FASTINO_BREAKER_RESET_SECONDS", "30"))
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+class CircuitOpenError(TransportError):
+    """The provider is failing; the call was not attempted."""
+
+
+class CircuitBreaker:
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_seconds = reset_seconds
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+        self._stats = {"opened": 0, "rejected": 0}
+
+    def _reject(self):
+        self._stats["rejected"] += 1
+        return CircuitOpenError(f"{self.name}: circuit open after {self._failures} consecutive failures")
+
+    def raise_if_open(self):
+        """Cheap pre-check before queueing for capacity: fail fast while the circuit is open and cooling down."""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at < self.reset_seconds:
+                raise self._reject()
+
+    def admit(self):
+        """Called right before a request. Raises CircuitOpenError, or lets one trial through once the reset period is over."""
+        with self._lock:
+            if self.state == CLOSED:
+                return
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.reset_seconds:
+                self.state = HALF_OPEN
+            if self.state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            raise self._reject()
+
+    def record(self, healthy: bool):
+        with self._lock:
+            self._trial_in_flight = False
+            if healthy:
+                if self.state != CLOSED:
+                    print(f"[{self.name}] Circuit closed — provider is answering again")
+                self.state = CLOSED
+                self._failures = 0
+                return
+            self._failures += 1
+            if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+                if self.state != OPEN:
+                    self._stats["opened"] += 1
+                    print(f"[{self.name}] Circuit open after {self._failures} consecutive failures — "
+                          f"failing fast for {self.reset_seconds:.0f}s")
+                self.state = OPEN
+                self._opened_at = time.monotonic()
+
+    def release(self):
+        """The request ended without saying anything about the provider (cancelled, local error)."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    @contextmanager
+    def guard(self, health):
+        """
+        Wrap one request: admit() first, then record how it went.
+        health(exc) maps an exception to True/False (provider up/failing) or None (no signal).
+        """
+        self.admit()
+        try:
+            yield
+        except BaseException as e:
+            healthy = health(e)
+            if healthy is None:
+                self.release()
+            else:
+                self.record(healthy)
+            raise
+        self.record(True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "state": self.state,
+                "consecutiveFailures": self._failures,
+                "failureThreshold": self.failure_threshold,
+                "resetSeconds": self.reset_seconds,
+                "opened": self._stats["opened"],
+                "rejected": self._stats["rejected"],
+            }
+
+
+fastino_breaker = CircuitBreaker("Fastino", FASTINO_BREAKER_FAILURES, FASTINO_BREAKER_RESET_SECONDS)
+
+
+def get_breaker_stats() -> dict:
+    return fastino_breaker.stats()
@@ -0,0 +1,138 @@
+"""
+Hedged requests for LLM tail latency (opt-in: FASTINO_HEDGE_ENABLED).
+
+If a request has not answered after the recent p95 latency
+(FASTINO_HEDGE_PERCENTILE, never less than FASTINO_HEDGE_MIN_DELAY_SECONDS),
+a second identical request is sent. Whichever answers first is used and the
+other is cancelled. Only the slowest few percent of calls get a second
+request, so the extra load stays around that size. There is no hedging until
+FASTINO_HEDGE_MIN_SAMPLES latencies have been seen.
+
+A streamed reply is raced on its first fragment instead: the attempt that
+starts streaming first claims the reply, and the other one is cancelled
+before it sends the customer anything.
+"""
+import asyncio
+import math
+import os
+import threading
+import time
+from collections import deque
+
+FASTINO_HEDGE_ENABLED = os.getenv("FASTINO_HEDGE_ENABLED", "false").lower() == "true"
+FASTINO_HEDGE_PERCENTILE = float(os.getenv("FASTINO_HEDGE_PERCENTILE", "95"))
+FASTINO_HEDGE_MIN_DELAY_SECONDS = float(os.getenv("FASTINO_HEDGE_MIN_DELAY_SECONDS", "0.5"))
+FASTINO_HEDGE_MIN_SAMPLES = int(os.getenv("FASTINO_HEDGE_MIN_SAMPLES", "20"))
+LATENCY_WINDOW = 200
+
+
+class Hedger:
+    """Tracks recent latencies and races a second attempt against the slow ones."""
+
+    def __init__(self, name: str, enabled: bool, percentile: float, min_delay: float, min_samples: int):
+        self.name = name
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "hedged": 0, "hedgeWins": 0}
+
+    def delay(self) -> float:
+        """Seconds to wait before hedging, or None when hedging is off or there is no history yet."""
+        with self._lock:
+            if not self.enabled or len(self._latencies) < self.min_samples:
+                return None
+            ordered = sorted(self._latencies)
+        # Nearest rank, so a single stall in a short history isn't taken as the p95
+        index = max(0, math.ceil(len(ordered) * self.percentile / 100) - 1)
+        return max(self.min_delay, ordered[index])
+
+    async def run(self, make_call):
+        """
+        make_call(claim) returns the coroutine for one attempt. An attempt that
+        is about to hand out output it can't take back (a streamed fragment)
+        calls claim() first, and must stop if it returns False.
+        """
+        tasks, starts = [], []
+        first_output = {}
+        winner = None
+
+        def claimer(i):
+            def claim():
+                nonlocal winner
+                if winner is None:
+                    winner = i
+                    first_output[i] = time.monotonic()
+                    for j, task in enumerate(tasks):
+                        if j != i:
+                            task.cancel()
+                return winner == i
+            return claim
+
+        def start():
+            starts.append(time.monotonic())
+            tasks.append(asyncio.ensure_future(make_call(claimer(len(tasks)))))
+
+        with self._lock:
+            self._stats["calls"] += 1
+        start()
+        try:
+            delay = self.delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done and winner is None:
+                    with self._lock:
+                        self._stats["hedged"] += 1
+                    start()
+            index, result = await _first_success(tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        with self._lock:
+            if index == 1:
+                self._stats["hedgeWins"] += 1
+            # Timed from the primary's start: a hedge win only tells us the primary took
+            # at least this long, and timing the hedge alone would drag the p95 down.
+            self._latencies.append(first_output.get(index, time.monotonic()) - starts[0])
+        return result
+
+    def stats(self) -> dict:
+        delay = self.delay()
+        with self._lock:
+            return {
+                **self._stats,
+                "enabled": self.enabled,
+                "hedgeDelayMs": round(delay * 1000, 1) if delay is not None else None,
+                "samples": len(self._latencies),
+            }
+
+
+async def _first_success(tasks: list) -> tuple:
+    """(index, result) of the first attempt to succeed; the first error if none does."""
+    pending, error = set(tasks), None
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            if task.cancelled():
+                continue
+            if task.exception() is None:
+                return tasks.index(task), task.result()
+            error = error or task.exception()
+    raise error or asyncio.CancelledError()
+
+
+def _hedger(name: str) -> Hedger:
+    return Hedger(name, FASTINO_HEDGE_ENABLED, FASTINO_HEDGE_PERCENTILE,
+                  FASTINO_HEDGE_MIN_DELAY_SECONDS, FASTINO_HEDGE_MIN_SAMPLES)
+
+
+# Whole-reply latency for plain calls, time to first fragment for streams
+fastino_hedger = _hedger("fastino")
+fastino_stream_hedger = _hedger("fastino-stream")
+
+
+def get_hedging_stats() -> dict:
+    return {"calls": fastino_hedger.stats(), "streams": fastino_stream_hedger.stats()}
@@ -0,0 +1,97 @@
+"""
+Priority lanes for shared upstream capacity.
+
+Live customer chats, post-call voice analysis and the proactive agent loop
+all draw on the same Fastino, Shopify and Yutori capacity. Every call runs in
+a lane — set with `with lane("chat"):` around the work, proactive when
+nothing says otherwise — and whenever capacity frees up it goes to the
+highest-priority lane that is waiting (strict priority: chat, then voice,
+then proactive).
+
+Each lane may also hold at most its share of an integration's capacity
+(LANE_SHARE_*), so a backlog of proactive alerts always leaves room for a
+chat that arrives a moment later.
+"""
+import contextvars
+import os
+from contextlib import contextmanager
+
+LANES = ("chat", "voice", "proactive")  # highest priority first
+
+LANE_SHARES = {
+    "chat": float(os.getenv("LANE_SHARE_CHAT", "1.0")),
+    "voice": float(os.getenv("LANE_SHARE_VOICE", "0.5")),
+    "proactive": float(os.getenv("LANE_SHARE_PROACTIVE", "0.75")),
+}
+
+_current = contextvars.ContextVar("lane", default="proactive")
+
+
+def current_lane() -> str:
+    return _current.get()
+
+
+@contextmanager
+def lane(name: str):
+    """Run the block's upstream calls in lane `name`. Follows the work through run_sync and asyncio tasks."""
+    if name not in LANES:
+        raise ValueError(f"Unknown lane {name!r}")
+    token = _current.set(name)
+    try:
+        yield
+    finally:
+        _current.reset(token)
+
+
+async def run_in_lane(name: str, coro):
+    """Await coro in lane `name` (for gathering calls that belong to different lanes)."""
+    with lane(name):
+        return await coro
+
+
+class LaneGate:
+    """
+    Decides which lane gets the next free unit of some capacity. Not locked
+    itself: the owner calls it while holding its own lock.
+    """
+
+    def __init__(self):
+        self.waiting = dict.fromkeys(LANES, 0)
+        self.in_flight = dict.fromkeys(LANES, 0)
+        self._granted = dict.fromkeys(LANES, 0)
+        self._wait_seconds = dict.fromkeys(LANES, 0.0)
+
+    @staticmethod
+    def cap(name: str, limit: int) -> int:
+        # Rounded down, so even a two-slot pool keeps one slot back from a capped lane
+        return max(1, int(LANE_SHARES[name] * limit))
+
+    def admits(self, name: str, limit: int) -> bool:
+        """True when `name` may take a unit now, given `limit` units in total."""
+        if self.in_flight[name] >= self.cap(name, limit):
+            return False
+        # A higher lane that is waiting and could run goes first
+        for higher in LANES[:LANES.index(name)]:
+            if self.waiting[higher] and self.in_flight[higher] < self.cap(higher, limit):
+                return False
+        return True
+
+    def grant(self, name: str, waited: float):
+        self.in_flight[name] += 1
+        self._granted[name] += 1
+        self._wait_seconds[name] += waited
+
+    def release(self, name: str):
+        self.in_flight[name] -= 1
+
+    def stats(self) -> dict:
+        return {
+            name: {
+                "inFlight": self.in_flight[name],
+                "waiting": self.waiting[name],
+                "granted": self._granted[name],
+                "avgWaitMs": round(self._wait_seconds[name] / self._granted[name] * 1000, 1)
+                if self._granted[name] else 0,
+            }
+            for name in LANES
+        }
@@ -0,0 +1,79 @@
+"""
+Per-integration in-flight caps.
+
+Every outbound call to a rate-limited upstream (Yutori, Fastino, Shopify) runs
+inside integration_slot(name), so a wide agent-loop worker pool cannot
+flood any single provider. Caps come from env vars and default to a few calls each.
+Fastino calls go through the adaptive limiter in rate_limit.py instead, which
+starts from the Fastino cap here and adjusts it to the provider's 429s.
+Waiting calls are served by priority lane (see lanes.py): a customer chat's
+Shopify credit goes ahead of the proactive loop's queued ones.
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from server.integrations.lanes import LaneGate, current_lane
+
+INTEGRATION_LIMITS = {
+    "yutori": int(os.getenv("YUTORI_MAX_IN_FLIGHT", "4")),
+    "fastino": int(os.getenv("FASTINO_MAX_IN_FLIGHT", "4")),
+    "shopify": int(os.getenv("SHOPIFY_MAX_IN_FLIGHT", "2")),
+}
+
+
+class _Slots:
+    """A counting semaphore whose free slots go to the highest-priority waiting lane."""
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_flight = 0
+        self.cond = threading.Condition()
+        self.lanes = LaneGate()
+
+    def try_acquire(self, lane: str, started: float) -> bool:
+        """Take a slot for lane if one is free and no higher lane is waiting. Caller holds cond."""
+        if self.in_flight >= self.limit or not self.lanes.admits(lane, self.limit):
+            return False
+        self.in_flight += 1
+        self.lanes.grant(lane, time.monotonic() - started)
+        return True
+
+    def release(self, lane: str):
+        with self.cond:
+            self.in_flight -= 1
+            self.lanes.release(lane)
+            self.cond.notify_all()
+
+
+_slots = {name: _Slots(limit) for name, limit in INTEGRATION_LIMITS.items()}
+
+
+@contextmanager
+def integration_slot(name: str):
+    """Hold one of the in-flight slots for an integration, in the current lane, while the block runs."""
+    slots, lane = _slots[name], current_lane()
+    started = time.monotonic()
+    with slots.cond:
+        slots.lanes.waiting[lane] += 1
+        try:
+            while not slots.try_acquire(lane, started):
+                slots.cond.wait()
+        finally:
+            slots.lanes.waiting[lane] -= 1
+            # Lower lanes yield to waiting higher ones; wake them now this waiter is gone.
+            slots.cond.notify_all()
+    try:
+        yield
+    finally:
+        slots.release(lane)
+
+
+def get_lane_stats() -> dict:
+    """Per-lane in-flight, waiting and queueing time for each capped integration."""
+    stats = {}
+    for name, slots in _slots.items():
+        with slots.cond:
+            stats[name] = {"limit": slots.limit, "inFlight": slots.in_flight, "lanes": slots.lanes.stats()}
+    return stats
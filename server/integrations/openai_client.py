@@ -1,15 +1,44 @@
 """
 Fastino (Pioneer AI) LLM client — uses Qwen3-32B via REST API.
-Simple requests-based client, no special SDK needed.
+Plain REST client, no special SDK needed, on the shared async transport;
+call_llm is a blocking wrapper around call_llm_async, so there is one copy
+of the limiter, breaker, coalescing and retry policy. call_llm_stream_async
+streams the reply and hands out the "message" field as it is generated, for
+the customer chat.
+
+Every call goes through the adaptive limiter in rate_limit.py: 429s shrink
+the concurrency cap and pause callers for Retry-After, and a call queues
+until its deadline rather than failing after a fixed number of 429s.
+Connection errors are still retried up to max_retries with jittered backoff.
+
+A circuit breaker (circuit_breaker.py) fails calls fast while Fastino is
+down, so the orchestrator can answer from its fallback instead of holding a
+worker through timeouts and retries, and async calls can be hedged against
+tail latency (hedging.py, opt-in).
+
+Identical requests that are in flight at the same time (a double-submitted
+chat, the agent loop and /api/trigger-delay on the same order) are coalesced:
+callers with the same model and prompts share one upstream call, and each
+gets its own copy of the parsed decision.
 """
+import asyncio
+import copy
+import hashlib
 import os
 import json
-import time
-import requests
+import random
+import re
+from server.integrations.circuit_breaker import fastino_breaker, CircuitOpenError
+from server.integrations.hedging import fastino_hedger, fastino_stream_hedger
+from server.integrations.rate_limit import fastino_limiter, call_deadline, RateLimitTimeout
+from server.integrations.singleflight import SingleFlight
+from server.integrations.transport import post_json, stream_lines, run_sync, TransportError, HTTPStatusError
 
 FASTINO_URL = "https://api.pioneer.ai/inference"
 MODEL_ID = os.getenv("FASTINO_MODEL", "base:Qwen/Qwen3-32B")
 
+_flights = SingleFlight()
+
 
 def _get_api_key():
     key = os.getenv("FASTINO_API_KEY")
@@ -18,15 +47,8 @@ def _get_api_key():
     return key
 
 
-def call_llm(system_prompt: str, user_message: str, max_retries: int = 3) -> dict:
-    """
-    Call Fastino API with a system prompt and user message.
-    Expects the model to return valid JSON matching the orchestrator schema.
-    Includes retry logic for transient errors.
-    Returns parsed dict.
-    """
-    api_key = _get_api_key()
-
+def _build_request(system_prompt: str, user_message: str) -> tuple:
+    """Return (headers, payload) for a Fastino generate call."""
     payload = {
         "model_id": MODEL_ID,
         "task": "generate",
@@ -39,51 +61,262 @@ def call_llm(system_prompt: str, user_message: str, max_retries: int = 3) -> dic
 
     headers = {
         "Content-Type": "application/json",
-        "X-API-Key": api_key,
+        "X-API-Key": _get_api_key(),
+    }
+    return headers, payload
+
+
+def _parse_decision(data: dict) -> dict:
+    """Turn a Fastino response body into the orchestrator's decision dict."""
+    # Extract the assistant message content from the response
+    # Pioneer AI typically returns in OpenAI-compatible format
+    raw_text = _extract_content(data)
+
+    # Parse JSON from the response
+    # The model might wrap JSON in markdown code blocks, so handle that
+    cleaned = _clean_json_response(raw_text)
+
+    try:
+        return json.loads(cleaned)
+    except json.JSONDecodeError:
+        return {
+            "action": "send_message",
+            "message": raw_text,
+            "creditAmount": 0,
+            "requiresHumanReview": False,
+            "reasoning": "LLM response was not valid JSON; returning raw text.",
+        }
+
+
+def _provider_health(e: BaseException):
+    """What a failed request says about Fastino: False = failing, True = up (it answered), None = nothing."""
+    if isinstance(e, HTTPStatusError):
+        return e.status_code < 500
+    if isinstance(e, TransportError):
+        return False
+    return None
+
+
+def _retry_wait(attempt: int, max_retries: int) -> float:
+    """Full-jitter backoff before retrying after attempt `attempt`; None when out of attempts."""
+    if attempt >= max_retries - 1:
+        return None
+    return random.uniform(0, 2 ** attempt)
+
+
+def _flight_key(system_prompt: str, user_message: str, stream: bool = False) -> str:
+    """Requests with the same key would send Fastino the same payload."""
+    return hashlib.sha256(json.dumps([MODEL_ID, system_prompt, user_message, stream]).encode()).hexdigest()
+
+
+def get_coalescing_stats() -> dict:
+    stats = _flights.stats()
+    calls, saved = stats["calls"], stats["shared"]
+    return {
+        "calls": calls,
+        "upstreamCalls": calls - saved,
+        "savedCalls": saved,
+        "savedRate": round(saved / calls, 3) if calls else 0,
+        "inFlight": stats["inFlight"],
     }
 
-    for attempt in range(max_retries):
+
+def call_llm(system_prompt: str, user_message: str, max_retries: int = 3) -> dict:
+    """
+    Call Fastino API with a system prompt and user message.
+    Expects the model to return valid JSON matching the orchestrator schema.
+    Blocking call_llm_async — runs it on the shared async transport loop.
+    Returns parsed dict.
+    """
+    return run_sync(call_llm_async(system_prompt, user_message, max_retries))
+
+
+async def call_llm_async(system_prompt: str, user_message: str, max_retries: int = 3) -> dict:
+    """Async Fastino call with retries; concurrent identical requests share one upstream call."""
+    decision, _ = await _flights.do_async(
+        _flight_key(system_prompt, user_message),
+        lambda: _call_llm_async(system_prompt, user_message, max_retries),
+    )
+    return copy.deepcopy(decision)  # callers mutate their decision
+
+
+async def _call_llm_async(system_prompt: str, user_message: str, max_retries: int) -> dict:
+    headers, payload = _build_request(system_prompt, user_message)
+    deadline = call_deadline()
+
+    async def request(claim):
+        async with fastino_limiter.async_slot(deadline):
+            with fastino_breaker.guard(_provider_health):
+                return await post_json(FASTINO_URL, headers=headers, payload=payload, timeout=60)
+
+    attempt = 0
+    while True:
         try:
-            resp = requests.post(FASTINO_URL, headers=headers, json=payload, timeout=60)
-            resp.raise_for_status()
-
-            data = resp.json()
-
-            # Extract the assistant message content from the response
-            # Pioneer AI typically returns in OpenAI-compatible format
-            raw_text = _extract_content(data)
-
-            # Parse JSON from the response
-            # The model might wrap JSON in markdown code blocks, so handle that
-            cleaned = _clean_json_response(raw_text)
-
-            try:
-                return json.loads(cleaned)
-            except json.JSONDecodeError:
-                return {
-                    "action": "send_message",
-                    "message": raw_text,
-                    "creditAmount": 0,
-                    "requiresHumanReview": False,
-                    "reasoning": "LLM response was not valid JSON; returning raw text.",
-                }
-
-        except requests.exceptions.HTTPError as e:
-            status = e.response.status_code if e.response else 0
-            if status == 429 and attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"[Fastino] Rate limited (429), retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
-                continue
-            else:
+            fastino_breaker.raise_if_open()
+            data = await fastino_hedger.run(request)
+            fastino_limiter.on_success()
+            return _parse_decision(data)
+
+        except TransportError as e:
+            attempt = await _next_attempt(e, attempt, max_retries)
+            if attempt is None:
                 raise
-        except requests.exceptions.RequestException as e:
-            if attempt < max_retries - 1:
-                wait_time = 2 ** attempt
-                print(f"[Fastino] Request error, retrying in {wait_time}s... (attempt {attempt + 1}/{max_retries})")
-                time.sleep(wait_time)
+
+
+async def _next_attempt(e: TransportError, attempt: int, max_retries: int) -> int:
+    """
+    Retry policy shared by the async calls: returns the attempt number to
+    retry with (a 429 doesn't use one up; the limiter paces it), or None to
+    give up.
+    """
+    if isinstance(e, HTTPStatusError) and e.status_code == 429:
+        fastino_limiter.on_rate_limited(e.retry_after)
+        print("[Fastino] Rate limited (429), queueing behind the limiter...")
+        return attempt
+    if isinstance(e, (RateLimitTimeout, CircuitOpenError, HTTPStatusError)):
+        return None
+    wait_time = _retry_wait(attempt, max_retries)
+    if wait_time is None:
+        return None
+    print(f"[Fastino] Request error, retrying in {wait_time:.1f}s... (attempt {attempt + 1}/{max_retries})")
+    await asyncio.sleep(wait_time)
+    return attempt + 1
+
+
+class _MessageStream:
+    """
+    Pulls the "message" string out of the JSON decision while the model is
+    still generating it. feed() takes the next chunk of raw text and returns
+    the newly decoded part of the message (possibly "").
+    """
+
+    _START = re.compile(r'"message"\s*:\s*"')
+    _ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "b": "\b", "f": "\f", '"': '"', "\\": "\\", "/": "/"}
+
+    def __init__(self):
+        self.text = ""
+        self._pos = None  # next unread index inside the message value
+        self._done = False
+
+    def feed(self, chunk: str) -> str:
+        self.text += chunk
+        if self._done:
+            return ""
+        if self._pos is None:
+            start = 0
+            if "<think>" in self.text:  # Qwen3 reasoning comes before the JSON
+                end = self.text.find("</think>")
+                if end == -1:
+                    return ""
+                start = end + len("</think>")
+            match = self._START.search(self.text, start)
+            if not match:
+                return ""
+            self._pos = match.end()
+
+        out = []
+        text, i = self.text, self._pos
+        while i < len(text):
+            ch = text[i]
+            if ch == '"':
+                self._done = True
+                i += 1
+                break
+            if ch != "\\":
+                out.append(ch)
+                i += 1
                 continue
-            else:
+            if i + 1 >= len(text):
+                break  # escape split across chunks
+            esc = text[i + 1]
+            if esc == "u":
+                if i + 6 > len(text):
+                    break
+                try:
+                    out.append(chr(int(text[i + 2:i + 6], 16)))
+                except ValueError:
+                    pass
+                i += 6
+                continue
+            out.append(self._ESCAPES.get(esc, esc))
+            i += 2
+        self._pos = i
+        return "".join(out)
+
+
+def _stream_delta(event: dict) -> str:
+    """Text carried by one streamed event (OpenAI-compatible or Fastino shape)."""
+    choices = event.get("choices")
+    if choices:
+        choice = choices[0]
+        return (choice.get("delta") or {}).get("content") or choice.get("text") or ""
+    return event.get("completion") or event.get("content") or event.get("output") or ""
+
+
+async def call_llm_stream_async(system_prompt: str, user_message: str, on_message, max_retries: int = 3) -> dict:
+    """
+    Streaming call_llm_async. on_message(fragment) is called with each new
+    piece of the decision's "message" field as tokens arrive; the full
+    decision (action, credit, ...) is parsed once the stream ends. Retries
+    only while nothing has been streamed yet. A duplicate that joins while
+    the reply is streaming gets the text so far, then the rest as it arrives.
+    """
+    decision, _ = await _flights.do_async(
+        _flight_key(system_prompt, user_message, stream=True),
+        lambda publish: _call_llm_stream_async(system_prompt, user_message, publish, max_retries),
+        on_message=on_message,
+    )
+    return copy.deepcopy(decision)  # callers mutate their decision
+
+
+async def _call_llm_stream_async(system_prompt: str, user_message: str, on_message, max_retries: int) -> dict:
+    headers, payload = _build_request(system_prompt, user_message)
+    payload["stream"] = True
+
+    deadline = call_deadline()
+    streamed = False
+
+    def send(fragment: str, claim):
+        nonlocal streamed
+        if not claim():
+            raise asyncio.CancelledError()  # the hedge's other attempt is already streaming
+        streamed = True
+        on_message(fragment)
+
+    async def request(claim):
+        stream = _MessageStream()
+        body = []  # an upstream that ignores "stream" answers with plain JSON
+        async with fastino_limiter.async_slot(deadline):
+            with fastino_breaker.guard(_provider_health):
+                async for line in stream_lines(FASTINO_URL, headers=headers, payload=payload, timeout=60):
+                    if not line.startswith("data:"):
+                        body.append(line)
+                        continue
+                    data = line[len("data:"):].strip()
+                    if not data or data == "[DONE]":
+                        continue
+                    fragment = stream.feed(_stream_delta(json.loads(data)))
+                    if fragment:
+                        send(fragment, claim)
+        if not stream.text and body:
+            fragment = stream.feed(_extract_content(json.loads("\n".join(body))))
+            if fragment:
+                send(fragment, claim)
+        return stream.text
+
+    attempt = 0
+    while True:
+        try:
+            fastino_breaker.raise_if_open()
+            text = await fastino_stream_hedger.run(request)
+            fastino_limiter.on_success()
+            return _parse_decision({"completion": text})
+
+        except TransportError as e:
+            if streamed:
+                raise
+            attempt = await _next_attempt(e, attempt, max_retries)
+            if attempt is None:
                 raise
 
 
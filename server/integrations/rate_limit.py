@@ -0,0 +1,237 @@
+"""
+Adaptive client-side rate limiting for the Fastino LLM API.
+
+Each call takes a token from a token bucket (FASTINO_RATE_PER_SECOND,
+bursting to FASTINO_BURST) and a slot under an adaptive concurrency cap.
+The cap follows AIMD: it grows by about one per cap's worth of successful
+calls, up to FASTINO_MAX_CONCURRENCY, and halves on a 429. A 429 also pauses
+every caller until its Retry-After has passed, and each waiter adds its own
+jitter so they do not all retry in the same instant. That keeps throughput
+just under the provider's limit.
+
+Callers queue instead of failing: a call waits until its deadline
+(FASTINO_QUEUE_TIMEOUT_SECONDS from when it started) and only then raises
+RateLimitTimeout. Queued calls are served by priority lane (see lanes.py), so
+a customer chat never waits behind a backlog of proactive alerts.
+"""
+import asyncio
+import math
+import os
+import random
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from email.utils import parsedate_to_datetime
+
+from server.integrations.lanes import LaneGate, current_lane
+from server.integrations.limits import INTEGRATION_LIMITS
+from server.integrations.transport import TransportError
+
+FASTINO_RATE_PER_SECOND = float(os.getenv("FASTINO_RATE_PER_SECOND", "5"))
+FASTINO_BURST = int(os.getenv("FASTINO_BURST", "10"))
+FASTINO_MAX_CONCURRENCY = int(os.getenv("FASTINO_MAX_CONCURRENCY", "16"))
+FASTINO_QUEUE_TIMEOUT_SECONDS = float(os.getenv("FASTINO_QUEUE_TIMEOUT_SECONDS", "30"))
+# Pause after a 429 that came without a Retry-After header
+DEFAULT_RETRY_AFTER_SECONDS = 1.0
+RETRY_JITTER_SECONDS = 0.5
+
+
+class RateLimitTimeout(TransportError):
+    """No capacity became free before the caller's deadline."""
+
+
+def retry_after_seconds(value) -> float:
+    """Parse a Retry-After header (delta-seconds or HTTP date). None when absent or invalid."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class AdaptiveLimiter:
+    """Token bucket + AIMD concurrency cap, usable from threads and from the event loop."""
+
+    def __init__(self, name: str, rate: float, burst: int, initial_limit: int, max_limit: int):
+        self.name = name
+        self.rate = rate
+        self.burst = burst
+        self.max_limit = max_limit
+        self._limit = float(min(initial_limit, max_limit))
+        self._tokens = float(burst)
+        self._refilled_at = time.monotonic()
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+        self._in_flight = 0
+        self._waiting = 0
+        self._cond = threading.Condition()
+        # (event loop, future) per waiting coroutine; resolved by _notify
+        self._async_waiters = []
+        self.lanes = LaneGate()
+        self._stats = {"calls": 0, "rateLimited": 0, "timeouts": 0, "waitSeconds": 0.0}
+
+    def _try_acquire(self, lane: str) -> float:
+        """Take a token and a slot for lane. Returns 0 on success, else how long to wait before retrying."""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+        if now < self._paused_until:
+            return self._paused_until - now + random.uniform(0, RETRY_JITTER_SECONDS)
+        if self._in_flight >= int(self._limit) or not self.lanes.admits(lane, int(self._limit)):
+            return math.inf  # until _notify: a slot frees up, the cap grows or a lane stops waiting
+        if self._tokens < 1:
+            return (1 - self._tokens) / self.rate
+        self._tokens -= 1
+        self._in_flight += 1
+        return 0
+
+    def _timed_out(self):
+        self._stats["timeouts"] += 1
+        return RateLimitTimeout(f"{self.name}: no capacity within the queue deadline")
+
+    def _acquired(self, lane: str, started: float):
+        waited = time.monotonic() - started
+        self._stats["calls"] += 1
+        self._stats["waitSeconds"] += waited
+        self.lanes.grant(lane, waited)
+
+    def _notify(self):
+        """Wake every waiter, threads and coroutines alike. Caller holds _cond."""
+        self._cond.notify_all()
+        waiters, self._async_waiters = self._async_waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_wake, future)
+
+    def _release(self, lane: str):
+        with self._cond:
+            self._in_flight -= 1
+            self.lanes.release(lane)
+            # Wake everyone: which waiter may go next depends on its lane
+            self._notify()
+
+    @contextmanager
+    def slot(self, deadline: float):
+        """Hold capacity for one call in the current lane; waits up to the monotonic `deadline`."""
+        lane = current_lane()
+        started = time.monotonic()
+        with self._cond:
+            self._waiting += 1
+            self.lanes.waiting[lane] += 1
+            try:
+                while True:
+                    wait = self._try_acquire(lane)
+                    if not wait:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    self._cond.wait(min(wait, remaining))
+            finally:
+                self._waiting -= 1
+                self.lanes.waiting[lane] -= 1
+                # Lower lanes held back for this one may go now
+                self._notify()
+            self._acquired(lane, started)
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    @asynccontextmanager
+    async def async_slot(self, deadline: float):
+        """Async form of slot() — waits on the event loop, not a thread."""
+        lane = current_lane()
+        started = time.monotonic()
+        loop = asyncio.get_running_loop()
+        with self._cond:
+            self._waiting += 1
+            self.lanes.waiting[lane] += 1
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_acquire(lane)
+                    if not wait:
+                        self._acquired(lane, started)
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out()
+                    # Registered under the lock, so a release can't slip in before we wait
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                await asyncio.wait((woken,), timeout=min(wait, remaining))
+                if not woken.done():
+                    with self._cond:
+                        self._async_waiters.remove((loop, woken))
+        finally:
+            with self._cond:
+                self._waiting -= 1
+                self.lanes.waiting[lane] -= 1
+                self._notify()
+        try:
+            yield
+        finally:
+            self._release(lane)
+
+    def on_success(self):
+        """Additive increase: about +1 to the cap per cap's worth of successful calls."""
+        with self._cond:
+            self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+            self._notify()
+
+    def on_rate_limited(self, retry_after: str = None):
+        """Multiplicative decrease, and pause everyone until Retry-After has passed."""
+        now = time.monotonic()
+        pause = retry_after_seconds(retry_after)
+        with self._cond:
+            self._stats["rateLimited"] += 1
+            self._paused_until = max(self._paused_until, now + (pause if pause is not None else DEFAULT_RETRY_AFTER_SECONDS))
+            # A burst of 429s from the same wave of requests counts as one signal
+            if now - self._last_decrease >= 1.0:
+                self._limit = max(1.0, self._limit / 2)
+                self._last_decrease = now
+
+    def stats(self) -> dict:
+        with self._cond:
+            calls = self._stats["calls"]
+            return {
+                "concurrencyLimit": int(self._limit),
+                "inFlight": self._in_flight,
+                "waiting": self._waiting,
+                "ratePerSecond": self.rate,
+                "tokens": round(self._tokens, 2),
+                "paused": time.monotonic() < self._paused_until,
+                "calls": calls,
+                "rateLimited": self._stats["rateLimited"],
+                "queueTimeouts": self._stats["timeouts"],
+                "avgQueueMs": round(self._stats["waitSeconds"] / calls * 1000, 1) if calls else 0,
+                "lanes": self.lanes.stats(),
+            }
+
+
+def _wake(future: asyncio.Future):
+    if not future.done():
+        future.set_result(None)
+
+
+fastino_limiter = AdaptiveLimiter(
+    "fastino",
+    rate=FASTINO_RATE_PER_SECOND,
+    burst=FASTINO_BURST,
+    initial_limit=INTEGRATION_LIMITS["fastino"],
+    max_limit=FASTINO_MAX_CONCURRENCY,
+)
+
+
+def call_deadline() -> float:
+    """Monotonic deadline for one LLM call, queueing and retries included."""
+    return time.monotonic() + FASTINO_QUEUE_TIMEOUT_SECONDS
+
+
+def get_limiter_stats() -> dict:
+    return fastino_limiter.stats()
@@ -4,9 +4,12 @@ VIP multiplier, and brand voice rules.
 
 Uses the Senso CLI (installed via npx) if SENSO_API_KEY is available.
 """
+import asyncio
+import hashlib
 import os
 import json
 import subprocess
+import threading
 
 # ── Local policy data (mirrors what Senso KB would return) ─────
 KNOWLEDGE_BASE = {
@@ -24,18 +27,58 @@ KNOWLEDGE_BASE = {
 }
 
 
+# Last Senso answer per (delay bucket, tier), to notice when the KB changes under us
+_last_answers = {}
+_answers_lock = threading.Lock()
+_policy_listeners = []
+
+
+def on_policy_change(callback):
+    """Register callback() to run whenever Senso starts answering differently for a policy it answered before."""
+    _policy_listeners.append(callback)
+
+
+def _note_answer(delay_days: int, customer_tier: str, answer: str):
+    key = (delay_bucket(delay_days), customer_tier)
+    with _answers_lock:
+        previous = _last_answers.get(key)
+        _last_answers[key] = answer
+    if previous is not None and previous != answer:
+        print(f"[Senso] Policy answer changed for {key[1]} / {key[0]} — dropping memoized decisions")
+        for callback in _policy_listeners:
+            callback()
+
+
+def policy_version() -> str:
+    """
+    Fingerprint of the policy rules in force: the local knowledge base plus
+    SENSO_POLICY_VERSION, which operators bump after editing the Senso KB.
+    Anything memoized on top of a policy should key on this.
+    """
+    kb = json.dumps(KNOWLEDGE_BASE, sort_keys=True)
+    return hashlib.sha1(f"{kb}|{os.getenv('SENSO_POLICY_VERSION', '')}".encode("utf-8")).hexdigest()[:12]
+
+
+def delay_bucket(delay_days: int) -> str:
+    """The delay_policies band a delay falls into ("on_time" when not late)."""
+    if delay_days <= 0:
+        return "on_time"
+    if delay_days <= 2:
+        return "1_2_days_late"
+    if delay_days <= 5:
+        return "3_5_days_late"
+    return "6_plus_days_late"
+
+
 def _get_local_policy(delay_days: int, customer_tier: str) -> dict:
     policies = KNOWLEDGE_BASE["delay_policies"]
     vip_mult = KNOWLEDGE_BASE["vip_multiplier"]
 
-    if delay_days <= 0:
+    bucket = delay_bucket(delay_days)
+    if bucket == "on_time":
         base = {"action": "no_action_needed", "credit": 0}
-    elif delay_days <= 2:
-        base = policies["1_2_days_late"]
-    elif delay_days <= 5:
-        base = policies["3_5_days_late"]
     else:
-        base = policies["6_plus_days_late"]
+        base = policies[bucket]
 
     credit = base["credit"]
     if customer_tier == "vip" and credit > 0:
@@ -50,6 +93,33 @@ def _get_local_policy(delay_days: int, customer_tier: str) -> dict:
     }
 
 
+def _cli_command(delay_days: int, customer_tier: str) -> list:
+    query = f"What is our refund policy and recommended credit amount for a package that is {delay_days} days late for a {customer_tier} customer?"
+    return ["npx", "--yes", "@senso-ai/cli", "search", query, "--output", "json", "--quiet"]
+
+
+def _policy_from_cli_output(stdout: str, delay_days: int, customer_tier: str) -> dict:
+    data = json.loads(stdout)
+
+    answer = data.get("answer", "")
+    # If Senso had no answer or KB was empty, fallback
+    if not answer or "No results found" in answer:
+        print("[Senso] No KB results found for query, using fallback.")
+        return _get_local_policy(delay_days, customer_tier)
+
+    # We got an answer from Senso.
+    # Since Senso returns a free-text AI answer, we'll embed it into the policy dict
+    # and let the orchestrator prompt use 'senso_answer' directly if we want,
+    # but for compatibility with our UI (which shows $ credit), we'll gracefully fallback
+    # for structured fields while injecting the textual voice.
+
+    _note_answer(delay_days, customer_tier, answer)
+    fallback = _get_local_policy(delay_days, customer_tier)
+    fallback["brand_voice"] = answer  # Use Senso's response as policy guidance
+    fallback["policy_source"] = "senso_api"
+    return fallback
+
+
 def get_policy(delay_days: int, customer_tier: str) -> dict:
     """
     Look up the applicable compensation policy based on delay duration
@@ -61,12 +131,11 @@ def get_policy(delay_days: int, customer_tier: str) -> dict:
 
     # We have an API key, so we try the CLI
     try:
-        query = f"What is our refund policy and recommended credit amount for a package that is {delay_days} days late for a {customer_tier} customer?"
         # The CLI relies on the API key being in the environment
         env = os.environ.copy()
         
         result = subprocess.run(
-            ["npx", "--yes", "@senso-ai/cli", "search", query, "--output", "json", "--quiet"],
+            _cli_command(delay_days, customer_tier),
             capture_output=True,
             text=True,
             timeout=15,
@@ -74,28 +143,41 @@ def get_policy(delay_days: int, customer_tier: str) -> dict:
             env=env,
             shell=True if os.name == 'nt' else False
         )
-        data = json.loads(result.stdout)
-        
-        answer = data.get("answer", "")
-        # If Senso had no answer or KB was empty, fallback
-        if not answer or "No results found" in answer:
-            print("[Senso] No KB results found for query, using fallback.")
-            return _get_local_policy(delay_days, customer_tier)
-            
-        # We got an answer from Senso.
-        # Since Senso returns a free-text AI answer, we'll embed it into the policy dict
-        # and let the orchestrator prompt use 'senso_answer' directly if we want,
-        # but for compatibility with our UI (which shows $ credit), we'll gracefully fallback
-        # for structured fields while injecting the textual voice.
-        
-        fallback = _get_local_policy(delay_days, customer_tier)
-        fallback["brand_voice"] = answer  # Use Senso's response as policy guidance
-        fallback["policy_source"] = "senso_api"
-        return fallback
+        return _policy_from_cli_output(result.stdout, delay_days, customer_tier)
+
+    except Exception as e:
+        print(f"[Senso] CLI error: {e}. Falling back to local policy.")
+        return _get_local_policy(delay_days, customer_tier)
+
+
+async def get_policy_async(delay_days: int, customer_tier: str) -> dict:
+    """Async get_policy — runs the Senso CLI as an asyncio subprocess."""
+    if not os.environ.get("SENSO_API_KEY"):
+        return _get_local_policy(delay_days, customer_tier)
+    if os.name == 'nt':
+        # npx is a .cmd shim on Windows and needs the shell
+        return await asyncio.to_thread(get_policy, delay_days, customer_tier)
+
+    proc = None
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *_cli_command(delay_days, customer_tier),
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env=os.environ.copy(),
+        )
+        stdout, _ = await asyncio.wait_for(proc.communicate(), 15)
+        if proc.returncode != 0:
+            raise RuntimeError(f"CLI exited with status {proc.returncode}")
+        return _policy_from_cli_output(stdout.decode("utf-8"), delay_days, customer_tier)
 
     except Exception as e:
         print(f"[Senso] CLI error: {e}. Falling back to local policy.")
         return _get_local_policy(delay_days, customer_tier)
+    finally:
+        # Also reached when the caller cancels us on its own timeout
+        if proc is not None and proc.returncode is None:
+            proc.kill()
 
 
 def get_full_knowledge_base() -> dict:
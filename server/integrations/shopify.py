@@ -3,8 +3,8 @@ Direct Shopify REST API Integration.
 Replaces the browser-based UI automation for faster, more reliable order actions.
 """
 import os
-import time
-import requests
+from server.integrations.limits import integration_slot
+from server.integrations.transport import http_post
 
 def _get_headers():
     token = os.environ.get("SHOPIFY_ADMIN_TOKEN")
@@ -17,6 +17,50 @@ def _get_base_url():
     shop = os.environ.get("SHOPIFY_STORE", "demo-store.myshopify.com")
     return f"https://{shop}/admin/api/2024-01"
 
+def _credit_request(order_id: str, amount: float, customer_id: str) -> tuple:
+    """Return (url, payload) for a store-credit gift card."""
+    url = f"{_get_base_url()}/gift_cards.json"
+    payload = {
+        "gift_card": {
+            "note": f"Delay compensation for order {order_id}",
+            "initial_value": amount,
+            "customer_id": customer_id
+        }
+    }
+    return url, payload
+
+def _credit_result(order_id: str, amount: float) -> dict:
+    return {
+        "success": True,
+        "steps": [f"Shopify API: Applying ${amount:.2f} credit to order #{order_id}... ✓"]
+    }
+
+def _refund_request(order_id: str, amount: float, reason: str) -> tuple:
+    """Return (url, payload) for an order refund."""
+    # Note: A real Shopify refund payload is more complex (requires line_items or transactions)
+    # This is a simplified proxy payload for the REST call.
+    url = f"{_get_base_url()}/orders/{order_id}/refunds.json"
+    payload = {
+        "refund": {
+            "currency": "USD",
+            "note": reason,
+            "transactions": [
+                {
+                    "kind": "refund",
+                    "gateway": "bogus",
+                    "amount": amount
+                }
+            ]
+        }
+    }
+    return url, payload
+
+def _refund_result(order_id: str, amount: float) -> dict:
+    return {
+        "success": True,
+        "steps": [f"Shopify API: Processing ${amount:.2f} refund for order #{order_id}... ✓"]
+    }
+
 def apply_store_credit(order_id: str, amount: float, customer_id: str) -> dict:
     """
     Apply store credit via Shopify Gift Card/Discount API.
@@ -26,30 +70,16 @@ def apply_store_credit(order_id: str, amount: float, customer_id: str) -> dict:
     
     if token:
         try:
-            url = f"{_get_base_url()}/gift_cards.json"
-            payload = {
-                "gift_card": {
-                    "note": f"Delay compensation for order {order_id}",
-                    "initial_value": amount,
-                    "customer_id": customer_id
-                }
-            }
-            response = requests.post(url, headers=_get_headers(), json=payload, timeout=10)
+            url, payload = _credit_request(order_id, amount, customer_id)
+            with integration_slot("shopify"):
+                response = http_post(url, headers=_get_headers(), json=payload, timeout=10)
             response.raise_for_status()
-            
-            return {
-                "success": True,
-                "steps": [f"Shopify API: Applying ${amount:.2f} credit to order #{order_id}... ✓"]
-            }
+            return _credit_result(order_id, amount)
         except Exception as e:
             print(f"[Shopify API] Error applying credit: {e}. Falling back to mock.")
 
     # Mock Fallback
-    time.sleep(0.5)
-    return {
-        "success": True,
-        "steps": [f"Shopify API: Applying ${amount:.2f} credit to order #{order_id}... ✓"]
-    }
+    return _credit_result(order_id, amount)
 
 def process_refund(order_id: str, amount: float, reason: str) -> dict:
     """
@@ -60,35 +90,13 @@ def process_refund(order_id: str, amount: float, reason: str) -> dict:
     
     if token:
         try:
-            # Note: A real Shopify refund payload is more complex (requires line_items or transactions)
-            # This is a simplified proxy payload for the REST call.
-            url = f"{_get_base_url()}/orders/{order_id}/refunds.json"
-            payload = {
-                "refund": {
-                    "currency": "USD",
-                    "note": reason,
-                    "transactions": [
-                        {
-                            "kind": "refund",
-                            "gateway": "bogus",
-                            "amount": amount
-                        }
-                    ]
-                }
-            }
-            response = requests.post(url, headers=_get_headers(), json=payload, timeout=10)
+            url, payload = _refund_request(order_id, amount, reason)
+            with integration_slot("shopify"):
+                response = http_post(url, headers=_get_headers(), json=payload, timeout=10)
             response.raise_for_status()
-            
-            return {
-                "success": True,
-                "steps": [f"Shopify API: Processing ${amount:.2f} refund for order #{order_id}... ✓"]
-            }
+            return _refund_result(order_id, amount)
         except Exception as e:
             print(f"[Shopify API] Error processing refund: {e}. Falling back to mock.")
 
     # Mock Fallback
-    time.sleep(0.5)
-    return {
-        "success": True,
-        "steps": [f"Shopify API: Processing ${amount:.2f} refund for order #{order_id}... ✓"]
-    }
+    return _refund_result(order_id, amount)
@@ -0,0 +1,104 @@
+"""
+Singleflight — collapse concurrent calls for the same key into one execution.
+
+The first caller for a key runs the function; everyone who arrives while it
+is in flight waits and receives the same result (or the same exception).
+do_async is the event-loop form; it can also share a streamed result, so a
+caller that joins mid-stream first gets everything streamed so far, then
+each new fragment as it arrives.
+"""
+import asyncio
+import threading
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.task = None  # do_async only
+        self.streamed = []
+        self.listeners = []
+
+    def publish(self, fragment: str):
+        self.streamed.append(fragment)
+        for listener in self.listeners:
+            listener(fragment)
+
+    def listen(self, on_message):
+        if self.streamed:
+            on_message("".join(self.streamed))
+        self.listeners.append(on_message)
+
+
+class SingleFlight:
+    """Thread-safe call deduplication keyed by any hashable value."""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {"calls": 0, "shared": 0}
+
+    def _count(self, leader: bool):
+        self._stats["calls"] += 1
+        if not leader:
+            self._stats["shared"] += 1
+
+    def do(self, key, fn):
+        """Run fn() once per key among concurrent callers. Returns (result, shared)."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(leader)
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result, False
+
+    async def do_async(self, key, fn, on_message=None):
+        """
+        Await fn() once per key among concurrent callers. Returns (result, shared).
+
+        With on_message, fn(publish) is called instead, and each fragment it
+        publishes reaches every caller's on_message. Streaming and
+        non-streaming callers must not share a key.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._count(leader)
+            if on_message is not None:
+                call.listen(on_message)
+            if leader:
+                call.task = asyncio.ensure_future(fn(call.publish) if on_message is not None else fn())
+                call.task.add_done_callback(lambda _: self._forget(key, call))
+
+        # Shielded: a caller that gives up (timeout, cancel) doesn't cancel the call for the others
+        return await asyncio.shield(call.task), not leader
+
+    def stats(self) -> dict:
+        """Calls made, and how many of them shared another caller's execution."""
+        with self._lock:
+            return {**self._stats, "inFlight": len(self._calls)}
+
+    def _forget(self, key, call: _Call):
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
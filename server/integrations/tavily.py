@@ -2,7 +2,35 @@
 Tavily web search client — for real-time carrier delay news, weather disruptions, etc.
 """
 import os
-import requests
+from server.integrations.transport import http_post, post_json
+
+
+TAVILY_URL = "https://api.tavily.com/search"
+
+
+def _search_payload(api_key: str, query: str) -> dict:
+    return {
+        "api_key": api_key,
+        "query": query,
+        "search_depth": "basic",
+        "max_results": 3,
+        "include_images": False,
+    }
+
+
+def _parse_results(data: dict) -> dict:
+    results = []
+    for r in data.get("results", []):
+        results.append({
+            "title": r.get("title", ""),
+            "url": r.get("url", ""),
+            "snippet": r.get("content", "")
+        })
+
+    return {
+        "results": results,
+        "source": "tavily_real"
+    }
 
 
 def search_web(query: str) -> dict:
@@ -24,32 +52,38 @@ def search_web(query: str) -> dict:
         }
 
     try:
-        response = requests.post(
-            "https://api.tavily.com/search",
+        response = http_post(
+            TAVILY_URL,
             headers={"Content-Type": "application/json"},
-            json={
-                "api_key": api_key,
-                "query": query,
-                "search_depth": "basic",
-                "max_results": 3,
-                "include_images": False,
-            }
+            json=_search_payload(api_key, query),
         )
         response.raise_for_status()
-        data = response.json()
-        
-        results = []
-        for r in data.get("results", []):
-            results.append({
-                "title": r.get("title", ""),
-                "url": r.get("url", ""),
-                "snippet": r.get("content", "")
-            })
-            
+        return _parse_results(response.json())
+    except Exception as e:
+        print(f"[Tavily] Error searching web: {e}")
+        return {
+            "results": [],
+            "source": "tavily_error"
+        }
+
+
+async def search_web_async(query: str) -> dict:
+    """Async search_web on the shared transport. Same return shape and fallbacks."""
+    api_key = os.environ.get("TAVILY_API_KEY")
+    if not api_key:
+        print("[Tavily] Warning: TAVILY_API_KEY not set. Returning mock results.")
         return {
-            "results": results,
-            "source": "tavily_real"
+            "results": [],
+            "source": "tavily_mock",
         }
+
+    try:
+        data = await post_json(
+            TAVILY_URL,
+            headers={"Content-Type": "application/json"},
+            payload=_search_payload(api_key, query),
+        )
+        return _parse_results(data)
     except Exception as e:
         print(f"[Tavily] Error searching web: {e}")
         return {
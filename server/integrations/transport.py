@@ -0,0 +1,224 @@
+"""
+HTTP transport shared by all integrations.
+
+Sync calls go through http_post(): one pooled keep-alive requests.Session
+per upstream host, so repeated LLM, Shopify and Yutori calls reuse warm
+TCP/TLS connections instead of handshaking every time. Every request gets
+default connect/read timeouts (HTTP_CONNECT_TIMEOUT_SECONDS,
+HTTP_READ_TIMEOUT_SECONDS).
+
+The *_async clients use one event loop running in a daemon thread for the
+whole process. Sync code (Flask routes, agent-loop workers) hands coroutines
+to it with run_sync(), so hundreds of resolutions can wait on upstream I/O
+without each one holding an OS thread for the round trip. Uses httpx when
+installed — with HTTP/2 when the h2 package is there too — and falls back to
+the pooled sessions on a worker thread otherwise, which keeps the async API
+working with fewer concurrency gains.
+
+get_pool_stats() reports requests and opened connections per host.
+"""
+import asyncio
+import importlib.util
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HAS_HTTPX = True
+    _CONNECT_ERRORS = (httpx.HTTPError, requests.exceptions.RequestException)
+except ImportError:
+    HAS_HTTPX = False
+    _CONNECT_ERRORS = (requests.exceptions.RequestException,)
+
+HAS_HTTP2 = HAS_HTTPX and importlib.util.find_spec("h2") is not None
+
+HTTP_CONNECT_TIMEOUT_SECONDS = float(os.getenv("HTTP_CONNECT_TIMEOUT_SECONDS", "5"))
+HTTP_READ_TIMEOUT_SECONDS = float(os.getenv("HTTP_READ_TIMEOUT_SECONDS", "30"))
+# Keep-alive connections kept open per upstream host
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "20"))
+HTTP_KEEPALIVE_SECONDS = float(os.getenv("HTTP_KEEPALIVE_SECONDS", "60"))
+
+_loop = None
+_loop_lock = threading.Lock()
+_clients = {}  # event loop → httpx.AsyncClient (clients are bound to one loop)
+
+_sessions = {}  # "scheme://host" → requests.Session
+_sessions_lock = threading.Lock()
+_async_stats = {}  # host → {"requests": n, "http2": n}
+_stats_lock = threading.Lock()
+
+
+class TransportError(Exception):
+    """The upstream could not be reached or did not answer in time."""
+
+
+class HTTPStatusError(TransportError):
+    """The upstream answered with a 4xx/5xx status."""
+
+    def __init__(self, status_code: int, retry_after: str = None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Return the shared background event loop, starting it on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-transport", daemon=True).start()
+    return _loop
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the shared loop and block until it returns.
+    Context variables of the calling thread are visible inside the coroutine.
+    """
+    loop = get_loop()
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        coro.close()
+        raise RuntimeError("run_sync() called on the transport loop — await the coroutine instead")
+    return asyncio.run_coroutine_threadsafe(coro, loop).result()
+
+
+def _origin(url: str) -> str:
+    parts = urlsplit(url)
+    return f"{parts.scheme}://{parts.netloc}"
+
+
+def _session(url: str) -> requests.Session:
+    origin = _origin(url)
+    session = _sessions.get(origin)
+    if session is None:
+        with _sessions_lock:
+            session = _sessions.get(origin)
+            if session is None:
+                session = requests.Session()
+                session.mount(origin, HTTPAdapter(pool_connections=1, pool_maxsize=HTTP_POOL_SIZE))
+                _sessions[origin] = session
+    return session
+
+
+def _timeout(timeout):
+    """(connect, read) timeouts; a bare number overrides the read timeout only."""
+    if timeout is None:
+        return HTTP_CONNECT_TIMEOUT_SECONDS, HTTP_READ_TIMEOUT_SECONDS
+    if isinstance(timeout, tuple):
+        return timeout
+    return HTTP_CONNECT_TIMEOUT_SECONDS, timeout
+
+
+def http_post(url: str, headers: dict = None, json: dict = None, timeout=None, **kwargs) -> requests.Response:
+    """requests.post on the pooled keep-alive session for url's host, with default timeouts."""
+    return _session(url).post(url, headers=headers, json=json, timeout=_timeout(timeout), **kwargs)
+
+
+def _client():
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None:
+        client = _clients[loop] = httpx.AsyncClient(
+            http2=HAS_HTTP2,
+            limits=httpx.Limits(
+                max_keepalive_connections=HTTP_POOL_SIZE,
+                keepalive_expiry=HTTP_KEEPALIVE_SECONDS,
+            ),
+            timeout=httpx.Timeout(HTTP_READ_TIMEOUT_SECONDS, connect=HTTP_CONNECT_TIMEOUT_SECONDS),
+        )
+    return client
+
+
+def _httpx_timeout(timeout):
+    connect, read = _timeout(timeout)
+    return httpx.Timeout(read, connect=connect)
+
+
+def _count_async(url: str, resp):
+    with _stats_lock:
+        stats = _async_stats.setdefault(_origin(url), {"requests": 0, "http2": 0})
+        stats["requests"] += 1
+        stats["http2"] += 1 if getattr(resp, "http_version", "") == "HTTP/2" else 0
+
+
+async def post_json(url: str, headers: dict = None, payload: dict = None, timeout: float = None) -> dict:
+    """POST a JSON body and return the decoded JSON response."""
+    try:
+        if HAS_HTTPX:
+            resp = await _client().post(url, headers=headers, json=payload, timeout=_httpx_timeout(timeout))
+            _count_async(url, resp)
+        else:
+            resp = await asyncio.to_thread(http_post, url, headers=headers, json=payload, timeout=timeout)
+    except _CONNECT_ERRORS as e:
+        raise TransportError(str(e)) from e
+
+    if resp.status_code >= 400:
+        raise HTTPStatusError(resp.status_code, resp.headers.get("Retry-After"))
+    return resp.json()
+
+
+async def stream_lines(url: str, headers: dict = None, payload: dict = None, timeout: float = None):
+    """POST a JSON body and yield the response body line by line as it arrives."""
+    try:
+        if HAS_HTTPX:
+            async with _client().stream("POST", url, headers=headers, json=payload,
+                                        timeout=_httpx_timeout(timeout)) as resp:
+                _count_async(url, resp)
+                if resp.status_code >= 400:
+                    raise HTTPStatusError(resp.status_code, resp.headers.get("Retry-After"))
+                async for line in resp.aiter_lines():
+                    yield line
+            return
+
+        resp = await asyncio.to_thread(
+            http_post, url, headers=headers, json=payload, timeout=timeout, stream=True)
+        try:
+            if resp.status_code >= 400:
+                raise HTTPStatusError(resp.status_code, resp.headers.get("Retry-After"))
+            lines = resp.iter_lines()
+            while True:
+                line = await asyncio.to_thread(next, lines, None)
+                if line is None:
+                    return
+                yield line.decode("utf-8", "replace") if isinstance(line, bytes) else line
+        finally:
+            resp.close()
+    except _CONNECT_ERRORS as e:
+        raise TransportError(str(e)) from e
+
+
+def get_pool_stats() -> dict:
+    """
+    Per-host request and connection counts. For the sync pools, `reused` is
+    how many requests went out on an already-open keep-alive connection.
+    """
+    sync = {}
+    with _sessions_lock:
+        sessions = dict(_sessions)
+    for origin, session in sessions.items():
+        pools = session.get_adapter(origin).poolmanager.pools
+        stats = {"requests": 0, "connectionsOpened": 0}
+        for key in pools.keys():
+            pool = pools[key]
+            stats["requests"] += pool.num_requests
+            stats["connectionsOpened"] += pool.num_connections
+        stats["reused"] = stats["requests"] - stats["connectionsOpened"]
+        sync[origin] = stats
+
+    with _stats_lock:
+        async_hosts = {origin: dict(stats) for origin, stats in _async_stats.items()}
+    return {
+        "sync": sync,
+        "async": {"httpx": HAS_HTTPX, "http2": HAS_HTTP2, "hosts": async_hosts},
+        "poolSize": HTTP_POOL_SIZE,
+        "timeouts": {"connect": HTTP_CONNECT_TIMEOUT_SECONDS, "read": HTTP_READ_TIMEOUT_SECONDS},
+    }
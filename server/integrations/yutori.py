@@ -2,43 +2,34 @@
 Yutori API clients — Scouting (tracking) and Browsing (automated actions).
 """
 import os
-import requests
+import json
 import random
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from server.integrations.limits import INTEGRATION_LIMITS, integration_slot
+from server.integrations.transport import http_post
+from server.integrations.cache import TTLCache
 
 
 # ─── Scouting API (carrier tracking) ──────────────────────────
 
-def check_tracking(tracking_url: str) -> dict:
-    """
-    Check a carrier tracking URL for delivery status using Yutori Scouting API.
-    """
-    api_key = os.environ.get("YUTORI_API_KEY")
-    if api_key:
-        try:
-            response = requests.post(
-                "https://api.yutori.com/v1/scouting/tasks",
-                headers={"X-API-Key": api_key},
-                json={
-                    "query": f"Check the delivery status for tracking URL: {tracking_url}. Extract: status (on_time, delayed, delivered, exception), days late, estimated delivery date, and any carrier message."
-                },
-                timeout=15
-            )
-            response.raise_for_status()
-            data = response.json()
-            
-            # Simple heuristic parsing since we don't have a guaranteed structured JSON schema back
-            result_str = str(data.get("result", data)).lower()
-            status = "delayed" if "delay" in result_str else "on_time"
-            
-            return {
-                "status": status,
-                "days_late": 0,
-                "estimated_delivery": "See Yutori status",
-                "carrier_message": str(data.get("result", data))[:150],
-            }
-        except Exception as e:
-            print(f"[Yutori] Scouting API error or timeout: {e}. Falling back to mock.")
+SCOUTING_URL = "https://api.yutori.com/v1/scouting/tasks"
+TRACKING_STATUSES = ("on_time", "delayed", "delivered", "exception")
+TRACKING_BATCH_SIZE = int(os.getenv("YUTORI_TRACKING_BATCH_SIZE", "25"))
+
+# Tracking status per URL — errors are never cached, the mock fallback is returned instead
+_tracking_cache = TTLCache(
+    "tracking",
+    ttl=int(os.getenv("TRACKING_CACHE_TTL_SECONDS", "300")),
+    stale_ttl=int(os.getenv("TRACKING_CACHE_STALE_SECONDS", "900")),
+)
+
+# Chunks of a batch are submitted concurrently; the yutori in-flight cap still applies
+_batch_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix="yutori-batch")
+# Per-URL checks after a failed batch run side by side, as many as the yutori cap lets through
+_single_pool = ThreadPoolExecutor(max_workers=max(1, INTEGRATION_LIMITS["yutori"]), thread_name_prefix="yutori-single")
 
+
+def _mock_tracking() -> dict:
     # Default mock: everything is on time
     return {
         "status": "on_time",
@@ -48,47 +39,186 @@ def check_tracking(tracking_url: str) -> dict:
     }
 
 
-# ─── Browsing API (autonomous Shopify admin actions) ───────────
+def _parse_scouting_result(result) -> dict:
+    """Turn one Scouting result into our tracking dict."""
+    if isinstance(result, dict) and str(result.get("status", "")).lower() in TRACKING_STATUSES:
+        return {
+            "status": str(result["status"]).lower(),
+            "days_late": int(result.get("days_late") or 0),
+            "estimated_delivery": result.get("estimated_delivery") or "See Yutori status",
+            "carrier_message": str(result.get("carrier_message", ""))[:150],
+        }
 
-def file_carrier_claim(tracking_number: str, order_total: float, brand_name: str, session_id: str) -> dict:
+    # Simple heuristic parsing since we don't have a guaranteed structured JSON schema back
+    result_str = str(result).lower()
+    status = "delayed" if "delay" in result_str else "on_time"
+
+    return {
+        "status": status,
+        "days_late": 0,
+        "estimated_delivery": "See Yutori status",
+        "carrier_message": str(result)[:150],
+    }
+
+
+def _scout_query(tracking_url: str) -> dict:
+    return {
+        "query": f"Check the delivery status for tracking URL: {tracking_url}. Extract: status (on_time, delayed, delivered, exception), days late, estimated delivery date, and any carrier message."
+    }
+
+
+def _scout(tracking_url: str) -> dict:
+    """One Scouting API call for a single tracking URL. Raises on failure."""
+    api_key = os.environ.get("YUTORI_API_KEY")
+    with integration_slot("yutori"):
+        response = http_post(
+            SCOUTING_URL,
+            headers={"X-API-Key": api_key},
+            json=_scout_query(tracking_url),
+            timeout=15
+        )
+    response.raise_for_status()
+    data = response.json()
+    return _parse_scouting_result(data.get("result", data))
+
+
+def check_tracking(tracking_url: str, max_age: float = None) -> dict:
     """
-    Use Yutori Browsing API to navigate to FedEx and file a lost package claim.
+    Check a carrier tracking URL for delivery status using Yutori Scouting API.
+    Results are cached per URL (with stale-while-revalidate), and concurrent
+    lookups for the same URL share one upstream request. With max_age, no
+    cached status older than that is returned.
     """
     api_key = os.environ.get("YUTORI_API_KEY")
-    
-    if api_key:
+    if api_key and tracking_url:
         try:
-            task = (f"Navigate to fedex.com/en-us/filing-a-claim.html. "
-                    f"File a lost package claim for tracking number {tracking_number}. "
-                    f"Package value: ${order_total}. "
-                    f"Shipper: {brand_name}. Return the claim confirmation number.")
-            response = requests.post(
-                "https://api.yutori.com/v1/browsing/tasks",
+            return _tracking_cache.get_or_load(tracking_url, lambda: _scout(tracking_url), max_age=max_age)
+        except Exception as e:
+            print(f"[Yutori] Scouting API error or timeout: {e}. Falling back to mock.")
+
+    return _mock_tracking()
+
+
+def prime_tracking_cache(tracking_url: str, tracking: dict):
+    """Store a tracking status we learned without asking Scouting (e.g. a carrier webhook)."""
+    if tracking_url:
+        _tracking_cache.put(tracking_url, tracking)
+
+
+def get_tracking_cache_stats() -> dict:
+    """Hit/miss counters for the tracking status cache."""
+    return _tracking_cache.stats()
+
+
+def _check_tracking_chunk(api_key: str, carrier: str, orders: list, max_age: float = None) -> list:
+    """
+    Submit one Scouting task covering several tracking URLs of the same carrier.
+    Returns [(order, tracking)] in input order. URLs the task did not answer
+    for fall back to an individual check.
+    """
+    urls = [o.get("trackingUrl", "") for o in orders]
+    by_url = {}
+    try:
+        with integration_slot("yutori"):
+            response = http_post(
+                SCOUTING_URL,
                 headers={"X-API-Key": api_key},
                 json={
-                    "task": task,
-                    "session_id": session_id,
-                    "start_url": "https://fedex.com/en-us/filing-a-claim.html"
+                    "query": (
+                        f"Check the delivery status of each of these {carrier} tracking URLs:\n"
+                        + "\n".join(urls)
+                        + "\nReturn a JSON array with one object per URL: tracking_url, status "
+                        "(on_time, delayed, delivered, exception), days_late, estimated_delivery, carrier_message."
+                    )
                 },
-                timeout=30
+                timeout=15 + len(urls),
             )
-            response.raise_for_status()
-            data = response.json()
-            
-            result_text = data.get("result", str(data))
-            steps = [f"Yutori Browsing: {step.strip()}" for step in str(result_text).split('\n') if step.strip()]
-            if not steps:
-                steps = [f"Yutori Browsing filed claim for {tracking_number}"]
-                
-            return {
-                "success": True,
-                "steps": steps,
-                "screenshot_url": data.get("screenshot_url")
-            }
-        except Exception as e:
-            print(f"[Yutori] Browsing API error or timeout: {e}. Falling back to mock.")
+        response.raise_for_status()
+        data = response.json()
+        result = data.get("result", data)
+        if isinstance(result, str):
+            result = json.loads(result)
+        if isinstance(result, dict):
+            result = result.get("results", [])
+        for item in result:
+            if isinstance(item, dict) and item.get("tracking_url"):
+                by_url[item["tracking_url"]] = _parse_scouting_result(item)
+                _tracking_cache.put(item["tracking_url"], by_url[item["tracking_url"]])
+    except Exception as e:
+        print(f"[Yutori] Batch scouting for {carrier} ({len(urls)} URLs) failed: {e}. Checking individually.")
 
-    # Mock Fallback
+    singles = {url: _single_pool.submit(check_tracking, url, max_age) for url in urls if url not in by_url}
+    return [
+        (order, by_url[url] if url in by_url else singles[url].result())
+        for order, url in zip(orders, urls)
+    ]
+
+
+def check_tracking_batch(orders: list, chunk_size: int = TRACKING_BATCH_SIZE, max_age: float = None):
+    """
+    Check tracking for many orders, grouped by carrier and submitted in chunks.
+    Yields a list of (order, tracking) pairs as each chunk comes back, so
+    callers can start acting on delayed orders while the rest are still being
+    checked. Fresh cache entries (no older than max_age, if given) come first,
+    as one list, without an upstream call.
+    """
+    api_key = os.environ.get("YUTORI_API_KEY")
+    if not api_key:
+        yield [(order, _mock_tracking()) for order in orders]
+        return
+
+    by_carrier, cached = {}, []
+    for order in orders:
+        tracking = _tracking_cache.get_fresh(order.get("trackingUrl", ""), max_age)
+        if tracking is not None:
+            cached.append((order, tracking))
+            continue
+        by_carrier.setdefault(order.get("carrier") or "Unknown", []).append(order)
+
+    futures = [
+        _batch_pool.submit(_check_tracking_chunk, api_key, carrier, group[i:i + chunk_size], max_age)
+        for carrier, group in by_carrier.items()
+        for i in range(0, len(group), chunk_size)
+    ]
+    if cached:
+        yield cached
+    for future in as_completed(futures):
+        yield future.result()
+
+
+# ─── Browsing API (autonomous Shopify admin actions) ───────────
+
+BROWSING_URL = "https://api.yutori.com/v1/browsing/tasks"
+
+CLAIM_START_URL = "https://fedex.com/en-us/filing-a-claim.html"
+
+
+def _claim_task(tracking_number: str, order_total: float, brand_name: str, session_id: str) -> dict:
+    task = (f"Navigate to fedex.com/en-us/filing-a-claim.html. "
+            f"File a lost package claim for tracking number {tracking_number}. "
+            f"Package value: ${order_total}. "
+            f"Shipper: {brand_name}. Return the claim confirmation number.")
+    return {
+        "task": task,
+        "session_id": session_id,
+        "start_url": CLAIM_START_URL
+    }
+
+
+def _claim_result(data: dict, tracking_number: str) -> dict:
+    result_text = data.get("result", str(data))
+    steps = [f"Yutori Browsing: {step.strip()}" for step in str(result_text).split('\n') if step.strip()]
+    if not steps:
+        steps = [f"Yutori Browsing filed claim for {tracking_number}"]
+
+    return {
+        "success": True,
+        "steps": steps,
+        "screenshot_url": data.get("screenshot_url")
+    }
+
+
+def _mock_claim(tracking_number: str, order_total: float) -> dict:
     steps = [
         f"Browsing API: Navigating to FedEx claims portal...",
         f"Browsing API: Filling claim for tracking #{tracking_number}, value ${order_total}...",
@@ -100,3 +230,28 @@ def file_carrier_claim(tracking_number: str, order_total: float, brand_name: str
         "steps": steps,
         "screenshot_url": None,
     }
+
+
+def file_carrier_claim(tracking_number: str, order_total: float, brand_name: str, session_id: str) -> dict:
+    """
+    Use Yutori Browsing API to navigate to FedEx and file a lost package claim.
+    """
+    api_key = os.environ.get("YUTORI_API_KEY")
+    
+    if api_key:
+        try:
+            with integration_slot("yutori"):
+                response = http_post(
+                    BROWSING_URL,
+                    headers={"X-API-Key": api_key},
+                    json=_claim_task(tracking_number, order_total, brand_name, session_id),
+                    timeout=30
+                )
+            response.raise_for_status()
+            return _claim_result(response.json(), tracking_number)
+        except Exception as e:
+            print(f"[Yutori] Browsing API error or timeout: {e}. Falling back to mock.")
+
+    # Mock Fallback
+    return _mock_claim(tracking_number, order_total)
+
@@ -0,0 +1,68 @@
+"""
+Async versions of the queries the orchestrator needs, for orchestrate_async.
+They run the same Cypher as queries.py on the async driver.
+"""
+from server.neo4j_db.connection import get_async_driver
+from server.neo4j_db.queries import (
+    GRAPH_CONTEXT_QUERY,
+    GRAPH_CONTEXTS_QUERY,
+    CREATE_RESOLUTIONS_QUERY,
+    UPDATE_ORDER_STATUSES_QUERY,
+    CLAIM_ORDERS_QUERY,
+    _claimed_rows,
+    _clean_graph_context,
+)
+
+
+async def get_graph_context_async(customer_id: str) -> dict:
+    """Async get_graph_context."""
+    driver = await get_async_driver()
+    async with driver.session() as session:
+        result = await session.run(GRAPH_CONTEXT_QUERY, customer_id=customer_id)
+        record = await result.single()
+        if not record:
+            return None
+        return _clean_graph_context(record["graphContext"])
+
+
+async def get_graph_contexts_async(customer_ids: list) -> dict:
+    """Graph context for many customers in one UNWIND query. Returns {customer_id: context}."""
+    if not customer_ids:
+        return {}
+    driver = await get_async_driver()
+    async with driver.session() as session:
+        result = await session.run(GRAPH_CONTEXTS_QUERY, customer_ids=list(customer_ids))
+        return {
+            record["customer_id"]: _clean_graph_context(record["graphContext"])
+            async for record in result
+        }
+
+
+async def commit_writes_async(writes) -> list:
+    """Async ResolutionWrites.commit(): one managed write transaction for everything recorded."""
+    rows, updates, claims = writes.pending()
+    if not rows and not updates and not claims:
+        writes.claimed = set()
+        return []
+
+    async def _write(tx):
+        claimed = set()
+        if claims:
+            result = await tx.run(CLAIM_ORDERS_QUERY, claims=claims, owner=writes.lease_owner)
+            record = await result.single()
+            claimed = set(record["claimed"]) if record else set()
+        kept = _claimed_rows(rows, claims, claimed)
+        created = []
+        if kept:
+            result = await tx.run(CREATE_RESOLUTIONS_QUERY, rows=kept)
+            created = [record.data() async for record in result]
+        if updates:
+            result = await tx.run(UPDATE_ORDER_STATUSES_QUERY, updates=updates)
+            await result.consume()
+        return created, claimed
+
+    driver = await get_async_driver()
+    async with driver.session() as session:
+        created, writes.claimed = await session.execute_write(_write)
+    writes.clear()
+    return created
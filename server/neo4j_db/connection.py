@@ -1,25 +1,34 @@
 """
 Neo4j connection manager — singleton driver from env vars.
+The async driver is used by the async orchestration path; it is bound to the
+event loop that first opens it (the shared transport loop).
 """
+import asyncio
 import os
-from neo4j import GraphDatabase
+from neo4j import GraphDatabase, AsyncGraphDatabase
 
 _driver = None
+_async_driver = None
+_async_driver_lock = asyncio.Lock()
+
+
+def _credentials():
+    uri = os.getenv("NEO4J_URI")
+    username = os.getenv("NEO4J_USERNAME", "neo4j")
+    password = os.getenv("NEO4J_PASSWORD")
+
+    if not uri or not password:
+        raise RuntimeError(
+            "NEO4J_URI and NEO4J_PASSWORD must be set in .env"
+        )
+    return uri, username, password
 
 
 def get_driver():
     """Return a cached Neo4j driver instance."""
     global _driver
     if _driver is None:
-        uri = os.getenv("NEO4J_URI")
-        username = os.getenv("NEO4J_USERNAME", "neo4j")
-        password = os.getenv("NEO4J_PASSWORD")
-
-        if not uri or not password:
-            raise RuntimeError(
-                "NEO4J_URI and NEO4J_PASSWORD must be set in .env"
-            )
-
+        uri, username, password = _credentials()
         _driver = GraphDatabase.driver(uri, auth=(username, password))
         # Verify connectivity on first use
         _driver.verify_connectivity()
@@ -28,6 +37,22 @@ def get_driver():
     return _driver
 
 
+async def get_async_driver():
+    """Return a cached async Neo4j driver instance."""
+    global _async_driver
+    if _async_driver is None:
+        # Concurrent first callers would each open (and leak) a driver
+        async with _async_driver_lock:
+            if _async_driver is None:
+                uri, username, password = _credentials()
+                driver = AsyncGraphDatabase.driver(uri, auth=(username, password))
+                await driver.verify_connectivity()
+                _async_driver = driver
+                print("[Neo4j] Async driver connected")
+
+    return _async_driver
+
+
 def close_driver():
     """Gracefully close the Neo4j driver."""
     global _driver
@@ -35,3 +60,4 @@ def close_driver():
         _driver.close()
         _driver = None
         print("[Neo4j] Driver closed")
+
@@ -43,102 +43,198 @@ def get_customer_context(customer_id: str) -> dict:
         }
 
 
-def get_graph_context(customer_id: str) -> dict:
-    """
-    Run a multi-hop graph traversal to return aggregate stats for the Orchestrator prompt.
-    """
-    driver = get_driver()
-    query = """
-    MATCH (c:Customer {id: $customer_id})
-    OPTIONAL MATCH (c)-[:PLACED]->(o:Order)
-    OPTIONAL MATCH (o)-[:HAS_ISSUE]->(i:Issue)
-    OPTIONAL MATCH (i)-[:RESOLVED_BY]->(r:Resolution)
+# Aggregation behind the orchestrator's graph context. Expects `c` bound to a
+# Customer and returns a single `graphContext` map; shared by every query that
+# needs it so the shape stays identical.
+_GRAPH_CONTEXT_CYPHER = """
+    OPTIONAL MATCH (c)-[:PLACED]->(ho:Order)
+    OPTIONAL MATCH (ho)-[:HAS_ISSUE]->(hi:Issue)
+    OPTIONAL MATCH (hi)-[:RESOLVED_BY]->(hr:Resolution)
     OPTIONAL MATCH (c)-[:HAD_CALL]->(call:CallSession)-[:HAS_TRANSCRIPT]->(t:Transcript)
-    RETURN
-      c.name as name,
-      c.tier as tier,
-      c.ltv as ltv,
-      count(DISTINCT o) as totalOrders,
-      count(DISTINCT i) as totalIssues,
-      sum(r.creditApplied) as totalCreditsGiven,
+    WITH c,
+      count(DISTINCT ho) AS totalOrders,
+      count(DISTINCT hi) AS totalIssues,
+      sum(hr.creditApplied) AS totalCreditsGiven,
       collect(DISTINCT {
-        issueType: i.type,
-        resolution: r.action,
-        credit: r.creditApplied,
-        date: r.timestamp
-      }) as issueHistory,
+        issueType: hi.type,
+        resolution: hr.action,
+        credit: hr.creditApplied,
+        date: hr.timestamp
+      }) AS issueHistory,
       collect(DISTINCT {
-        orderId: o.id,
-        product: o.product,
-        status: o.status,
-        carrier: o.carrier,
-        total: o.total
-      }) as orderHistory,
+        orderId: ho.id,
+        product: ho.product,
+        status: ho.status,
+        carrier: ho.carrier,
+        total: ho.total,
+        estimatedDelivery: ho.estimatedDelivery
+      }) AS orderHistory,
       collect(DISTINCT {
         callId: call.id,
         startedAt: call.startedAt,
         duration: call.duration,
         initiatedBy: call.initiatedBy
-      }) as calls,
+      }) AS calls,
       collect(DISTINCT {
         callId: t.callId,
         summary: t.summary,
         createdAt: t.createdAt
-      }) as transcripts
+      }) AS transcripts
+    RETURN {
+      name: c.name,
+      tier: c.tier,
+      ltv: c.ltv,
+      totalOrders: totalOrders,
+      totalIssues: totalIssues,
+      totalCreditsGiven: totalCreditsGiven,
+      issueHistory: issueHistory,
+      orderHistory: orderHistory,
+      calls: calls,
+      transcripts: transcripts
+    } AS graphContext
+"""
+
+
+def _clean_graph_context(raw: dict) -> dict:
+    """Normalize a graphContext map from Cypher into the orchestrator's shape."""
+    # Clean up nulls from OPTIONAL MATCH
+    def clean_list(lst):
+        return [x for x in lst if x and any(v is not None for v in x.values())]
+
+    return {
+        "name": raw["name"],
+        "tier": raw["tier"],
+        "ltv": raw["ltv"],
+        "totalOrders": raw["totalOrders"],
+        "totalIssues": raw["totalIssues"],
+        "totalCreditsGiven": raw["totalCreditsGiven"] or 0,
+        "issueHistory": clean_list(raw["issueHistory"]),
+        "orderHistory": clean_list(raw["orderHistory"]),
+        "calls": clean_list(raw["calls"]),
+        "transcripts": clean_list(raw["transcripts"]),
+    }
+
+
+GRAPH_CONTEXT_QUERY = """
+    MATCH (c:Customer {id: $customer_id})
+    """ + _GRAPH_CONTEXT_CYPHER
+
+
+# One round trip for many customers (orchestrate_batch)
+GRAPH_CONTEXTS_QUERY = """
+    UNWIND $customer_ids AS customer_id
+    MATCH (c:Customer {id: customer_id})
+    CALL {
+      WITH c
+      """ + _GRAPH_CONTEXT_CYPHER + """
+    }
+    RETURN customer_id, graphContext
+"""
+
+
+def get_graph_context(customer_id: str) -> dict:
+    """
+    Run a multi-hop graph traversal to return aggregate stats for the Orchestrator prompt.
     """
+    driver = get_driver()
     with driver.session() as session:
-        result = session.run(query, customer_id=customer_id)
+        result = session.run(GRAPH_CONTEXT_QUERY, customer_id=customer_id)
         record = result.single()
         if not record:
             return None
-        
-        # Clean up nulls from OPTIONAL MATCH
-        def clean_list(lst):
-            return [x for x in lst if x and any(v is not None for v in x.values())]
+        return _clean_graph_context(record["graphContext"])
 
-        return {
-            "name": record["name"],
-            "tier": record["tier"],
-            "ltv": record["ltv"],
-            "totalOrders": record["totalOrders"],
-            "totalIssues": record["totalIssues"],
-            "totalCreditsGiven": record["totalCreditsGiven"] or 0,
-            "issueHistory": clean_list(record["issueHistory"]),
-            "orderHistory": clean_list(record["orderHistory"]),
-            "calls": clean_list(record["calls"]),
-            "transcripts": clean_list(record["transcripts"]),
-        }
+
+ORDER_PAGE_SIZE = 500
+CLOSED_ORDER_STATUSES = ["delivered", "resolved"]
+
+_ORDER_ROW_FIELDS = """
+    c.id AS customerId, c.name AS customerName, c.tier AS tier,
+    o.id AS orderId, o.status AS status, o.carrier AS carrier,
+    o.trackingUrl AS trackingUrl, o.estimatedDelivery AS estimatedDelivery,
+    o.product AS product, o.total AS total
+"""
 
 
 def get_all_orders() -> list:
-    """Return all orders with their customer info (for the agent loop)."""
+    """Return all orders with their customer info (for the orders panel)."""
     driver = get_driver()
-    query = """
+    query = f"""
     MATCH (c:Customer)-[:PLACED]->(o:Order)
-    RETURN c.id AS customerId, c.name AS customerName, c.tier AS tier,
-           o.id AS orderId, o.status AS status, o.carrier AS carrier,
-           o.trackingUrl AS trackingUrl, o.estimatedDelivery AS estimatedDelivery,
-           o.product AS product, o.total AS total
+    RETURN {_ORDER_ROW_FIELDS}
     """
     with driver.session() as session:
         result = session.run(query)
         return [dict(record) for record in result]
 
 
-def check_existing_open_issue(order_id: str) -> bool:
+def iter_open_orders(page_size: int = ORDER_PAGE_SIZE):
     """
-    Check if there is already an open Issue for this order.
-    Returns True if an open issue exists, False otherwise.
+    Yield pages of open (not delivered/resolved) orders for the agent loop.
+    Uses keyset pagination on order id so each page is a bounded, indexed
+    range scan and callers only ever hold one page in memory.
     """
     driver = get_driver()
-    query = """
-    MATCH (o:Order {id: $order_id})-[:HAS_ISSUE]->(i:Issue {status: 'open'})
-    RETURN count(i) > 0 AS has_issue
+    query = f"""
+    MATCH (c:Customer)-[:PLACED]->(o:Order)
+    WHERE o.id > $after AND NOT coalesce(o.status, '') IN $closed
+    RETURN {_ORDER_ROW_FIELDS}
+    ORDER BY o.id
+    LIMIT $limit
+    """
+    after = ""
+    while True:
+        with driver.session() as session:
+            result = session.run(query, after=after, closed=CLOSED_ORDER_STATUSES, limit=page_size)
+            page = [dict(record) for record in result]
+        if not page:
+            return
+        yield page
+        if len(page) < page_size:
+            return
+        after = page[-1]["orderId"]
+
+
+def _orders_by_ids(order_ids: list, open_only: bool) -> list:
+    if not order_ids:
+        return []
+    driver = get_driver()
+    status_filter = "WHERE NOT coalesce(o.status, '') IN $closed" if open_only else ""
+    query = f"""
+    UNWIND $order_ids AS order_id
+    MATCH (c:Customer)-[:PLACED]->(o:Order {{id: order_id}})
+    {status_filter}
+    CALL {{
+      WITH c
+      {_GRAPH_CONTEXT_CYPHER}
+    }}
+    RETURN {_ORDER_ROW_FIELDS},
+           EXISTS {{ (o)-[:HAS_ISSUE]->(:Issue {{status: 'open'}}) }} AS hasOpenIssue,
+           graphContext
     """
     with driver.session() as session:
-        result = session.run(query, order_id=order_id)
-        record = result.single()
-        return record["has_issue"] if record else False
+        result = session.run(query, order_ids=list(order_ids), closed=CLOSED_ORDER_STATUSES)
+        orders = []
+        for record in result:
+            order = dict(record)
+            order["graphContext"] = _clean_graph_context(order["graphContext"])
+            orders.append(order)
+        return orders
+
+
+def get_open_orders_by_ids(order_ids: list) -> list:
+    """
+    Return the still-open orders among order_ids in a single round trip.
+    Each row also carries `hasOpenIssue` and the customer's `graphContext`,
+    so the agent loop needs no further per-order queries.
+    """
+    return _orders_by_ids(order_ids, open_only=True)
+
+
+def get_orders_by_ids(order_ids: list) -> list:
+    """Like get_open_orders_by_ids, but whatever the order status."""
+    return _orders_by_ids(order_ids, open_only=False)
+
 
 def get_active_delay_days(order_id: str) -> int:
     """Check Yutori Scouting to get the current real-time delay days for an active chat order."""
@@ -220,69 +316,158 @@ def get_graph_data(customer_id: str = None) -> dict:
 
 # ─── Write helpers ─────────────────────────────────────────────
 
-def create_issue_node(order_id: str, issue_data: dict) -> str:
-    """
-    Create an Issue node and link it to the Order and the Order's Customer.
-    Returns the generated issue ID.
-    """
-    driver = get_driver()
-    issue_id = f"issue-{uuid.uuid4().hex[:8]}"
-    query = """
-    MATCH (c:Customer)-[:PLACED]->(o:Order {id: $order_id})
+# Issue + Resolution pairs for many orders at once; issues are created already resolved
+CREATE_RESOLUTIONS_QUERY = """
+    UNWIND $rows AS row
+    MATCH (c:Customer)-[:PLACED]->(o:Order {id: row.order_id})
     CREATE (i:Issue {
-        id: $issue_id,
-        type: $issue_type,
-        description: $description,
-        status: 'open',
-        createdAt: $created_at
+        id: row.issue_id,
+        type: row.issue_type,
+        description: row.description,
+        status: 'resolved',
+        createdAt: row.created_at
     })
     CREATE (o)-[:HAS_ISSUE]->(i)
     CREATE (c)-[:HAD_ISSUE]->(i)
-    RETURN i.id AS issueId
-    """
-    with driver.session() as session:
-        session.run(
-            query,
-            order_id=order_id,
-            issue_id=issue_id,
-            issue_type=issue_data.get("type", "unknown"),
-            description=issue_data.get("description", ""),
-            created_at=datetime.now(timezone.utc).isoformat(),
-        )
-    return issue_id
-
-
-def create_resolution_node(issue_id: str, resolution_data: dict) -> str:
-    """
-    Create a Resolution node and link it to the Issue. Also marks Issue as resolved.
-    Returns the generated resolution ID.
-    """
-    driver = get_driver()
-    resolution_id = f"resolution-{uuid.uuid4().hex[:8]}"
-    query = """
-    MATCH (i:Issue {id: $issue_id})
-    SET i.status = 'resolved'
     CREATE (r:Resolution {
-        id: $resolution_id,
-        action: $action,
-        creditApplied: $credit_applied,
-        message: $message,
-        timestamp: $timestamp
+        id: row.resolution_id,
+        action: row.action,
+        creditApplied: row.credit_applied,
+        message: row.message,
+        timestamp: row.timestamp
     })
     CREATE (i)-[:RESOLVED_BY]->(r)
-    RETURN r.id AS resolutionId
+    RETURN row.order_id AS orderId, i.id AS issueId, r.id AS resolutionId
+"""
+
+UPDATE_ORDER_STATUSES_QUERY = """
+    UNWIND $updates AS update
+    MATCH (o:Order {id: update.order_id})
+    SET o.status = update.status
+"""
+
+# Resolve orders only if nobody else has: not resolved yet and, when the agent
+# loop is sharded, the order's shard lease still held by $owner
+CLAIM_ORDERS_QUERY = """
+    UNWIND $claims AS claim
+    MATCH (o:Order {id: claim.order_id})
+    // Take the order's write lock before reading its status
+    SET o._lock = true
+    REMOVE o._lock
+    WITH o, claim
+    OPTIONAL MATCH (l:LoopLease {shard: claim.shard})
+    WITH o, l
+    WHERE coalesce(o.status, '') <> 'resolved'
+      AND ($owner IS NULL OR (l.owner = $owner AND l.expiresAt >= timestamp()))
+    SET o.status = 'resolved'
+    RETURN collect(o.id) AS claimed
+"""
+
+
+class ResolutionWrites:
     """
-    with driver.session() as session:
-        session.run(
-            query,
-            issue_id=issue_id,
-            resolution_id=resolution_id,
-            action=resolution_data.get("action", "send_message"),
-            credit_applied=resolution_data.get("creditAmount", 0),
-            message=resolution_data.get("message", ""),
-            timestamp=datetime.now(timezone.utc).isoformat(),
-        )
-    return resolution_id
+    Unit of work for the graph mutations of one or more resolutions.
+
+    Record Issue/Resolution pairs and order-status changes as the resolution
+    goes, then commit() once: everything lands in a single managed write
+    transaction, which the driver retries on transient errors. Each kind of
+    write is one UNWIND over every recorded order, so the agent loop can
+    share one instance across a whole batch.
+
+    claim_order() marks an order resolved only if it isn't already (and, with
+    lease_owner, only while that worker holds the order's shard). An order
+    that loses the claim gets none of its Issue/Resolution writes; after
+    commit(), `claimed` holds the ids that won, and only those may be acted on.
+    """
+
+    def __init__(self, lease_owner: str = None):
+        self.lease_owner = lease_owner
+        self.claimed = set()
+        self._rows = []
+        self._statuses = {}  # order_id → status; the last one recorded wins
+        self._claims = {}  # order_id → shard
+
+    def add_resolution(self, order_id: str, issue_data: dict, resolution_data: dict) -> dict:
+        """Record an Issue + Resolution pair for order_id. Returns the row with its generated ids."""
+        row = _issue_params(order_id, f"issue-{uuid.uuid4().hex[:8]}", issue_data)
+        row.update(_resolution_params(row["issue_id"], f"resolution-{uuid.uuid4().hex[:8]}", resolution_data))
+        self._rows.append(row)
+        return row
+
+    def set_order_status(self, order_id: str, status: str):
+        self._statuses[order_id] = status
+
+    def claim_order(self, order_id: str, shard: int = None):
+        """Resolve order_id on commit unless it is already resolved or its shard has moved on."""
+        self._statuses.pop(order_id, None)
+        self._claims[order_id] = shard
+
+    def pending(self) -> tuple:
+        """(resolution rows, status updates, claims) not yet committed."""
+        updates = [{"order_id": order_id, "status": status} for order_id, status in self._statuses.items()]
+        claims = [{"order_id": order_id, "shard": shard} for order_id, shard in self._claims.items()]
+        return list(self._rows), updates, claims
+
+    def clear(self):
+        self._rows.clear()
+        self._statuses.clear()
+        self._claims.clear()
+
+    def commit(self) -> list:
+        """
+        Write everything recorded so far in one transaction and clear it.
+        Returns [{orderId, issueId, resolutionId}] for the created pairs.
+        """
+        rows, updates, claims = self.pending()
+        if not rows and not updates and not claims:
+            self.claimed = set()
+            return []
+
+        def _write(tx):
+            claimed = set()
+            if claims:
+                record = tx.run(CLAIM_ORDERS_QUERY, claims=claims, owner=self.lease_owner).single()
+                claimed = set(record["claimed"]) if record else set()
+            kept = _claimed_rows(rows, claims, claimed)
+            created = []
+            if kept:
+                created = [record.data() for record in tx.run(CREATE_RESOLUTIONS_QUERY, rows=kept)]
+            if updates:
+                tx.run(UPDATE_ORDER_STATUSES_QUERY, updates=updates).consume()
+            return created, claimed
+
+        driver = get_driver()
+        with driver.session() as session:
+            created, self.claimed = session.execute_write(_write)
+        self.clear()
+        return created
+
+
+def _claimed_rows(rows: list, claims: list, claimed: set) -> list:
+    """Resolution rows minus those for orders that lost their claim."""
+    lost = {claim["order_id"] for claim in claims} - claimed
+    return [row for row in rows if row["order_id"] not in lost]
+
+
+def _issue_params(order_id: str, issue_id: str, issue_data: dict) -> dict:
+    return {
+        "order_id": order_id,
+        "issue_id": issue_id,
+        "issue_type": issue_data.get("type", "unknown"),
+        "description": issue_data.get("description", ""),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def _resolution_params(issue_id: str, resolution_id: str, resolution_data: dict) -> dict:
+    return {
+        "issue_id": issue_id,
+        "resolution_id": resolution_id,
+        "action": resolution_data.get("action", "send_message"),
+        "credit_applied": resolution_data.get("creditAmount", 0),
+        "message": resolution_data.get("message", ""),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+    }
 
 
 def update_order_status(order_id: str, status: str):
@@ -395,3 +580,112 @@ def update_transcript_summary(transcript_id: str, summary: str):
     """
     with driver.session() as session:
         session.run(query, transcript_id=transcript_id, summary=summary)
+
+
+# ─── Agent loop shard leases ──────────────────────────────────
+
+def register_loop_worker(owner: str, ttl_seconds: int) -> int:
+    """
+    Mark an agent-loop worker alive for another ttl_seconds and return how
+    many workers are alive, this one included. Workers gone for ten TTLs are
+    deleted.
+    """
+    driver = get_driver()
+    query = """
+    MERGE (w:LoopWorker {owner: $owner})
+    SET w.expiresAt = timestamp() + $ttl_ms
+    WITH w
+    MATCH (live:LoopWorker)
+    WHERE live.expiresAt >= timestamp()
+    RETURN count(live) AS live
+    """
+    cleanup = """
+    MATCH (w:LoopWorker)
+    WHERE w.expiresAt < timestamp() - 10 * $ttl_ms
+    DELETE w
+    """
+    ttl_ms = ttl_seconds * 1000
+    with driver.session() as session:
+        record = session.run(query, owner=owner, ttl_ms=ttl_ms).single()
+        session.run(cleanup, ttl_ms=ttl_ms)
+        return record["live"] if record else 1
+
+
+def unregister_loop_worker(owner: str):
+    """Drop a stopping worker so the others' quotas grow right away."""
+    driver = get_driver()
+    query = """
+    MATCH (w:LoopWorker {owner: $owner})
+    DELETE w
+    """
+    with driver.session() as session:
+        session.run(query, owner=owner)
+
+
+def renew_shard_leases(shards: list, owner: str, ttl_seconds: int) -> set:
+    """
+    Extend the unexpired leases `owner` holds among `shards`, in one query
+    that only touches those leases. Returns the shards renewed; the rest
+    have been lost.
+    """
+    driver = get_driver()
+    query = """
+    MATCH (l:LoopLease)
+    WHERE l.shard IN $shards AND l.owner = $owner
+    // Lock only our own leases, then re-check them
+    SET l.lockedAt = timestamp()
+    WITH l
+    WHERE l.owner = $owner AND l.expiresAt >= timestamp()
+    SET l.expiresAt = timestamp() + $ttl_ms
+    RETURN collect(l.shard) AS renewed
+    """
+    with driver.session() as session:
+        record = session.run(query, shards=list(shards), owner=owner, ttl_ms=ttl_seconds * 1000).single()
+        return set(record["renewed"]) if record else set()
+
+
+def get_free_shards(total_shards: int) -> list:
+    """Shards whose lease is missing, released or expired. Read-only; claim them with try_acquire_shard_lease."""
+    driver = get_driver()
+    query = """
+    UNWIND range(0, $total - 1) AS shard
+    OPTIONAL MATCH (l:LoopLease {shard: shard})
+    WITH shard, l
+    WHERE l IS NULL OR l.owner IS NULL OR l.expiresAt < timestamp()
+    RETURN collect(shard) AS free
+    """
+    with driver.session() as session:
+        record = session.run(query, total=total_shards).single()
+        return list(record["free"]) if record else []
+
+
+def try_acquire_shard_lease(shard: int, owner: str, ttl_seconds: int) -> bool:
+    """
+    Claim or renew the lease on an agent-loop shard. Succeeds if the lease is
+    free, expired, or already held by `owner`. Expiry uses the database clock
+    so replicas with skewed clocks still agree.
+    """
+    driver = get_driver()
+    query = """
+    MERGE (l:LoopLease {shard: $shard})
+    // Take the node's write lock before reading the current owner
+    SET l.lockedAt = timestamp()
+    WITH l
+    WHERE l.owner IS NULL OR l.owner = $owner OR l.expiresAt < timestamp()
+    SET l.owner = $owner, l.expiresAt = timestamp() + $ttl_ms
+    RETURN count(l) > 0 AS acquired
+    """
+    with driver.session() as session:
+        record = session.run(query, shard=shard, owner=owner, ttl_ms=ttl_seconds * 1000).single()
+        return bool(record and record["acquired"])
+
+
+def release_shard_lease(shard: int, owner: str):
+    """Give up a shard lease so another worker can claim it immediately."""
+    driver = get_driver()
+    query = """
+    MATCH (l:LoopLease {shard: $shard, owner: $owner})
+    SET l.owner = null, l.expiresAt = 0
+    """
+    with driver.session() as session:
+        session.run(query, shard=shard, owner=owner)
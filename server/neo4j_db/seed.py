@@ -77,10 +77,20 @@ MERGE (c3)-[:PLACED]->(o3)
 """
 
 
+# Indexes backing the agent loop's keyset-paginated order feed and shard leases
+INDEX_CYPHER = [
+    "CREATE INDEX order_id IF NOT EXISTS FOR (o:Order) ON (o.id)",
+    "CREATE INDEX order_status IF NOT EXISTS FOR (o:Order) ON (o.status)",
+    "CREATE CONSTRAINT loop_lease_shard IF NOT EXISTS FOR (l:LoopLease) REQUIRE l.shard IS UNIQUE",
+]
+
+
 def seed_database():
     """Run the idempotent seed script against Neo4j."""
     driver = get_driver()
     with driver.session() as session:
+        for statement in INDEX_CYPHER:
+            session.run(statement)
         session.run(SEED_CYPHER)
     print("[Neo4j] Seed data loaded (3 customers, 3 orders, 1 prior issue)")
 
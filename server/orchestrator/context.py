@@ -0,0 +1,71 @@
+"""
+Request-scoped state for one resolution.
+
+A ResolutionContext follows a single resolution from its caller (agent loop,
+/api/trigger-delay, /api/chat) through the orchestrator and the dashboard
+emitters. It carries the order row, the customer's graph context and the
+policy. Whoever needs one of them first looks it up and stores it here, and
+everyone after reuses it, so each lookup runs once per resolution.
+
+A caller that passes a ResolutionWrites (server.neo4j_db.queries) owns the
+graph writes: the orchestrator only records the Issue/Resolution pair on it,
+and the caller commits it together with the order-status change.
+
+The lane (chat, voice or proactive) decides its priority for the shared
+Fastino, Shopify and Yutori capacity — see server.integrations.lanes.
+"""
+from server.integrations.lanes import LANES
+
+
+class ResolutionContext:
+    def __init__(
+        self,
+        customer_id: str,
+        customer_message: str,
+        delay_days: int = 0,
+        order_id: str = None,
+        order: dict = None,
+        graph_context: dict = None,
+        policy: dict = None,
+        external_context: str = None,
+        lane: str = "proactive",
+        writes=None,
+    ):
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane {lane!r}")
+        self.customer_id = customer_id
+        self.customer_message = customer_message
+        self.delay_days = delay_days
+        self.order = order or {}
+        self.order_id = order_id or self.order.get("orderId")
+        # Agent-loop order rows arrive with the customer's graph context attached
+        self.graph_context = graph_context if graph_context is not None else self.order.get("graphContext")
+        self.policy = policy
+        self.external_context = external_context
+        self.lane = lane
+        self.writes = writes
+
+    @classmethod
+    def for_delayed_order(cls, order: dict, days_late: int, lane: str = "proactive",
+                          writes=None) -> "ResolutionContext":
+        """Context for a proactive delay alert on an order row from Neo4j."""
+        auto_message = (
+            f"PROACTIVE ALERT: Carrier tracking shows Order {order['orderId']} "
+            f"({order.get('product', 'item')}) is {days_late} days late. "
+            f"Customer {order['customerName']} is a {order.get('tier', 'standard')} customer."
+        )
+        return cls(order["customerId"], auto_message, delay_days=days_late, order=order,
+                   lane=lane, writes=writes)
+
+    @property
+    def tier(self) -> str:
+        """Customer tier from the order row or graph context; None until one is known."""
+        return self.order.get("tier") or (self.graph_context or {}).get("tier")
+
+    @property
+    def carrier(self) -> str:
+        return self.order.get("carrier")
+
+    @property
+    def customer_name(self) -> str:
+        return self.order.get("customerName") or (self.graph_context or {}).get("name") or "Customer"
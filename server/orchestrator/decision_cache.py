@@ -0,0 +1,179 @@
+"""
+Memoized decisions for proactive delay alerts.
+
+Proactive prompts are templated, so customers with the same tier, delay
+bucket, issue count, order count, credit band and carrier get the same
+decision apart from the personal details in the message. Decisions are
+cached on those normalized features (plus the full policy in force), with
+the personal details swapped for placeholders, and rendered locally for the
+next customer. A message that still mentions anything personal after
+templating (another product, a credit total, a surname) is not cached, and
+the model's reasoning is never cached — it quotes the customer's history.
+
+Entries expire after DECISION_CACHE_TTL_SECONDS, the least recently used are
+dropped beyond DECISION_CACHE_SIZE, and a policy or prompt change (see
+senso.policy_version and prompt.PREFIX_VERSION) moves every lookup onto
+fresh keys. A policy answer from Senso that changes mid-process also drops
+the whole cache (senso.on_policy_change).
+"""
+import hashlib
+import json
+import os
+import re
+
+from server.integrations.cache import TTLCache
+from server.integrations.senso import delay_bucket, on_policy_change, policy_version
+from server.orchestrator.prompt import PREFIX_VERSION
+
+DECISION_CACHE_TTL_SECONDS = int(os.getenv("DECISION_CACHE_TTL_SECONDS", "3600"))
+DECISION_CACHE_SIZE = int(os.getenv("DECISION_CACHE_SIZE", "5000"))
+
+_decisions = TTLCache("decisions", ttl=DECISION_CACHE_TTL_SECONDS, max_entries=DECISION_CACHE_SIZE)
+
+# Product-name words this short ("Air", "90") are too generic to flag a leak
+_MIN_PRODUCT_WORD = 4
+
+
+def _issue_band(total_issues: int) -> str:
+    return str(total_issues) if total_issues < 3 else "3+"
+
+
+def _order_band(total_orders: int, total_issues: int) -> str:
+    # The prompt treats 10+ orders with no prior issues as implicit VIP
+    if total_orders >= 10:
+        return "implicit_vip" if not total_issues else "10+"
+    return "<10"
+
+
+def _policy_fingerprint(policy: dict) -> str:
+    """Everything the prompt shows from the policy, brand voice / Senso answer included."""
+    return hashlib.sha1(json.dumps(policy or {}, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:12]
+
+
+def _credit_band(total_credits: float) -> str:
+    if not total_credits:
+        return "none"
+    if total_credits <= 50:
+        return "low"
+    # Above 100 the prompt flags the customer for review
+    return "mid" if total_credits <= 100 else "high"
+
+
+def decision_key(ctx: dict, policy: dict, delay_days: int, carrier: str) -> tuple:
+    """Normalized features a proactive decision depends on."""
+    return (
+        policy_version(),
+        PREFIX_VERSION,
+        _policy_fingerprint(policy),
+        (ctx.get("tier") or "standard").lower(),
+        delay_bucket(delay_days),
+        _issue_band(ctx.get("totalIssues") or 0),
+        _order_band(ctx.get("totalOrders") or 0, ctx.get("totalIssues") or 0),
+        _credit_band(ctx.get("totalCreditsGiven") or 0),
+        (carrier or "").lower(),
+    )
+
+
+def _shared_reasoning(key: tuple) -> str:
+    """Reasoning for a reused decision, built from the key's bands only."""
+    tier, bucket, issues, orders, credits, carrier = key[3:]
+    return (
+        f"Reused the decision for {tier} customers {bucket.replace('_', ' ')} "
+        f"({issues} prior issue(s), {orders} orders, {credits} credit history, carrier {carrier or 'unknown'})."
+    )
+
+
+def personal_fields(ctx: dict, order_id: str, delay_days: int) -> dict:
+    """The per-customer values that get templated out of a cached message."""
+    name = ctx.get("name") or ""
+    order = next((o for o in ctx.get("orderHistory") or [] if o.get("orderId") == order_id), {})
+    return {
+        "name": name,
+        "first_name": name.split()[0] if name else "",
+        "order_id": order_id or "",
+        "product": order.get("product") or "",
+        "days_late": str(delay_days),
+    }
+
+
+def _to_template(text: str, fields: dict) -> str:
+    text = text.replace("{", "{{").replace("}", "}}")
+    # Longest values first, so "Sarah Chen" is replaced before "Sarah"
+    for token, value in sorted(fields.items(), key=lambda kv: -len(kv[1])):
+        if not value or token == "days_late":
+            continue
+        text = text.replace(value, "{" + token + "}")
+    days = re.escape(fields["days_late"])
+    return re.sub(rf"\b{days}(?=[ -](?:business[ -])?days?\b)", "{days_late}", text)
+
+
+def _render(template: str, fields: dict) -> str:
+    return template.format(**fields)
+
+
+def _money(amount) -> tuple:
+    return (f"${amount:,.2f}", f"${amount:,.0f}", f"${amount:.2f}", f"${amount:.0f}")
+
+
+def _leaks(template: str, ctx: dict) -> bool:
+    """True when a templated message still carries anything specific to the customer it was written for."""
+    name = ctx.get("name") or ""
+    terms = [part for part in name.split() if len(part) > 1]
+    if ctx.get("email"):
+        terms.append(ctx["email"])
+    for order in ctx.get("orderHistory") or []:
+        if order.get("orderId"):
+            terms.append(order["orderId"])
+        words = re.findall(r"[A-Za-z0-9]+", order.get("product") or "")
+        terms.extend(w for w in words if len(w) >= _MIN_PRODUCT_WORD)
+    for total in ("totalCreditsGiven", "ltv"):
+        if ctx.get(total):
+            terms.extend(_money(float(ctx[total])))
+    text = template.lower()
+    return any(re.search(rf"(?<![\w$]){re.escape(term.lower())}(?![\w])", text) for term in terms)
+
+
+def lookup(key: tuple, fields: dict, count: bool = True) -> dict:
+    """
+    Return a rendered copy of the cached decision for key, or None. With
+    count=False the lookup stays out of the hit/miss counters (a batch
+    reusing the decision its own leader just stored).
+    """
+    entry = _decisions.get(key) if count else _decisions.peek(key)
+    if entry is None:
+        return None
+    decision = dict(entry)
+    decision["message"] = _render(entry["message"], fields)
+    decision["reasoning"] = _shared_reasoning(key)
+    return decision
+
+
+def store(key: tuple, decision: dict, fields: dict, ctx: dict):
+    """
+    Cache an LLM decision as a template. Raw-text fallbacks are not cached,
+    nor is a message that can't be made free of the customer's details.
+    """
+    if decision.get("reasoning", "").startswith("LLM response was not valid JSON"):
+        return
+    message = _to_template(str(decision.get("message", "")), fields)
+    if _leaks(message, ctx):
+        return
+    _decisions.put(key, {
+        "action": decision["action"],
+        "creditAmount": decision["creditAmount"],
+        "requiresHumanReview": decision["requiresHumanReview"],
+        "message": message,
+    })
+
+
+def invalidate():
+    """Drop every cached decision."""
+    _decisions.invalidate()
+
+
+on_policy_change(invalidate)
+
+
+def get_decision_cache_stats() -> dict:
+    """Hit/miss counters for the decision cache."""
+    return _decisions.stats()
@@ -4,29 +4,186 @@ Main orchestrator — the brain of Resolve.
 Flow:
   1. Query Neo4j for customer context
   2. Query Senso for applicable policy (optional, based on delay_days)
+     — steps 1-2 and the Tavily search run concurrently, each with a timeout
   3. Build prompt with all context
-  4. Call GPT-4o → structured JSON decision
-  5. Execute action (write Issue + Resolution to Neo4j)
+  4. Call GPT-4o → structured JSON decision (proactive alerts fully decided by
+     policy go through orchestrator.rules instead, then the decision cache;
+     while the LLM's circuit breaker is open, rules.fallback answers)
+  5. Execute action (record Issue + Resolution; written in one transaction
+     by whoever owns the context's ResolutionWrites)
   6. Return decision
+
+The pipeline is natively async (orchestrate_async); orchestrate() is the
+blocking wrapper used by Flask routes and agent-loop workers.
+orchestrate_batch runs the same steps for many orders with shared lookups.
 """
-from server.neo4j_db.queries import (
-    get_graph_context,
-    create_issue_node,
-    create_resolution_node,
+import asyncio
+import os
+
+from server.neo4j_db.queries import ResolutionWrites
+from server.neo4j_db.async_queries import (
+    get_graph_context_async,
+    get_graph_contexts_async,
+    commit_writes_async,
 )
-from server.integrations.openai_client import call_llm
-from server.integrations.senso import get_policy
-from server.integrations.tavily import search_web
-from server.websocket.events import emit_tavily_search, emit_neo4j_context, emit_activity
+from server.integrations.circuit_breaker import CircuitOpenError
+from server.integrations.lanes import current_lane, lane, run_in_lane
+from server.integrations.openai_client import call_llm_async, call_llm_stream_async
+from server.integrations.senso import get_policy_async, _get_local_policy, delay_bucket
+from server.integrations.tavily import search_web_async
+from server.integrations.transport import run_sync
+from server.websocket.events import emit_tavily_search, emit_neo4j_context, emit_policy_lookup, emit_activity
 from server.orchestrator.prompt import build_user_prompt
+from server.orchestrator import decision_cache, rules
+from server.orchestrator.context import ResolutionContext
 
+GRAPH_TIMEOUT_SECONDS = float(os.getenv("ORCHESTRATOR_GRAPH_TIMEOUT_SECONDS", "10"))
+POLICY_TIMEOUT_SECONDS = float(os.getenv("ORCHESTRATOR_POLICY_TIMEOUT_SECONDS", "20"))
+SEARCH_TIMEOUT_SECONDS = float(os.getenv("ORCHESTRATOR_SEARCH_TIMEOUT_SECONDS", "8"))
 
-def orchestrate(
-    customer_id: str,
-    customer_message: str,
+_DEMO_CUSTOMERS = {
+    "customer-001": {"name": "Sarah Chen", "tier": "vip", "email": "sarah@demo.com"},
+    "customer-002": {"name": "Marcus Johnson", "tier": "standard", "email": "marcus@demo.com"},
+    "customer-003": {"name": "Priya Patel", "tier": "vip", "email": "priya@demo.com"},
+}
+
+
+def _demo_context(customer_id: str) -> dict:
+    """Neo4j unavailable — use demo fallback context."""
+    cust = _DEMO_CUSTOMERS.get(customer_id)
+    if not cust:
+        return None
+    return {
+        "name": cust["name"], "tier": cust["tier"], "ltv": 0,
+        "totalOrders": 1, "totalIssues": 0, "totalCreditsGiven": 0,
+        "issueHistory": [], "orderHistory": []
+    }
+
+
+async def _graph_context(customer_id: str) -> dict:
+    try:
+        return await get_graph_context_async(customer_id)
+    except RuntimeError:
+        return _demo_context(customer_id)
+
+
+async def _search_carrier_news(carrier: str) -> str:
+    """Search the web for carrier delays / weather and format it as prompt context."""
+    query = f"{carrier} shipping delays weather news"
+    emit_tavily_search(query)
+    search_res = await search_web_async(query)
+
+    if not search_res.get("results"):
+        return None
+    external_context = f"Recent web search results for '{query}':\n"
+    for r in search_res["results"]:
+        external_context += f"- {r['title']}: {r['snippet']}\n"
+    return external_context
+
+
+def _carrier_for(ctx: dict, order_id: str, carrier: str = None) -> str:
+    """The caller's carrier hint, else the order's carrier from the graph context."""
+    if carrier:
+        return carrier
+    if order_id and ctx.get("orderHistory"):
+        order = next((o for o in ctx["orderHistory"] if o.get("orderId") == order_id), None)
+        if order and order.get("carrier"):
+            return order["carrier"]
+    return "shipping"
+
+
+def _emit_graph_insights(ctx: dict):
+    emit_neo4j_context(ctx["name"], ctx["totalOrders"], ctx["totalIssues"], ctx["totalCreditsGiven"])
+    if ctx["totalIssues"] == 0:
+        emit_activity("neo4j", '[Neo4j Graph] First-time issue detected -> applying "first-time" response policy')
+    elif ctx["totalCreditsGiven"] > 100:
+        emit_activity("neo4j", '[Neo4j Graph] High credit history detected -> flagging for review')
+
+
+def _customer_not_found(customer_id: str) -> dict:
+    return {
+        "action": "escalate",
+        "message": "Customer not found.",
+        "creditAmount": 0,
+        "requiresHumanReview": True,
+        "reasoning": f"No customer found with ID {customer_id}",
+        "customer_context": None,
+        "policy": None,
+    }
+
+
+def _source(customer_message: str, delay_days: int) -> str:
+    return "proactive" if delay_days > 0 and "PROACTIVE ALERT" in customer_message else "reactive"
+
+
+def _build_prompts(ctx: dict, policy: dict, customer_message: str, delay_days: int, external_context: str) -> tuple:
+    return build_user_prompt(
+        graph_context=ctx,
+        policy=policy,
+        customer_message=customer_message,
+        source=_source(customer_message, delay_days),
+        external_context=external_context,
+    )
+
+
+def _fallback(rc: ResolutionContext) -> dict:
+    """Template decision for a resolution whose LLM call failed fast on the open circuit."""
+    ctx = rc.graph_context
+    return rules.fallback(ctx, rc.policy, rc.delay_days, rc.order_id, _carrier_for(ctx, rc.order_id, rc.carrier),
+                          _source(rc.customer_message, rc.delay_days) == "proactive")
+
+
+def _emit_llm_skipped(decision: dict):
+    if decision.get("fallback"):
+        emit_activity("llm", f"LLM unavailable (circuit open) — {decision['action']} from the fallback template")
+    elif decision.get("rule"):
+        emit_activity("llm", f"Rule '{decision['rule']}' decided {decision['action']} — LLM call skipped")
+    else:
+        emit_activity("llm", f"Decision cache hit — reusing a {decision['action']} decision, LLM call skipped")
+
+
+def _with_defaults(decision: dict) -> dict:
+    """Ensure all fields are present with defaults."""
+    decision.setdefault("action", "send_message")
+    decision.setdefault("message", "")
+    decision.setdefault("creditAmount", 0)
+    decision.setdefault("requiresHumanReview", False)
+    decision.setdefault("reasoning", "")
+    return decision
+
+
+def _issue_data(rc: ResolutionContext) -> dict:
+    return {
+        "type": "late_delivery" if rc.delay_days > 0 else "customer_inquiry",
+        "description": rc.customer_message[:200],
+    }
+
+
+def _resolution_data(decision: dict) -> dict:
+    return {
+        "action": decision["action"],
+        "creditAmount": decision["creditAmount"],
+        "message": decision["message"],
+    }
+
+
+async def _wait(task, timeout: float, label: str, fallback):
+    """Join a context lookup, falling back if it overruns its own timeout."""
+    try:
+        return await asyncio.wait_for(task, timeout)
+    except asyncio.TimeoutError:
+        print(f"[Orchestrator] {label} timed out after {timeout:.0f}s — continuing without it")
+        return fallback()
+
+
+async def orchestrate_async(
+    customer_id: str = None,
+    customer_message: str = None,
     delay_days: int = 0,
     order_id: str = None,
     external_context: str = None,
+    context: ResolutionContext = None,
+    on_message=None,
 ) -> dict:
     """
     Run the full orchestration pipeline.
@@ -37,6 +194,12 @@ def orchestrate(
         delay_days: If coming from the agent loop, how many days late
         order_id: If tied to a specific order
         external_context: Extra context (Tavily search results, etc.)
+        context: A ResolutionContext built by the caller instead of the
+            arguments above; without one, the resolution runs in the
+            caller's current lane. Graph context and policy it already carries are
+            reused; whatever is looked up here is stored back on it.
+        on_message: If given, the LLM reply is streamed and this is called
+            with each new fragment of its "message" as tokens arrive.
 
     Returns:
         {
@@ -49,103 +212,288 @@ def orchestrate(
             "policy": dict | None
         }
     """
-    # Step 1: Get full customer context from Neo4j
+    rc = context or ResolutionContext(
+        customer_id, customer_message, delay_days=delay_days, order_id=order_id,
+        external_context=external_context, lane=current_lane(),
+    )
+    delay_days = rc.delay_days
+    external_context = rc.external_context
+
+    # Step 1: Start the independent lookups concurrently — graph context from
+    # Neo4j, Senso policy and Tavily web search — each with its own timeout.
+    # With an order row on the context, tier and carrier are known up front.
+    graph_task = None
+    if rc.graph_context is None:
+        graph_task = asyncio.create_task(_graph_context(rc.customer_id))
+
+    policy_task = search_task = None
+    if delay_days > 0 and rc.policy is None and rc.tier:
+        policy_task = asyncio.create_task(get_policy_async(delay_days, rc.tier))
+    if delay_days > 0 and not external_context and rc.carrier:
+        search_task = asyncio.create_task(_search_carrier_news(rc.carrier))
+
+    # Lookups still running when this returns or raises (a cache hit, a
+    # Neo4j error) are cancelled rather than left to finish for nobody
     try:
-        ctx = get_graph_context(customer_id)
-    except RuntimeError:
-        # Neo4j unavailable — use demo fallback context
-        _demo_customers = {
-            "customer-001": {"name": "Sarah Chen", "tier": "vip", "email": "sarah@demo.com"},
-            "customer-002": {"name": "Marcus Johnson", "tier": "standard", "email": "marcus@demo.com"},
-            "customer-003": {"name": "Priya Patel", "tier": "vip", "email": "priya@demo.com"},
-        }
-        cust = _demo_customers.get(customer_id)
-        if cust:
-            ctx = {
-                "name": cust["name"], "tier": cust["tier"], "ltv": 0,
-                "totalOrders": 1, "totalIssues": 0, "totalCreditsGiven": 0,
-                "issueHistory": [], "orderHistory": []
-            }
-        else:
-            ctx = None
-
-    if ctx is None:
-        return {
-            "action": "escalate",
-            "message": "Customer not found.",
-            "creditAmount": 0,
-            "requiresHumanReview": True,
-            "reasoning": f"No customer found with ID {customer_id}",
-            "customer_context": None,
-            "policy": None,
-        }
+        if graph_task is not None:
+            rc.graph_context = await _wait(graph_task, GRAPH_TIMEOUT_SECONDS, "Neo4j graph context",
+                                           lambda: _demo_context(rc.customer_id))
+        ctx = rc.graph_context
 
-    emit_neo4j_context(ctx["name"], ctx["totalOrders"], ctx["totalIssues"], ctx["totalCreditsGiven"])
-    if ctx["totalIssues"] == 0:
-        emit_activity("neo4j", '[Neo4j Graph] First-time issue detected -> applying "first-time" response policy')
-    elif ctx["totalCreditsGiven"] > 100:
-        emit_activity("neo4j", '[Neo4j Graph] High credit history detected -> flagging for review')
+        if ctx is None:
+            return _customer_not_found(rc.customer_id)
 
-    # Step 2: Get applicable policy and external context if there's a delay
-    policy = None
-    if delay_days > 0:
-        tier = ctx.get("tier", "standard")
-        policy = get_policy(delay_days, tier)
-        
-        # Step 2.5: Search the web for context (carrier delays, weather) if none provided
-        if not external_context:
-            carrier = "shipping"
-            if order_id and ctx.get("orderHistory"):
-                order = next((o for o in ctx["orderHistory"] if o.get("orderId") == order_id), None)
-                if order and order.get("carrier"):
-                    carrier = order["carrier"]
-            
-            query = f"{carrier} shipping delays weather news"
-            emit_tavily_search(query)
-            search_res = search_web(query)
-            
-            if search_res.get("results"):
-                external_context = f"Recent web search results for '{query}':\n"
-                for r in search_res["results"]:
-                    external_context += f"- {r['title']}: {r['snippet']}\n"
-
-    # Step 3: Build the prompt
-    source = "proactive" if delay_days > 0 and "PROACTIVE ALERT" in customer_message else "reactive"
-    system_prompt, user_prompt = build_user_prompt(
-        graph_context=ctx,
-        policy=policy,
-        customer_message=customer_message,
-        source=source,
-        external_context=external_context,
-    )
+        _emit_graph_insights(ctx)
 
-    # Step 4: Call GPT-4o
-    decision = call_llm(system_prompt, user_prompt)
+        # Step 2: Join policy and external context if there's a delay. Lookups
+        # that needed the graph context start now, still in parallel.
+        carrier = _carrier_for(ctx, rc.order_id, rc.carrier)
+        if delay_days > 0:
+            if not external_context and search_task is None:
+                search_task = asyncio.create_task(_search_carrier_news(carrier))
 
-    # Ensure all fields are present with defaults
-    decision.setdefault("action", "send_message")
-    decision.setdefault("message", "")
-    decision.setdefault("creditAmount", 0)
-    decision.setdefault("requiresHumanReview", False)
-    decision.setdefault("reasoning", "")
+            tier = rc.tier or "standard"
+            if rc.policy is None:
+                if policy_task is None:
+                    policy_task = asyncio.create_task(get_policy_async(delay_days, tier))
+                rc.policy = await _wait(policy_task, POLICY_TIMEOUT_SECONDS, "Senso policy lookup",
+                                        lambda: _get_local_policy(delay_days, tier))
+                emit_policy_lookup(delay_days, rc.policy["credit"], tier)
+        policy = rc.policy
 
-    # Step 5: Write Issue + Resolution to Neo4j if we have an order
-    if order_id:
-        try:
-            issue_id = create_issue_node(order_id, {
-                "type": "late_delivery" if delay_days > 0 else "customer_inquiry",
-                "description": customer_message[:200],
-            })
-
-            create_resolution_node(issue_id, {
-                "action": decision["action"],
-                "creditAmount": decision["creditAmount"],
-                "message": decision["message"],
-            })
-        except RuntimeError:
-            pass  # Neo4j unavailable — skip graph writes
+        # Proactive alerts decided by a rule or a memoized decision skip the web search and the LLM
+        cache_key = decision = None
+        if _source(rc.customer_message, delay_days) == "proactive":
+            decision = rules.decide(ctx, policy, delay_days, rc.order_id, carrier)
+            if decision is None:
+                cache_key = decision_cache.decision_key(ctx, policy, delay_days, carrier)
+                fields = decision_cache.personal_fields(ctx, rc.order_id, delay_days)
+                decision = decision_cache.lookup(cache_key, fields)
+
+        if decision is not None:
+            _emit_llm_skipped(decision)
+        else:
+            if search_task is not None:
+                external_context = await _wait(search_task, SEARCH_TIMEOUT_SECONDS, "Tavily web search",
+                                               lambda: None)
+
+            # Step 3: Build the prompt
+            system_prompt, user_prompt = _build_prompts(ctx, policy, rc.customer_message, delay_days, external_context)
+
+            # Step 4: Call GPT-4o, queued by the resolution's lane
+            try:
+                with lane(rc.lane):
+                    if on_message is not None:
+                        reply = await call_llm_stream_async(system_prompt, user_prompt, on_message)
+                    else:
+                        reply = await call_llm_async(system_prompt, user_prompt)
+            except CircuitOpenError:
+                decision = _fallback(rc)
+                _emit_llm_skipped(decision)
+            else:
+                decision = _with_defaults(reply)
+                if cache_key is not None:
+                    decision_cache.store(cache_key, decision, fields, ctx)
+    finally:
+        for task in (graph_task, policy_task, search_task):
+            if task is not None and not task.done():
+                task.cancel()
+
+    # Step 5: Record Issue + Resolution if we have an order. A caller that
+    # passed its own ResolutionWrites commits them with its other writes.
+    if rc.order_id:
+        writes = rc.writes if rc.writes is not None else ResolutionWrites()
+        writes.add_resolution(rc.order_id, _issue_data(rc), _resolution_data(decision))
+        if rc.writes is None:
+            try:
+                await commit_writes_async(writes)
+            except RuntimeError:
+                pass  # Neo4j unavailable — skip graph writes
 
     # Step 6: Return the full decision with context
     decision["customer_context"] = ctx
     decision["policy"] = policy
     return decision
+
+
+def orchestrate(
+    customer_id: str = None,
+    customer_message: str = None,
+    delay_days: int = 0,
+    order_id: str = None,
+    external_context: str = None,
+    context: ResolutionContext = None,
+    on_message=None,
+) -> dict:
+    """Blocking orchestrate_async — runs it on the shared async transport loop."""
+    return run_sync(orchestrate_async(
+        customer_id,
+        customer_message,
+        delay_days=delay_days,
+        order_id=order_id,
+        external_context=external_context,
+        context=context,
+        on_message=on_message,
+    ))
+
+
+async def orchestrate_batch_async(contexts: list) -> list:
+    """
+    Run the pipeline for many orders at once — e.g. a carrier incident that
+    makes dozens of orders late together. Takes one ResolutionContext per order.
+
+    Graph contexts come from one UNWIND query, the web search runs once per
+    carrier and the policy once per (tier, delay bucket), the LLM calls run
+    concurrently, and every Issue/Resolution pair is written in one
+    transaction (the caller's, for contexts that carry a ResolutionWrites).
+    Returns decisions in input order; an entry is the exception instead
+    when that order's LLM call failed (one that failed fast on the open
+    circuit gets the fallback decision).
+    """
+    if not contexts:
+        return []
+
+    # Step 1: Graph contexts for everyone who didn't bring one
+    missing = {rc.customer_id for rc in contexts if rc.graph_context is None}
+    fetched = {}
+    if missing:
+        try:
+            fetched = await _wait(get_graph_contexts_async(missing), GRAPH_TIMEOUT_SECONDS,
+                                  "Neo4j graph contexts", dict)
+        except RuntimeError:
+            pass  # Neo4j unavailable — demo contexts below
+    for rc in contexts:
+        if rc.graph_context is None:
+            rc.graph_context = fetched.get(rc.customer_id) or _demo_context(rc.customer_id)
+
+    # Step 2: One policy per (tier, delay bucket) for contexts without one
+    policy_tasks = {}
+    for rc in contexts:
+        if rc.graph_context is None or rc.delay_days <= 0 or rc.policy is not None:
+            continue
+        tier = rc.tier or "standard"
+        policy_key = (tier, delay_bucket(rc.delay_days))
+        if policy_key not in policy_tasks:
+            policy_tasks[policy_key] = (rc.delay_days, asyncio.create_task(_wait(
+                get_policy_async(rc.delay_days, tier), POLICY_TIMEOUT_SECONDS, "Senso policy lookup",
+                lambda d=rc.delay_days, t=tier: _get_local_policy(d, t))))
+    policies = {}
+    for (tier, bucket), (delay_days, task) in policy_tasks.items():
+        policies[(tier, bucket)] = await task
+        emit_policy_lookup(delay_days, policies[(tier, bucket)]["credit"], tier)
+    for rc in contexts:
+        if rc.policy is None and rc.graph_context is not None and rc.delay_days > 0:
+            rc.policy = policies[(rc.tier or "standard", delay_bucket(rc.delay_days))]
+
+    # Rule-decided and memoized proactive decisions skip the search and the
+    # LLM. Identical misses inside the batch share one LLM call (the first one's).
+    decisions = [None] * len(contexts)
+    pending, leaders, followers, hits = [], {}, {}, 0
+    for i, rc in enumerate(contexts):
+        ctx = rc.graph_context
+        if ctx is None:
+            decisions[i] = _customer_not_found(rc.customer_id)
+            continue
+        _emit_graph_insights(ctx)
+        carrier = _carrier_for(ctx, rc.order_id, rc.carrier)
+        cache_key = fields = None
+        if _source(rc.customer_message, rc.delay_days) == "proactive":
+            decisions[i] = rules.decide(ctx, rc.policy, rc.delay_days, rc.order_id, carrier)
+            if decisions[i] is not None:
+                hits += 1
+                continue
+            cache_key = decision_cache.decision_key(ctx, rc.policy, rc.delay_days, carrier)
+            fields = decision_cache.personal_fields(ctx, rc.order_id, rc.delay_days)
+            # A follower shares its leader's lookup, so the cache counts one miss per shared decision
+            if cache_key in leaders:
+                followers[i] = (leaders[cache_key], carrier, cache_key, fields)
+                continue
+            decisions[i] = decision_cache.lookup(cache_key, fields)
+            if decisions[i] is not None:
+                hits += 1
+                continue
+            leaders[cache_key] = i
+        pending.append((i, carrier, cache_key, fields))
+
+    # Step 2b: One web search per carrier among the orders still going to the LLM
+    search_tasks = {}
+    for i, carrier, _, _ in pending:
+        rc = contexts[i]
+        if rc.delay_days > 0 and not rc.external_context and carrier not in search_tasks:
+            search_tasks[carrier] = asyncio.create_task(_wait(
+                _search_carrier_news(carrier), SEARCH_TIMEOUT_SECONDS, "Tavily web search", lambda: None))
+    searches = dict(zip(search_tasks, await asyncio.gather(*search_tasks.values())))
+    emit_activity(
+        "system",
+        f"Batch orchestration: {len(contexts)} order(s), {len(policies)} policy lookup(s), "
+        f"{len(searches)} web search(es), {len(pending)} LLM call(s), {hits + len(followers)} decided without a new LLM call",
+    )
+
+    # Step 3-4: Build every prompt, then call the LLM for all of them at once
+    async def ask(entries: list) -> int:
+        """LLM call for each (index, carrier, cache_key, fields) entry; returns how many fell back."""
+        calls = []
+        for i, carrier, _, _ in entries:
+            rc = contexts[i]
+            external_context = rc.external_context or searches.get(carrier)
+            system_prompt, user_prompt = _build_prompts(
+                rc.graph_context, rc.policy, rc.customer_message, rc.delay_days, external_context)
+            calls.append(run_in_lane(rc.lane, call_llm_async(system_prompt, user_prompt)))
+        replies = await asyncio.gather(*calls, return_exceptions=True)
+
+        fell_back = 0
+        for (i, _, cache_key, fields), reply in zip(entries, replies):
+            if isinstance(reply, CircuitOpenError):
+                decisions[i] = _fallback(contexts[i])
+                fell_back += 1
+                continue
+            if isinstance(reply, Exception):
+                decisions[i] = reply
+                continue
+            decisions[i] = _with_defaults(reply)
+            if cache_key is not None:
+                decision_cache.store(cache_key, decisions[i], fields, contexts[i].graph_context)
+        return fell_back
+
+    fallbacks = await ask(pending)
+    uncached = []
+    for i, (leader, carrier, cache_key, fields) in followers.items():
+        if isinstance(decisions[leader], Exception):
+            decisions[i] = decisions[leader]
+        elif decisions[leader].get("fallback"):
+            decisions[i] = _fallback(contexts[i])
+            fallbacks += 1
+        else:
+            decisions[i] = decision_cache.lookup(cache_key, fields, count=False)
+            if decisions[i] is None:
+                # The leader's reply wasn't cacheable (raw text, or personal to that
+                # customer), so it can't be reused — this order gets its own call
+                uncached.append((i, carrier, cache_key, fields))
+    if uncached:
+        fallbacks += await ask(uncached)
+    if fallbacks:
+        emit_activity("llm", f"LLM unavailable (circuit open) — {fallbacks} order(s) answered from the fallback template")
+
+    writes = ResolutionWrites()
+    for rc, decision in zip(contexts, decisions):
+        if isinstance(decision, Exception) or rc.graph_context is None:
+            continue
+        decision["customer_context"] = rc.graph_context
+        decision["policy"] = rc.policy
+
+        if rc.order_id:
+            (rc.writes if rc.writes is not None else writes).add_resolution(
+                rc.order_id, _issue_data(rc), _resolution_data(decision))
+
+    # Step 5: Write every Issue + Resolution not owned by the caller in a single transaction
+    try:
+        await commit_writes_async(writes)
+    except RuntimeError:
+        pass  # Neo4j unavailable — skip graph writes
+
+    return decisions
+
+
+def orchestrate_batch(contexts: list) -> list:
+    """Blocking orchestrate_batch_async."""
+    return run_sync(orchestrate_batch_async(contexts))
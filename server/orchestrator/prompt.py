@@ -1,8 +1,34 @@
 """
 GPT-4o system prompt for the Resolve orchestrator.
 Splits into PROACTIVE and REACTIVE based on whether a user messaged first.
+
+Layout is cache-friendly: the system message is a static prefix (persona +
+rules) built once at import and identical for every customer, so the
+inference server can reuse its KV cache across requests; everything
+customer-specific goes in the user message after it. Bump PROMPT_VERSION
+when the prefix text changes — cached decisions are keyed on it.
+
+The whole prompt is assembled against a token budget (PROMPT_TOKEN_BUDGET):
+the prefix, profile, issue history, policy and the message always go in;
+order history, external context, transcript summaries and calls share what
+is left, newest entries first. Token counts are a local estimate.
 """
+import hashlib
 import json
+import os
+import re
+import threading
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "3000"))
+# Rough average for English text on GPT-style and Qwen tokenizers
+CHARS_PER_TOKEN = 4
+SUMMARY_CHARS = 200
+SHORT_SUMMARY_CHARS = 80
+# How the budget left after the fixed sections is split, in priority order
+SECTION_SHARES = (("orders", 0.5), ("external", 0.2), ("transcripts", 0.2), ("calls", 0.1))
+
+_stats = {"prompts": 0, "trimmed": 0, "overBudget": 0, "maxTokens": 0, "sectionTokens": {}}
+_stats_lock = threading.Lock()
 
 PROACTIVE_PROMPT = """You are Resolve, an autonomous CS agent for a DTC sneaker brand.
 You are monitoring orders autonomously. No customer has messaged yet.
@@ -18,6 +44,85 @@ Be conversational. Match the customer's energy — if they're frustrated,
 acknowledge it directly before solving.
 """
 
+RULES_PROMPT = """
+GRAPH-INFORMED RULES (apply these based on the customer data in the user message):
+- If totalCreditsGiven > $100 in last 30 days → flag for human review even if under auto-approve threshold
+- If this is customer's 2nd+ issue → add a personal acknowledgment: "We know this isn't the first time we've let you down..."
+- If customer has 10+ orders and 0 prior issues → treat as implicit VIP regardless of tier label
+- If last resolution was a refund → do NOT offer another refund for same order type, offer replacement instead
+- If totalIssues = 0 → this is their first bad experience, be especially warm
+- If the order is 10 or more days late -> action = file_carrier_claim
+
+RESPONSE RULES:
+- Output ONLY valid JSON: { "action", "message", "creditAmount", "requiresHumanReview", "reasoning" }
+- The 'action' string must be one of: send_message | apply_credit | process_refund | escalate | file_carrier_claim
+- Use first name. Never say "I apologize for the inconvenience."
+- Explain credits in plain English.
+- reasoning field must reference specific graph data: "Customer has had 2 prior issues and received $30 in credits. Escalating to human review to avoid credit abuse."
+"""
+
+PROMPT_VERSION = "2"
+
+# Static prefixes, prebuilt once: persona + rules, nothing customer-specific
+SYSTEM_PROMPTS = {
+    "proactive": PROACTIVE_PROMPT + RULES_PROMPT,
+    "reactive": REACTIVE_PROMPT + RULES_PROMPT,
+}
+PREFIX_VERSION = PROMPT_VERSION + "-" + hashlib.sha1(
+    "".join(SYSTEM_PROMPTS[k] for k in sorted(SYSTEM_PROMPTS)).encode()
+).hexdigest()[:8]
+_PREFIX_TOKENS = {source: -(-len(text) // CHARS_PER_TOKEN) for source, text in SYSTEM_PROMPTS.items()}
+
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of text, without a tokenizer."""
+    return -(-len(text) // CHARS_PER_TOKEN)
+
+
+def _newest_that_fit(items: list, budget: int, pinned: set = frozenset()) -> tuple:
+    """
+    Pick lines from items (oldest first; each a tuple of renderings, longest
+    first). Pinned items always stay, then the newest items that fit in
+    budget tokens, each in its longest rendering that fits. Returns
+    (kept lines in original order, number dropped).
+    """
+    kept = {i: items[i][0] for i in pinned}
+    used = sum(estimate_tokens(line) + 1 for line in kept.values())
+    for i in reversed(range(len(items))):
+        if i in kept:
+            continue
+        line = next((r for r in items[i] if used + estimate_tokens(r) + 1 <= budget), None)
+        if line is None:
+            break  # keep one contiguous recent window
+        kept[i] = line
+        used += estimate_tokens(line) + 1
+    return [kept[i] for i in sorted(kept)], len(items) - len(kept)
+
+
+def _record_usage(usage: dict):
+    with _stats_lock:
+        _stats["prompts"] += 1
+        _stats["trimmed"] += 1 if any(usage["omitted"].values()) else 0
+        _stats["overBudget"] += 1 if usage["total"] > usage["budget"] else 0
+        _stats["maxTokens"] = max(_stats["maxTokens"], usage["total"])
+        for section, tokens in usage["sections"].items():
+            _stats["sectionTokens"][section] = _stats["sectionTokens"].get(section, 0) + tokens
+
+
+def get_prompt_stats() -> dict:
+    """Prompt sizes so far: average tokens per section, how often trimming kicked in."""
+    with _stats_lock:
+        n = _stats["prompts"] or 1
+        return {
+            "budget": PROMPT_TOKEN_BUDGET,
+            "prompts": _stats["prompts"],
+            "trimmed": _stats["trimmed"],
+            "overBudget": _stats["overBudget"],
+            "maxTokens": _stats["maxTokens"],
+            "avgSectionTokens": {k: round(v / n, 1) for k, v in _stats["sectionTokens"].items()},
+        }
+
+
 def build_user_prompt(
     graph_context: dict,
     policy: dict,
@@ -29,8 +134,29 @@ def build_user_prompt(
     Build the system and user messages that include all context for GPT-4o.
     Returns (system_prompt, user_prompt).
     """
-    system_prompt = PROACTIVE_PROMPT if source == "proactive" else REACTIVE_PROMPT
-    
+    system_prompt, user_prompt, _ = assemble_user_prompt(
+        graph_context, policy, customer_message, source=source, external_context=external_context)
+    return system_prompt, user_prompt
+
+
+def assemble_user_prompt(
+    graph_context: dict,
+    policy: dict,
+    customer_message: str,
+    source: str = "reactive",
+    external_context: str = None,
+    budget: int = None,
+) -> tuple:
+    """
+    build_user_prompt, trimmed to `budget` tokens (PROMPT_TOKEN_BUDGET by
+    default; the static prefix counts against it). Returns (system_prompt,
+    user_prompt, usage) where usage has the estimated tokens per section and
+    how much of each section was left out.
+    """
+    budget = PROMPT_TOKEN_BUDGET if budget is None else budget
+    source = "proactive" if source == "proactive" else "reactive"
+    system_prompt = SYSTEM_PROMPTS[source]
+
     # Safely get properties
     name = graph_context.get("name", "Customer")
     tier = graph_context.get("tier", "standard")
@@ -59,65 +185,108 @@ def build_user_prompt(
             f"- VIP multiplier: {vip_mult}x\n"
             f"- Max auto-approve: ${max_approve}\n"
         )
-    
-    # Format order history so the LLM can see the customer's orders
-    order_history = graph_context.get("orderHistory", [])
-    order_history_str = "\n".join([
-        f"- {o.get('orderId', 'Unknown')}: {o.get('product', 'Unknown product')} — status: {o.get('status', 'unknown')}, total: ${o.get('total', 0)}"
+
+    # Sections in prompt order; None marks the ones filled in below
+    sections = {
+        "profile": "\n".join([
+            f"CUSTOMER PROFILE (from knowledge graph):",
+            f"- Name: {name}",
+            f"- Tier: {tier}",
+            f"- Lifetime Value: ${ltv:,.2f}",
+            f"- Total Orders: {total_orders}",
+            f"- Past Issues: {total_issues}",
+            f"- Total Credits Already Given: ${total_credits:,.2f}",
+        ]),
+        "orders": None,
+        "issues": f"\nISSUE HISTORY (last 3):\n{issue_history_str}",
+        "policy": f"\n{policy_str.rstrip()}" if policy_str else None,
+        "calls": None,
+        "transcripts": None,
+        "external": None,
+        "message": f"\nCUSTOMER MESSAGE (or PROACTIVE TRIGGER):\n{customer_message}",
+    }
+    headers = {
+        "orders": "\nORDER HISTORY:",
+        "calls": "\n=== CALL HISTORY ===",
+        "transcripts": "\n=== RECENT TRANSCRIPT SUMMARIES ===",
+        "external": "\nEXTERNAL CONTEXT:",
+    }
+
+    # Order history so the LLM can see the customer's orders, oldest first
+    # (collect() in the graph query gives no order); orders named in the
+    # message are always kept
+    order_history = sorted(
+        graph_context.get("orderHistory", []),
+        key=lambda o: (o.get("estimatedDelivery") or "", o.get("orderId") or ""),
+    )
+    orders = [
+        (f"- {o.get('orderId', 'Unknown')}: {o.get('product', 'Unknown product')} — status: {o.get('status', 'unknown')}, total: ${o.get('total', 0)}",)
         for o in order_history
-    ]) if order_history else "- None"
-
-    components = [
-        f"CUSTOMER PROFILE (from knowledge graph):",
-        f"- Name: {name}",
-        f"- Tier: {tier}",
-        f"- Lifetime Value: ${ltv:,.2f}",
-        f"- Total Orders: {total_orders}",
-        f"- Past Issues: {total_issues}",
-        f"- Total Credits Already Given: ${total_credits:,.2f}",
-        f"\nORDER HISTORY:",
-        order_history_str,
-        f"\nISSUE HISTORY (last 3):",
-        issue_history_str,
-        f"\n{policy_str}",
-        f"GRAPH-INFORMED RULES (apply these based on the data above):",
-        "- If totalCreditsGiven > $100 in last 30 days → flag for human review even if under auto-approve threshold",
-        "- If this is customer's 2nd+ issue → add a personal acknowledgment: \"We know this isn't the first time we've let you down...\"",
-        "- If customer has 10+ orders and 0 prior issues → treat as implicit VIP regardless of tier label",
-        "- If last resolution was a refund → do NOT offer another refund for same order type, offer replacement instead",
-        "- If totalIssues = 0 → this is their first bad experience, be especially warm",
-        "- If the order is 10 or more days late -> action = file_carrier_claim",
-        "\nRESPONSE RULES:",
-        "- Output ONLY valid JSON: { \"action\", \"message\", \"creditAmount\", \"requiresHumanReview\", \"reasoning\" }",
-        "- The 'action' string must be one of: send_message | apply_credit | process_refund | escalate | file_carrier_claim",
-        "- Use first name. Never say \"I apologize for the inconvenience.\"",
-        "- Explain credits in plain English.",
-        "- reasoning field must reference specific graph data: \"Customer has had 2 prior issues and received $30 in credits. Escalating to human review to avoid credit abuse.\""
     ]
+    mentioned = set(re.findall(r"[\w-]+", customer_message))
+    pinned_orders = {i for i, o in enumerate(order_history) if o.get("orderId") in mentioned}
+
+    # Call history and transcript summaries from past calls, oldest first
+    calls = sorted(graph_context.get("calls", []), key=lambda c: c.get("startedAt") or "")
+    call_lines = [
+        (f"- Call on {(c.get('startedAt') or 'N/A')[:10]} | Duration: {c.get('duration', 0)}s | Initiated by: {c.get('initiatedBy', 'unknown')}",)
+        for c in calls
+    ]
+    transcripts = sorted(
+        (t for t in graph_context.get("transcripts", []) if t.get("summary")),
+        key=lambda t: t.get("createdAt") or "",
+    )
+    transcript_lines = [
+        tuple(f"- [{(t.get('createdAt') or 'N/A')[:10]}] {t['summary'][:limit]}" for limit in (SUMMARY_CHARS, SHORT_SUMMARY_CHARS))
+        for t in transcripts
+    ]
+
+    fixed = sum(estimate_tokens(text) + 1 for text in sections.values() if text is not None)
+    available = budget - _PREFIX_TOKENS[source] - fixed
+    omitted = {"orders": 0, "externalChars": 0, "transcripts": 0, "calls": 0}
+
+    # Each section gets its share of what's left; unused tokens roll over to the next
+    spare = 0
+    for section, share in SECTION_SHARES:
+        room = int(available * share) + spare - estimate_tokens(headers[section]) - 1
+        if section == "orders":
+            kept, omitted["orders"] = _newest_that_fit(orders, room, pinned_orders)
+            if omitted["orders"]:
+                kept.insert(0, f"- ({omitted['orders']} older order(s) omitted)")
+            # The order history header is always there, "- None" when empty
+            sections["orders"] = "\n".join([headers["orders"], "\n".join(kept) if kept else "- None"])
+        elif section == "external":
+            if not external_context:
+                kept = []
+            elif len(external_context) <= room * CHARS_PER_TOKEN:
+                kept = [external_context]
+            else:
+                chars = max(room, 0) * CHARS_PER_TOKEN
+                omitted["externalChars"] = len(external_context) - chars
+                kept = [external_context[:chars].rstrip() + " …"] if chars else []
+            if kept:
+                sections["external"] = "\n".join([headers["external"], *kept])
+        else:
+            items = transcript_lines if section == "transcripts" else call_lines
+            kept, omitted[section] = _newest_that_fit(items, room)
+            if kept:
+                sections[section] = "\n".join([headers[section], *kept])
+        used = estimate_tokens(sections[section]) + 1 if sections[section] is not None else 0
+        spare = int(available * share) + spare - used
+
+    present = {k: text for k, text in sections.items() if text is not None}
+    user_prompt = "\n".join(present.values())
 
-    # Call history
-    calls = graph_context.get("calls", [])
-    if calls:
-        components.append("\n=== CALL HISTORY ===")
-        for c in calls:
-            initiated = c.get("initiatedBy", "unknown")
-            duration = c.get("duration", 0)
-            started = c.get("startedAt", "N/A")
-            components.append(
-                f"- Call on {started[:10]} | Duration: {duration}s | Initiated by: {initiated}"
-            )
-
-    # Transcript summaries from past calls
-    transcripts = graph_context.get("transcripts", [])
-    transcript_summaries = [t for t in transcripts if t.get("summary")]
-    if transcript_summaries:
-        components.append("\n=== RECENT TRANSCRIPT SUMMARIES ===")
-        for t in transcript_summaries:
-            components.append(f"- [{t.get('createdAt', 'N/A')[:10]}] {t.get('summary', '')[:200]}")
-
-    if external_context:
-        components.append(f"\nEXTERNAL CONTEXT:\n{external_context}")
-
-    components.append(f"\nCUSTOMER MESSAGE (or PROACTIVE TRIGGER):\n{customer_message}")
-
-    return system_prompt, "\n".join(components)
+    usage = {
+        "budget": budget,
+        "prefixVersion": PREFIX_VERSION,
+        "system": _PREFIX_TOKENS[source],
+        "total": _PREFIX_TOKENS[source] + estimate_tokens(user_prompt),
+        "sections": {k: estimate_tokens(text) for k, text in present.items()},
+        "omitted": omitted,
+    }
+    _record_usage(usage)
+    if any(omitted.values()):
+        dropped = ", ".join(f"{k}: {v}" for k, v in omitted.items() if v)
+        print(f"[Prompt] Trimmed to ~{usage['total']}/{budget} tokens ({dropped})")
+    return system_prompt, user_prompt, usage
@@ -0,0 +1,157 @@
+"""
+Deterministic fast path for proactive delay alerts.
+
+Some outcomes are already fixed by the delay policy and the rules written
+into the prompt — there is nothing for the model to weigh. Those cases are
+decided here, ahead of the decision cache and the LLM; anything ambiguous
+returns None and goes to the model as before.
+
+Rules are evaluated in order and the first match wins. Counters for
+/api/metrics record how many LLM calls the fast path avoided.
+
+fallback() is the last resort while the LLM's circuit breaker is open: a
+templated escalation for any alert or chat message. It never credits,
+refunds or files a claim; a human decides that once they review it.
+"""
+import threading
+
+# Above this much credit the prompt always asks for human review
+HIGH_CREDIT_HISTORY = 100
+
+
+class Rule:
+    """A named predicate over the decision facts plus the decision it implies."""
+
+    def __init__(self, name: str, applies, decide):
+        self.name = name
+        self.applies = applies
+        self.decide = decide
+
+
+def _carrier_claim(f: dict) -> dict:
+    return {
+        "action": "file_carrier_claim",
+        "message": (
+            f"Hi {f['first_name']}, your {f['order']} is now {f['days']} days late, so we've "
+            f"opened a claim with {f['carrier']} to track it down. We'll keep you posted on the outcome."
+        ),
+        "creditAmount": 0,
+        "requiresHumanReview": f["credits"] > HIGH_CREDIT_HISTORY,
+        "reasoning": (
+            f"Order is {f['days']} days late (10+ days always files a carrier claim). "
+            f"Customer has {f['issues']} prior issue(s) and ${f['credits']:,.2f} in credits."
+        ),
+    }
+
+
+def _first_minor_delay(f: dict) -> dict:
+    return {
+        "action": "send_message",
+        "message": (
+            f"Hi {f['first_name']}, quick heads-up: your {f['order']} is running "
+            f"{f['days']} day{'s' if f['days'] != 1 else ''} behind. It's still on its way and "
+            f"we're keeping an eye on it for you."
+        ),
+        "creditAmount": 0,
+        "requiresHumanReview": False,
+        "reasoning": (
+            f"First issue for a standard customer ({f['orders']} order(s), no prior credits) and only "
+            f"{f['days']} day(s) late — policy is an apology with no credit."
+        ),
+    }
+
+
+RULES = (
+    Rule("carrier_claim", lambda f: f["days"] >= 10, _carrier_claim),
+    Rule(
+        "first_minor_delay",
+        lambda f: (
+            1 <= f["days"] <= 2
+            and f["issues"] == 0
+            and f["credits"] == 0
+            and f["tier"] == "standard"
+            # 10+ orders with no issues is treated as implicit VIP by the prompt
+            and f["orders"] < 10
+            and f["policy_credit"] == 0
+        ),
+        _first_minor_delay,
+    ),
+)
+
+def _alert_fallback(f: dict) -> dict:
+    return {
+        "action": "escalate",
+        "message": (
+            f"Hi {f['first_name']}, your {f['order']} is running {f['days']} "
+            f"day{'s' if f['days'] != 1 else ''} late — we're sorry about that. A member of our team "
+            f"is looking into it and will follow up with you shortly."
+        ),
+        "creditAmount": 0,
+        "requiresHumanReview": True,
+        "reasoning": "LLM unavailable (circuit open) — delay alert escalated to a human agent, no action taken.",
+    }
+
+
+def _handoff_fallback(f: dict) -> dict:
+    return {
+        "action": "escalate",
+        "message": (
+            f"Hi {f['first_name']}, thanks for your message. I've passed it to a member of our "
+            f"team, and they'll get back to you shortly."
+        ),
+        "creditAmount": 0,
+        "requiresHumanReview": True,
+        "reasoning": "LLM unavailable (circuit open) — handed off to a human agent.",
+    }
+
+
+_stats = {"evaluated": 0, "llmCallsAvoided": 0, "fallbacks": 0, "byRule": {rule.name: 0 for rule in RULES}}
+_stats_lock = threading.Lock()
+
+
+def _facts(ctx: dict, policy: dict, delay_days: int, order_id: str, carrier: str) -> dict:
+    name = ctx.get("name") or ""
+    return {
+        "days": delay_days,
+        "tier": (ctx.get("tier") or "standard").lower(),
+        "issues": ctx.get("totalIssues") or 0,
+        "orders": ctx.get("totalOrders") or 0,
+        "credits": ctx.get("totalCreditsGiven") or 0,
+        "policy_credit": (policy or {}).get("credit", 0),
+        "first_name": name.split()[0] if name else "there",
+        "order": f"order {order_id}" if order_id else "order",
+        "carrier": carrier if carrier and carrier != "shipping" else "the carrier",
+    }
+
+
+def decide(ctx: dict, policy: dict, delay_days: int, order_id: str, carrier: str) -> dict:
+    """Return the rule-based decision for a proactive alert, or None to ask the model."""
+    facts = _facts(ctx, policy, delay_days, order_id, carrier)
+    matched = next((rule for rule in RULES if rule.applies(facts)), None)
+    with _stats_lock:
+        _stats["evaluated"] += 1
+        if matched is not None:
+            _stats["llmCallsAvoided"] += 1
+            _stats["byRule"][matched.name] += 1
+    if matched is None:
+        return None
+
+    decision = matched.decide(facts)
+    decision["rule"] = matched.name
+    return decision
+
+
+def fallback(ctx: dict, policy: dict, delay_days: int, order_id: str, carrier: str, proactive: bool) -> dict:
+    """Decision to use when the LLM can't be asked: an apology and a hand-off to a human, with no action."""
+    facts = _facts(ctx, policy, delay_days, order_id, carrier)
+    decision = _alert_fallback(facts) if proactive else _handoff_fallback(facts)
+    decision["fallback"] = True
+    with _stats_lock:
+        _stats["fallbacks"] += 1
+    return decision
+
+
+def get_rules_stats() -> dict:
+    """How often the fast path answered instead of the model."""
+    with _stats_lock:
+        return {**_stats, "byRule": dict(_stats["byRule"])}
@@ -1,10 +1,13 @@
 """
 POST /api/chat — customer chat endpoint.
 Accepts { customerId, message } and runs the orchestrator.
-Emits WebSocket events for the dashboard activity feed.
+Emits WebSocket events for the dashboard activity feed; the agent's reply
+is streamed to the customer's chat as it is generated.
 """
+import uuid
 from flask import Blueprint, request, jsonify
 from server.orchestrator.orchestrator import orchestrate
+from server.integrations.lanes import lane
 from server.integrations.shopify import apply_store_credit, process_refund
 from server.websocket.events import (
     emit_activity,
@@ -20,6 +23,7 @@ chat_bp = Blueprint("chat", __name__)
 
 
 @chat_bp.route("/api/chat", methods=["POST"])
+@lane("chat")
 def chat():
     data = request.get_json()
     if not data:
@@ -45,15 +49,23 @@ def chat():
         except Exception as e:
             print(f"Warning: Could not fetch active delay for order {order_id}: {e}")
 
-    # Run orchestrator
+    # Run orchestrator, streaming the reply text to the customer as it arrives
+    message_id = f"msg-{uuid.uuid4().hex[:8]}"
+
+    def stream_reply(fragment: str):
+        emit_chat_message("agent", customer_id, fragment, message_id=message_id, partial=True)
+
     try:
         result = orchestrate(
             customer_id=customer_id,
             customer_message=message,
             order_id=order_id,
             delay_days=delay_days,
+            on_message=stream_reply,
         )
     except Exception as e:
+        # Close out any fragments already streamed for this reply
+        emit_chat_message("agent", customer_id, "", message_id=message_id, failed=True)
         return jsonify({"error": str(e)}), 500
 
     # Get customer name from context
@@ -71,7 +83,7 @@ def chat():
     # Emit agent response as chat message to dashboard
     action = result.get("action", "")
     agent_msg = result.get("message", "")
-    emit_chat_message("agent", customer_id, agent_msg, action, result.get("creditAmount", 0))
+    emit_chat_message("agent", customer_id, agent_msg, action, result.get("creditAmount", 0), message_id=message_id)
     emit_message_sent(customer_name, agent_msg)
 
     # Execute action — send follow-up status messages to the customer
@@ -0,0 +1,33 @@
+"""
+GET /api/metrics — cache and throughput counters for the integrations,
+for sizing caches and pools in production.
+"""
+from flask import Blueprint, jsonify
+from server.integrations.yutori import get_tracking_cache_stats
+from server.integrations.transport import get_pool_stats
+from server.integrations.rate_limit import get_limiter_stats
+from server.integrations.openai_client import get_coalescing_stats
+from server.integrations.circuit_breaker import get_breaker_stats
+from server.integrations.hedging import get_hedging_stats
+from server.integrations.limits import get_lane_stats
+from server.orchestrator.decision_cache import get_decision_cache_stats
+from server.orchestrator.rules import get_rules_stats
+from server.orchestrator.prompt import get_prompt_stats
+
+metrics_bp = Blueprint("metrics", __name__)
+
+
+@metrics_bp.route("/api/metrics", methods=["GET"])
+def metrics():
+    return jsonify({
+        "trackingCache": get_tracking_cache_stats(),
+        "decisionCache": get_decision_cache_stats(),
+        "rules": get_rules_stats(),
+        "prompt": get_prompt_stats(),
+        "http": get_pool_stats(),
+        "llmLimiter": get_limiter_stats(),
+        "llmCoalescing": get_coalescing_stats(),
+        "llmBreaker": get_breaker_stats(),
+        "llmHedging": get_hedging_stats(),
+        "integrationSlots": get_lane_stats(),
+    }), 200
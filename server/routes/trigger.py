@@ -6,13 +6,12 @@ emitting WebSocket events at each step for the live activity feed.
 import time
 from flask import Blueprint, request, jsonify
 from server.orchestrator.orchestrator import orchestrate
-from server.integrations.senso import get_policy
+from server.orchestrator.context import ResolutionContext
 from server.integrations.shopify import apply_store_credit, process_refund
-from server.neo4j_db.queries import get_all_orders, update_order_status
+from server.neo4j_db.queries import get_orders_by_ids, ResolutionWrites
 from server.websocket.events import (
+    emit_activity,
     emit_delay_detected,
-    emit_neo4j_context,
-    emit_policy_lookup,
     emit_agent_decision,
     emit_browsing_step,
     emit_message_sent,
@@ -39,57 +38,44 @@ def trigger_delay():
     if not order_id:
         return jsonify({"error": "orderId is required"}), 400
 
-    # Find the order and its customer
+    # Find the order, its customer and their graph context in one query
     try:
-        all_orders = get_all_orders()
+        orders = get_orders_by_ids([order_id])
     except RuntimeError:
         # Neo4j unavailable — use demo seed data
-        all_orders = [
+        orders = [
             {"orderId": "order-1042", "customerId": "customer-001", "customerName": "Sarah Chen", "tier": "vip", "product": "Nike Air Max 90", "carrier": "FedEx", "total": 189.99, "status": "shipped"},
             {"orderId": "order-1043", "customerId": "customer-002", "customerName": "Marcus Johnson", "tier": "standard", "product": "Adidas Ultraboost", "carrier": "UPS", "total": 159.99, "status": "shipped"},
             {"orderId": "order-1044", "customerId": "customer-003", "customerName": "Priya Patel", "tier": "vip", "product": "New Balance 990v5", "carrier": "FedEx", "total": 199.99, "status": "shipped"},
         ]
 
-    order = next((o for o in all_orders if o["orderId"] == order_id), None)
+    order = next((o for o in orders if o["orderId"] == order_id), None)
 
     if not order:
         return jsonify({"error": f"Order {order_id} not found"}), 404
 
     customer_name = order["customerName"]
-    tier = order.get("tier", "standard")
     carrier = order.get("carrier", "Unknown")
 
     # ── Step 1: Emit delay detection ──────────────────────────
     emit_delay_detected(order_id, customer_name, carrier, days_late)
 
-    # ── Step 2: Update order status in Neo4j ──────────────────
-    try:
-        update_order_status(order_id, "delayed")
-    except RuntimeError:
-        pass  # Neo4j unavailable — skip write
+    # ── Step 2: Mark the order delayed ────────────────────────
+    # Every graph write for this resolution goes to Neo4j in one transaction
+    # once the decision is made, before any credit or claim goes out; the
+    # "delayed" status is only written on its own if the orchestrator fails.
+    writes = ResolutionWrites()
+    writes.set_order_status(order_id, "delayed")
     emit_order_update(order_id, "delayed")
 
-    # ── Step 3: Neo4j context retrieved internally by orchestrator ──
-
-    # ── Step 4: Emit policy lookup ────────────────────────────
-    policy = get_policy(days_late, tier)
-    emit_policy_lookup(days_late, policy["credit"], tier)
-
-    # ── Step 5: Run orchestrator (calls LLM) ──────────────────
-    auto_message = (
-        f"PROACTIVE ALERT: Carrier tracking shows Order {order_id} "
-        f"({order.get('product', 'item')}) is {days_late} days late. "
-        f"Customer {customer_name} is a {tier} customer."
-    )
-
+    # ── Steps 3-5: Run orchestrator (calls LLM) ───────────────
+    # The graph context came with the order row; the orchestrator looks up
+    # the policy once and emits the context and policy events itself
+    context = ResolutionContext.for_delayed_order(order, days_late, writes=writes)
     try:
-        result = orchestrate(
-            customer_id=order["customerId"],
-            customer_message=auto_message,
-            delay_days=days_late,
-            order_id=order_id,
-        )
+        result = orchestrate(context=context)
     except Exception as e:
+        _commit(writes)
         return jsonify({"error": str(e)}), 500
 
     # ── Step 6: Emit LLM decision ─────────────────────────────
@@ -99,7 +85,11 @@ def trigger_delay():
         result.get("reasoning", ""),
     )
 
-    # ── Step 7: Execute action if needed ─────────────
+    # ── Step 7: Write Issue + Resolution + resolved status ────
+    writes.set_order_status(order_id, "resolved")
+    _commit(writes)
+
+    # ── Step 8: Execute action if needed ─────────────
     action = result.get("action", "")
     if action == "apply_credit":
         api_result = apply_store_credit(
@@ -126,15 +116,8 @@ def trigger_delay():
         for step in api_result.get("steps", []):
             emit_browsing_step(step)
 
-    # ── Step 8: Emit message sent + graph updated ─────────────
     emit_message_sent(customer_name, result.get("message", ""))
     emit_graph_updated()
-
-    # Update order to resolved
-    try:
-        update_order_status(order_id, "resolved")
-    except RuntimeError:
-        pass  # Neo4j unavailable — skip write
     emit_order_update(order_id, "resolved")
 
     # Return full result for the API response
@@ -143,3 +126,10 @@ def trigger_delay():
     result["trigger"] = "manual_demo"
 
     return jsonify(result), 200
+
+
+def _commit(writes: ResolutionWrites):
+    try:
+        writes.commit()
+    except RuntimeError:
+        pass  # Neo4j unavailable — skip writes
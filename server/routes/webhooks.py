@@ -0,0 +1,118 @@
+"""
+POST /api/webhooks/tracking — push-based carrier status ingestion.
+
+Carriers (or a tracking aggregator) post batches of status events here
+instead of waiting for the agent loop to poll. Each request must be signed
+with HMAC-SHA256 over the raw body using TRACKING_WEBHOOK_SECRET, sent as
+`X-Resolve-Signature: sha256=<hex>`.
+
+Body: { events: [{ eventId, orderId, trackingUrl?, status, daysLate?,
+                   estimatedDelivery?, carrierMessage? }] }
+
+Events are deduplicated by eventId. Only orders whose status actually
+changed are handed to the agent loop's _check_order → orchestrate path;
+unchanged ones just push back their next poll. Malformed events are counted
+as invalid and dropped.
+
+An event this replica can't hand to the loop (the loop is stopped, or
+another replica's shard owns the order) is not marked as seen, and the
+response is 503 so the sender retries the batch, ideally against another
+replica. The events that were accepted come back as duplicates.
+"""
+import hashlib
+import hmac
+import os
+import threading
+
+from flask import Blueprint, request, jsonify
+from server.agent_loop.loop import enqueue_order_check, defer_polling
+from server.integrations.cache import TTLCache
+from server.integrations.yutori import TRACKING_STATUSES, prime_tracking_cache
+from server.websocket.events import emit_activity
+
+webhooks_bp = Blueprint("webhooks", __name__)
+
+SIGNATURE_HEADER = "X-Resolve-Signature"
+
+# Event ids we've already accepted, and the last pushed status per order
+_seen_events = TTLCache("webhook-events", ttl=86400, max_entries=100000)
+_last_status = TTLCache("webhook-status", ttl=14 * 86400, max_entries=100000)
+_ingest_lock = threading.Lock()
+
+
+def _valid_signature(body: bytes, header: str) -> bool:
+    secret = os.environ.get("TRACKING_WEBHOOK_SECRET")
+    if not secret or not header:
+        return False
+    expected = hmac.new(secret.encode("utf-8"), body, hashlib.sha256).hexdigest()
+    provided = header.split("=", 1)[1] if header.startswith("sha256=") else header
+    return hmac.compare_digest(expected, provided)
+
+
+@webhooks_bp.route("/api/webhooks/tracking", methods=["POST"])
+def tracking_webhook():
+    if not os.environ.get("TRACKING_WEBHOOK_SECRET"):
+        return jsonify({"error": "Tracking webhook is not configured"}), 503
+    if not _valid_signature(request.get_data(), request.headers.get(SIGNATURE_HEADER, "")):
+        return jsonify({"error": "Invalid signature"}), 401
+
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not isinstance(data.get("events"), list):
+        return jsonify({"error": "Body must be JSON with an events list"}), 400
+
+    counts = {"received": len(data["events"]), "duplicate": 0, "invalid": 0,
+              "unchanged": 0, "enqueued": 0, "skipped": 0}
+
+    for event in data["events"]:
+        try:
+            event_id, order_id, tracking_url, tracking = _parse_event(event)
+        except (AttributeError, TypeError, ValueError):
+            counts["invalid"] += 1
+            continue
+        fingerprint = (tracking["status"], tracking["days_late"])
+
+        with _ingest_lock:
+            if _seen_events.get_fresh(event_id) is not None:
+                counts["duplicate"] += 1
+                continue
+            # Reserved now so a concurrent redelivery counts as a duplicate; released if not enqueued
+            _seen_events.put(event_id, True)
+            changed = _last_status.get_fresh(order_id) != fingerprint
+
+        prime_tracking_cache(tracking_url, tracking)
+        defer_polling(order_id)
+
+        if not changed:
+            counts["unchanged"] += 1
+        elif enqueue_order_check(order_id, tracking):
+            counts["enqueued"] += 1
+            _last_status.put(order_id, fingerprint)
+        else:
+            counts["skipped"] += 1
+            _seen_events.invalidate(event_id)
+
+    emit_activity(
+        "scouting",
+        f"Tracking webhook: {counts['received']} event(s), {counts['enqueued']} order(s) queued for review",
+        counts,
+    )
+    # Some orders belong elsewhere (or the loop is down): ask the sender to retry
+    return jsonify(counts), 503 if counts["skipped"] else 202
+
+
+def _parse_event(event: dict) -> tuple:
+    """(eventId, orderId, trackingUrl, tracking) for one pushed event; raises on anything malformed."""
+    event_id = event.get("eventId")
+    order_id = event.get("orderId")
+    tracking_url = event.get("trackingUrl")
+    status = str(event.get("status", "")).lower()
+    if not isinstance(event_id, (str, int)) or not isinstance(order_id, str) or not event_id or not order_id:
+        raise ValueError("eventId and orderId are required")
+    if status not in TRACKING_STATUSES or not isinstance(tracking_url, (str, type(None))):
+        raise ValueError("unknown status or bad trackingUrl")
+    return event_id, order_id, tracking_url, {
+        "status": status,
+        "days_late": int(event.get("daysLate") or 0),
+        "estimated_delivery": event.get("estimatedDelivery") or "See carrier status",
+        "carrier_message": str(event.get("carrierMessage", ""))[:150],
+    }
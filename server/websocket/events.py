@@ -3,9 +3,16 @@ WebSocket event emitters — socket.io setup.
 Used by the agent loop and routes to push real-time updates to the dashboard.
 
 Each event includes a timestamp and source tag for color-coding in the activity feed.
+
+Action steps can be emitted with paced=True: they are replayed to the dashboard
+by a presentation thread with DASHBOARD_STEP_DELAY_SECONDS between them, so the
+caller never waits for the animation.
 """
+import os
+import queue
 import uuid
 import threading
+import time
 from datetime import datetime, timezone
 from flask import request as flask_request
 
@@ -15,6 +22,14 @@ _socketio = None
 # In-flight voice calls keyed by callId
 _active_calls = {}
 
+# Presentation-only pacing of activity steps (0 disables)
+DASHBOARD_STEP_DELAY_SECONDS = float(os.getenv("DASHBOARD_STEP_DELAY_SECONDS", "0.3"))
+# Past this backlog the pacer stops delaying and catches up
+PACING_MAX_BACKLOG = 20
+_paced_events = queue.Queue()
+_pacer_thread = None
+_pacer_lock = threading.Lock()
+
 
 def set_socketio(sio):
     """Store the socketio instance for use by all emitters."""
@@ -322,6 +337,7 @@ def _persist_and_analyze_call(call_data: dict, full_transcript: str):
     # Step 2: Post-call orchestrator analysis
     if full_transcript:
         try:
+            from server.integrations.lanes import lane
             from server.orchestrator.orchestrator import orchestrate
 
             analysis_message = (
@@ -332,10 +348,12 @@ def _persist_and_analyze_call(call_data: dict, full_transcript: str):
                 "--- END TRANSCRIPT ---"
             )
 
-            decision = orchestrate(
-                customer_id=customer_id,
-                customer_message=analysis_message,
-            )
+            # Behind live chats, ahead of the proactive loop
+            with lane("voice"):
+                decision = orchestrate(
+                    customer_id=customer_id,
+                    customer_message=analysis_message,
+                )
 
             # Update transcript summary with LLM reasoning
             if transcript_id and decision.get("reasoning"):
@@ -362,7 +380,32 @@ def _timestamp():
     return datetime.now(timezone.utc).isoformat()
 
 
-def emit_activity(source: str, message: str, data: dict = None):
+def _run_pacer():
+    while True:
+        event, paced = _paced_events.get()
+        try:
+            _send_activity(event)
+            if paced and _paced_events.qsize() < PACING_MAX_BACKLOG:
+                time.sleep(DASHBOARD_STEP_DELAY_SECONDS)
+        finally:
+            _paced_events.task_done()
+
+
+def _enqueue_paced(event: dict, paced: bool):
+    global _pacer_thread
+    with _pacer_lock:
+        if _pacer_thread is None:
+            _pacer_thread = threading.Thread(target=_run_pacer, daemon=True)
+            _pacer_thread.start()
+    _paced_events.put((event, paced))
+
+
+def _send_activity(event: dict):
+    _socketio.emit("activity", event)
+    print(f"[Activity] {event['source']}: {event['message']}")
+
+
+def emit_activity(source: str, message: str, data: dict = None, paced: bool = False):
     """
     Emit a generic activity event to the dashboard feed.
 
@@ -375,6 +418,10 @@ def emit_activity(source: str, message: str, data: dict = None):
         - tavily: Web Search (yellow)
         - call: Voice call events (rose)
         - system: General system events (gray)
+
+    paced=True hands the event to the presentation thread instead of emitting
+    inline. While paced steps are queued, other events queue behind them so
+    the feed keeps its order.
     """
     if _socketio is None:
         print(f"[Activity] {source}: {message}")
@@ -386,8 +433,10 @@ def emit_activity(source: str, message: str, data: dict = None):
         "message": message,
         "data": data or {},
     }
-    _socketio.emit("activity", event)
-    print(f"[Activity] {source}: {message}")
+    if DASHBOARD_STEP_DELAY_SECONDS > 0 and (paced or _paced_events.unfinished_tasks):
+        _enqueue_paced(event, paced)
+        return
+    _send_activity(event)
 
 
 def emit_call_activity(action: str, customer_name: str, call_id: str):
@@ -437,9 +486,9 @@ def emit_agent_decision(action: str, credit_amount: float, reasoning: str):
     )
 
 
-def emit_browsing_step(step: str):
+def emit_browsing_step(step: str, paced: bool = False):
     """Emit individual Yutori Browsing API steps."""
-    emit_activity("browsing", step)
+    emit_activity("browsing", step, paced=paced)
 
 
 def emit_tavily_search(query: str):
@@ -472,17 +521,39 @@ def emit_order_update(order_id: str, status: str):
         })
 
 
-def emit_chat_message(role: str, customer_name: str, message: str, action: str = None, credit: float = 0):
+def emit_chat_message(
+    role: str,
+    customer_name: str,
+    message: str,
+    action: str = None,
+    credit: float = 0,
+    message_id: str = None,
+    partial: bool = False,
+    failed: bool = False,
+):
     """
     Emit a chat message to the dashboard so it can show live conversations.
     role: 'customer' or 'agent'
+    partial: `message` is the next fragment of a reply that is still being
+    generated. Fragments only go to the customer's own chat (room
+    customer:{id}, with customer_name holding the id); the final message
+    with the same message_id replaces them.
+    failed: the reply with this message_id was abandoned after its fragments
+    went out; sent to the same room so the chat can drop them.
     """
     if _socketio:
-        _socketio.emit("chat_message", {
+        payload = {
             "timestamp": _timestamp(),
             "role": role,
             "customerName": customer_name,
             "message": message,
             "action": action,
             "creditAmount": credit,
-        })
+            "messageId": message_id,
+            "partial": partial,
+            "failed": failed,
+        }
+        if partial or failed:
+            _socketio.emit("chat_message", payload, room=f"customer:{customer_name}")
+        else:
+            _socketio.emit("chat_message", payload)